@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Almacen Columnar de Detecciones (Parquet)
+Proyecto Integrador - IFTS24
+
+Guarda las cajas de cada auditoria (tienda, fecha, imagen, marca, area,
+confianza y caja) en archivos Parquet particionados por dia, y calcula el
+Share of Shelf por marca, tienda y ventana de tiempo con agregaciones
+vectorizadas de pyarrow. Los filtros se empujan al escaneo: una consulta
+solo lee los dias y las columnas que necesita.
+
+Cada auditoria se escribe en un archivo propio (escritura atomica, sin
+bloqueos entre sesiones ni procesos). Abrir miles de archivos chicos cuesta
+mas que leerlos, asi que la primera escritura de cada dia compacta los dias
+anteriores (ya cerrados) en un archivo por dia; --compactar lo hace con
+todos, incluido el dia en curso.
+
+Uso:
+    python almacen_detecciones.py --por tienda
+    python almacen_detecciones.py --por tienda --ventana semana --desde 2026-01-01 --hasta 2026-03-31
+    python almacen_detecciones.py --tiendas "Sucursal Centro" "Sucursal Norte" --ventana dia
+    python almacen_detecciones.py --compactar
+"""
+
+import argparse
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+DIRECTORIO_ALMACEN = os.environ.get('STOCKVISION_ALMACEN', 'historial_detecciones')
+ESQUEMA = pa.schema([
+    ('analisis', pa.string()),
+    ('tienda', pa.string()),
+    ('fecha', pa.timestamp('s')),
+    ('imagen', pa.string()),
+    ('marca', pa.string()),
+    ('area', pa.int64()),
+    ('confianza', pa.float32()),  # Nula en auditorias de video (productos rastreados, sin caja unica)
+    ('x1', pa.int32()),
+    ('y1', pa.int32()),
+    ('x2', pa.int32()),
+    ('y2', pa.int32()),
+])
+PARTICION = ds.partitioning(pa.schema([('dia', pa.string())]), flavor='hive')
+COLUMNAS_TEXTO = ['analisis', 'tienda', 'imagen', 'marca']  # Se leen como diccionario: agrupar es comparar enteros
+# Esquema de lectura: con 'string' el escaneo convertiria cada diccionario de vuelta a texto
+ESQUEMA_LECTURA = pa.schema(
+    [pa.field(c.name, pa.dictionary(pa.int32(), pa.string())) if c.name in COLUMNAS_TEXTO else c for c in ESQUEMA]
+    + [pa.field('dia', pa.string())])
+VENTANAS = {'dia': 'day', 'semana': 'week', 'mes': 'month'}
+ARCHIVO_BLOQUEO = '.compactando'  # Una sola compactacion a la vez entre procesos
+BLOQUEO_VENCIDO_S = 3600          # Bloqueo de un proceso que murio compactando
+
+
+def texto_dia(valor):
+    """date, datetime o 'AAAA-MM-DD...' -> 'AAAA-MM-DD' (el valor de la particion)."""
+    if isinstance(valor, str):
+        valor = date.fromisoformat(valor[:10])
+    return f"{valor:%Y-%m-%d}"
+
+
+class AlmacenDetecciones:
+    """Detecciones de todas las auditorias en un dataset Parquet particionado por dia."""
+
+    def __init__(self, directorio=DIRECTORIO_ALMACEN, compactar_automatico=True):
+        self.directorio = Path(directorio)
+        self.compactar_automatico = compactar_automatico
+
+    def guardar(self, filas, tienda, fecha=None, analisis=None):
+        """
+        Agrega las filas de una auditoria (dicts con imagen, Marca, Area y,
+        si las hay, confianza y x1/y1/x2/y2, como deteccion.filas_detecciones).
+        Devuelve el id del analisis.
+        """
+        fecha = (fecha or datetime.now()).replace(microsecond=0)
+        analisis = analisis or uuid.uuid4().hex[:12]
+        columnas = {
+            'analisis': [analisis] * len(filas),
+            'tienda': [tienda] * len(filas),
+            'fecha': [fecha] * len(filas),
+            'imagen': [str(f.get('imagen', '')) for f in filas],
+            'marca': [f['Marca'] for f in filas],
+            'area': [int(f['Area']) for f in filas],
+        }
+        for nombre in ('confianza', 'x1', 'y1', 'x2', 'y2'):
+            columnas[nombre] = [f.get(nombre) for f in filas]
+        self.agregar_tabla(pa.table(columnas, schema=ESQUEMA), nombre=analisis)
+        return analisis
+
+    def agregar_tabla(self, tabla, nombre=None):
+        """Escribe una tabla con ESQUEMA, un archivo por dia presente en la columna fecha."""
+        tabla = tabla.select(ESQUEMA.names).cast(ESQUEMA)
+        if tabla.num_rows == 0:
+            return
+        nombre = nombre or uuid.uuid4().hex[:12]
+        dias = pc.strftime(tabla['fecha'], format='%Y-%m-%d')
+        unicos = pc.unique(dias).to_pylist()
+        nuevos = [dia for dia in unicos if not (self.directorio / f"dia={dia}").exists()]
+        for dia in unicos:
+            self._escribir(tabla if len(unicos) == 1 else tabla.filter(pc.equal(dias, dia)), dia, nombre)
+        if nuevos and self.compactar_automatico:
+            self.compactar(hasta=min(nuevos))
+
+    def _escribir(self, tabla, dia, nombre):
+        carpeta = self.directorio / f"dia={dia}"
+        carpeta.mkdir(parents=True, exist_ok=True)
+        # Los archivos que empiezan con '.' no los ve el dataset: nadie lee una escritura a medias
+        temporal = carpeta / f".{nombre}.parquet.tmp"
+        pq.write_table(tabla, temporal, compression='zstd')
+        os.replace(temporal, carpeta / f"{nombre}.parquet")
+
+    def dataset(self):
+        """Dataset de pyarrow con las detecciones guardadas, o None si el almacen esta vacio."""
+        if not any(self.directorio.glob('dia=*/*.parquet')):
+            return None
+        formato = ds.ParquetFileFormat(read_options={'dictionary_columns': COLUMNAS_TEXTO})
+        return ds.dataset(self.directorio, schema=ESQUEMA_LECTURA, format=formato, partitioning=PARTICION)
+
+    @staticmethod
+    def filtro(desde=None, hasta=None, tiendas=None, marcas=None, conf_minima=None):
+        """Expresion de filtro: los limites de fecha (dias inclusive) podan particiones enteras."""
+        condiciones = []
+        if desde is not None:
+            condiciones.append(ds.field('dia') >= texto_dia(desde))
+        if hasta is not None:
+            condiciones.append(ds.field('dia') <= texto_dia(hasta))
+        if tiendas:
+            condiciones.append(ds.field('tienda').isin(list(tiendas)))
+        if marcas:
+            condiciones.append(ds.field('marca').isin(list(marcas)))
+        if conf_minima is not None:
+            condiciones.append(ds.field('confianza') >= conf_minima)
+        expresion = None
+        for condicion in condiciones:
+            expresion = condicion if expresion is None else expresion & condicion
+        return expresion
+
+    def share(self, por=('tienda',), ventana=None, **filtros):
+        """
+        Share of Shelf por marca dentro de cada grupo de `por` (columnas del
+        esquema: tienda, imagen, analisis; vacio para el total) y, con
+        `ventana` ('dia', 'semana' o 'mes'), de cada periodo. Filtros:
+        desde/hasta (dias inclusive), tiendas, marcas, conf_minima.
+        Devuelve un DataFrame con las claves, Marca, Productos, Area y Share (%).
+        """
+        import pandas as pd
+
+        claves = list(por) + (['periodo'] if ventana else [])
+        dataset = self.dataset()
+        if dataset is None:
+            return pd.DataFrame(columns=claves + ["Marca", "Productos", "Area", "Share (%)"])
+
+        columnas = list(dict.fromkeys(list(por) + ['marca', 'area'] + (['fecha'] if ventana else [])))
+        tabla = dataset.to_table(columns=columnas, filter=self.filtro(**filtros))
+        if ventana:
+            periodo = pc.floor_temporal(tabla['fecha'], unit=VENTANAS[ventana])
+            tabla = tabla.drop_columns(['fecha']).append_column('periodo', periodo)
+
+        # Cada archivo trae su propio diccionario de textos: se unifican antes de agrupar
+        agregado = tabla.unify_dictionaries().group_by(claves + ['marca']).aggregate(
+            [('area', 'sum'), ('area', 'count')])
+        df = agregado.to_pandas()
+        for clave in claves + ['marca']:
+            if isinstance(df[clave].dtype, pd.CategoricalDtype):
+                df[clave] = df[clave].astype(str)
+        df = df.rename(columns={'marca': "Marca", 'area_count': "Productos", 'area_sum': "Area"})
+        total = df.groupby(claves)["Area"].transform('sum') if claves else df["Area"].sum()
+        df["Share (%)"] = (df["Area"] / total * 100).round(1)
+        orden = claves + ["Share (%)"]
+        return df[claves + ["Marca", "Productos", "Area", "Share (%)"]].sort_values(
+            orden, ascending=[True] * len(claves) + [False], ignore_index=True)
+
+    def resumen(self):
+        """Cantidad de detecciones, auditorias, tiendas, dias y archivos guardados."""
+        dataset = self.dataset()
+        if dataset is None:
+            return {"detecciones": 0, "auditorias": 0, "tiendas": [], "dias": 0, "archivos": 0}
+        tabla = dataset.to_table(columns=['analisis', 'tienda', 'dia']).unify_dictionaries()
+        return {
+            "detecciones": tabla.num_rows,
+            "auditorias": len(pc.unique(tabla['analisis'])),
+            "tiendas": sorted(str(t) for t in pc.unique(tabla['tienda']).to_pylist()),
+            "dias": len(pc.unique(tabla['dia'])),
+            "archivos": len(dataset.files),
+        }
+
+    @contextmanager
+    def _bloqueo(self):
+        ruta = self.directorio / ARCHIVO_BLOQUEO
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        try:
+            if time.time() - ruta.stat().st_mtime > BLOQUEO_VENCIDO_S:
+                ruta.unlink()
+        except FileNotFoundError:
+            pass
+        try:
+            os.close(os.open(ruta, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            ruta.unlink(missing_ok=True)
+
+    def compactar(self, hasta=None):
+        """
+        Junta los archivos de cada dia (de los anteriores a `hasta`, si se
+        pasa) en uno solo. Una consulta simultanea puede no ver ese dia por un
+        instante. Devuelve (archivos antes, archivos despues), o None si otro
+        proceso esta compactando.
+        """
+        antes = despues = 0
+        with self._bloqueo() as propio:
+            if not propio:
+                return None
+            for carpeta in sorted(self.directorio.glob('dia=*')):
+                dia = carpeta.name.split('=', 1)[1]
+                if hasta is not None and dia >= texto_dia(hasta):
+                    continue
+                archivos, unidos = self._compactar_dia(carpeta, dia)
+                antes += archivos
+                despues += unidos
+        return antes, despues
+
+    def _compactar_dia(self, carpeta, dia):
+        archivos = sorted(carpeta.glob('*.parquet'))
+        if len(archivos) < 2:
+            return len(archivos), len(archivos)
+        tabla = pa.concat_tables(pq.read_table(a, schema=ESQUEMA) for a in archivos)
+        tabla = tabla.sort_by([('tienda', 'ascending'), ('fecha', 'ascending')])
+        self._escribir(tabla, dia, f"compacto_{uuid.uuid4().hex[:8]}")
+        for archivo in archivos:
+            archivo.unlink()
+        return len(archivos), 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consultas de Share of Shelf sobre el almacen de detecciones")
+    parser.add_argument('--almacen', default=DIRECTORIO_ALMACEN, help="Carpeta del almacen")
+    parser.add_argument('--por', nargs='*', default=['tienda'], choices=['tienda', 'imagen', 'analisis'],
+                        help="Agrupar por estas columnas (sin valores: total)")
+    parser.add_argument('--ventana', choices=list(VENTANAS), help="Agrupar ademas por dia, semana o mes")
+    parser.add_argument('--desde', help="AAAA-MM-DD (inclusive)")
+    parser.add_argument('--hasta', help="AAAA-MM-DD (inclusive)")
+    parser.add_argument('--tiendas', nargs='+')
+    parser.add_argument('--marcas', nargs='+')
+    parser.add_argument('--conf', type=float, help="Confianza minima")
+    parser.add_argument('--salida', help="Guardar el resultado en CSV")
+    parser.add_argument('--compactar', action='store_true', help="Juntar los archivos de cada dia")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("ALMACEN DE DETECCIONES")
+    print("="*60)
+
+    almacen = AlmacenDetecciones(args.almacen)
+    if args.compactar:
+        resultado = almacen.compactar()
+        if resultado is None:
+            print(f"[ERROR] Otra compactacion en curso (bloqueo {ARCHIVO_BLOQUEO} en {args.almacen})")
+            raise SystemExit(1)
+        print(f"[OK] {resultado[0]} archivos -> {resultado[1]}")
+        return
+
+    resumen = almacen.resumen()
+    if not resumen["detecciones"]:
+        print(f"[ERROR] No hay detecciones guardadas en {args.almacen}")
+        raise SystemExit(1)
+    print(f"Detecciones: {resumen['detecciones']} | Auditorias: {resumen['auditorias']} | "
+          f"Tiendas: {len(resumen['tiendas'])} | Dias: {resumen['dias']} | Archivos: {resumen['archivos']}")
+
+    df = almacen.share(args.por, args.ventana, desde=args.desde, hasta=args.hasta, tiendas=args.tiendas,
+                       marcas=args.marcas, conf_minima=args.conf)
+    print()
+    print(df.to_string(index=False) if len(df) else "Sin detecciones para ese filtro")
+    if args.salida:
+        df.to_csv(args.salida, index=False)
+        print(f"\nResultado guardado en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,25 @@
+import json
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from pathlib import Path
+
 import streamlit as st
-from ultralytics import YOLO
-from PIL import Image
-import cv2
 import numpy as np
-import pandas as pd
-import plotly.express as px
+# pandas y plotly se importan al armar el reporte; ultralytics/torch, en el hilo de precarga del modelo
+
+import deteccion
+import backends_inferencia
+import cache_detecciones
+import imagen_liviana
+import inferencia_tiles
+import auditoria_video
+import panorama_gondola
+import servidor_modelos
+import perfilado
+import reporte_gerencial
 
 # --- 1. CONFIGURACIÓN DE PÁGINA ---
 st.set_page_config(
@@ -78,35 +93,125 @@ st.markdown("""
     """, unsafe_allow_html=True)
 
 # --- 3. CARGA DE MODELO ---
-@st.cache_resource
-def load_generic_model():
-    return YOLO('yolov8n.pt')
-
-def detect_brand_color(image_crop):
-    """Detecta rojo (Coca) o azul (Pepsi) en el recorte."""
-    hsv = cv2.cvtColor(image_crop, cv2.COLOR_RGB2HSV)
-
-    # Rangos de color
-    lower_red1 = np.array([0, 70, 50])
-    upper_red1 = np.array([10, 255, 255])
-    lower_red2 = np.array([170, 70, 50])
-    upper_red2 = np.array([180, 255, 255])
-    lower_blue = np.array([100, 70, 50])
-    upper_blue = np.array([130, 255, 255])
-
-    mask_red = cv2.inRange(hsv, lower_red1, upper_red1) + cv2.inRange(hsv, lower_red2, upper_red2)
-    mask_blue = cv2.inRange(hsv, lower_blue, upper_blue)
-
-    pixels_red = cv2.countNonZero(mask_red)
-    pixels_blue = cv2.countNonZero(mask_blue)
-    total_pixels = image_crop.shape[0] * image_crop.shape[1]
-
-    if pixels_red > pixels_blue and pixels_red > (total_pixels * 0.05):
-        return "Familia Coca-Cola", (255, 0, 0)
-    elif pixels_blue > pixels_red and pixels_blue > (total_pixels * 0.05):
-        return "Familia PepsiCo", (0, 0, 255)
+MODO_MARCAS = "Marcas (modelo entrenado)"
+MODO_HIBRIDO = "Híbrido (YOLO genérico + color)"
+
+def cargar_modelo(ruta=None, precision=None):
+    # Con STOCKVISION_PROCESOS=N las sesiones comparten N replicas del modelo en procesos aparte
+    procesos = int(os.environ.get('STOCKVISION_PROCESOS', 0))
+    # Las variantes FP16/INT8 de cuantizar_modelo.py son .onnx: se cargan con el backend onnx
+    backend, ruta = backends_inferencia.resolver_precision(ruta=ruta, precision=precision)
+    ajuste = backends_inferencia.cargar_ajuste('app', backend, ruta, 'fp32')
+    if procesos:
+        model = servidor_modelos.ServidorModelos(procesos, backend, ruta=ruta, uso='app', precision='fp32')
+    elif 'STOCKVISION_PROCESOS' not in os.environ and ajuste.get('procesos', 1) > 1:
+        # Sin la variable, las replicas e hilos que haya medido autoajuste.py
+        nucleos = servidor_modelos.nucleos_disponibles()[:ajuste['procesos'] * ajuste['threads']]
+        model = servidor_modelos.ServidorModelos(ajuste['procesos'], backend, ruta=ruta, nucleos=nucleos, uso='app',
+                                                 precision='fp32')
     else:
-        return "Otros / Genérico", (128, 128, 128)
+        model = deteccion.load_generic_model(backend, ruta, uso='app', precision='fp32')
+    deteccion.calentar_modelo(model)
+    return model
+
+@st.cache_resource(show_spinner=False)
+def precargar_modelo(ruta=None, precision=None):
+    # Una vez por proceso: el primer render lanza la carga (imports de torch/ultralytics, pesos e
+    # inferencia de calentamiento) en un hilo, y el modelo esta listo mientras el usuario elige la foto
+    pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='precarga_modelo')
+    futuro = pool.submit(cargar_modelo, ruta, precision)
+    pool.shutdown(wait=False)
+    return futuro
+
+def obtener_modelo(ruta=None, precision=None):
+    # ruta=None: YOLO generico; deteccion.MODELO_MARCAS: best.pt de seis clases
+    futuro = precargar_modelo(ruta, precision)
+    if not futuro.done():
+        with st.spinner("Cargando el modelo de IA..."):
+            wait([futuro])
+    if futuro.exception() is not None:
+        precargar_modelo.clear(ruta, precision)  # La proxima ejecucion vuelve a intentar la carga
+    return futuro.result()
+
+@st.cache_resource
+def load_detection_cache():
+    return cache_detecciones.CacheDetecciones()
+
+def analizar_video(model, uploaded_file, conf, fps_muestreo):
+    # OpenCV necesita una ruta: el video subido se vuelca a un temporal
+    sufijo = Path(uploaded_file.name).suffix
+    with tempfile.NamedTemporaryFile(suffix=sufijo, delete=False) as tmp:
+        tmp.write(uploaded_file.getvalue())
+    try:
+        duracion = auditoria_video.duracion_video(tmp.name)
+        barra = st.progress(0.0, text="Recorriendo la góndola...")
+
+        def progreso(segundo):
+            avance = min(segundo / duracion, 1.0) if duracion else 0.0
+            barra.progress(avance, text=f"Recorriendo la góndola... {segundo:.0f}s de {duracion:.0f}s")
+
+        data, metricas = auditoria_video.auditar_video(model, tmp.name, conf, fps_muestreo, progreso=progreso)
+        barra.empty()
+    finally:
+        os.remove(tmp.name)
+
+    guardar_reporte(data)
+    st.session_state['filas_almacen'] = [{"imagen": uploaded_file.name, **d} for d in data]
+    st.session_state['analisis_guardado'] = None
+    st.session_state['img_final'] = None
+    st.session_state['img_original'] = None
+    st.session_state['metricas_video'] = metricas
+    st.session_state['archivo_analizado'] = uploaded_file.file_id
+    st.session_state['conf_analizada'] = conf
+    st.session_state['analyzed'] = True
+
+def analizar_panorama(model, fotos, conf):
+    # Cada toma se decodifica reducida; YOLO corre una vez por foto y solo sobre lo que no cubren las anteriores
+    imagenes = [np.asarray(abrir_imagen_trabajo(foto)[0]) for foto in fotos]
+    data, detecciones, metricas, registro = panorama_gondola.auditar_panorama(model, imagenes, conf)
+    with perfilado.etapa('dibujo'):
+        mosaico = panorama_gondola.dibujar_panorama(imagenes, registro, detecciones, data)
+        st.session_state['img_final'] = imagen_liviana.a_jpeg(mosaico)
+        st.session_state['img_original'] = None
+
+    guardar_reporte(data, detecciones)
+    st.session_state['filas_almacen'] = deteccion.filas_detecciones(data, detecciones, range(len(data)),
+                                                                    "+".join(f.name for f in fotos))
+    st.session_state['analisis_guardado'] = None
+    st.session_state['metricas_panorama'] = metricas
+    st.session_state['archivo_analizado'] = "+".join(f.file_id for f in fotos)
+    st.session_state['conf_analizada'] = conf
+    st.session_state['analyzed'] = True
+
+def guardar_reporte(data, cajas=None):
+    # Un reporte por análisis: los reruns por widgets (precio, pestañas) reutilizan lo ya calculado
+    st.session_state['id_analisis'] = st.session_state.get('id_analisis', 0) + 1
+    st.session_state['data_marketing'] = data
+    with perfilado.etapa('reporte.agregados'):
+        st.session_state['reporte'] = reporte_gerencial.ReporteAnalisis(st.session_state['id_analisis'], data, cajas)
+
+def abrir_imagen_trabajo(uploaded_file, tiles=None):
+    # Foto reducida para YOLO y el color; con tiles, completa (el modo es para no perder botellas chicas)
+    with perfilado.etapa('abrir_imagen'):
+        return imagen_liviana.abrir_imagen(uploaded_file, None if tiles else imagen_liviana.LADO_TRABAJO)
+
+def guardar_analisis(imagen, escala, detecciones, conf, familias=None, nombre=''):
+    # Color sobre la imagen de trabajo; el dibujo, sobre una copia del tamaño de pantalla
+    data_temp, _, indices = deteccion.analizar_detecciones(np.asarray(imagen), detecciones, dibujar=False,
+                                                           familias=familias, escala=escala)
+    with perfilado.etapa('dibujo'):
+        vista = imagen_liviana.vista(imagen)
+        img_final = deteccion.dibujar_detecciones(np.array(vista), detecciones[indices], data_temp,
+                                                  escala * vista.width / imagen.width)
+        # En la sesión quedan miniaturas JPEG, no arrays de resolución completa
+        st.session_state['img_original'] = imagen_liviana.a_jpeg(vista)
+        st.session_state['img_final'] = imagen_liviana.a_jpeg(img_final)
+    # Filas con confianza y caja para el historial por tienda (almacen_detecciones.py)
+    st.session_state['filas_almacen'] = deteccion.filas_detecciones(data_temp, detecciones, indices, nombre)
+    st.session_state['analisis_guardado'] = None
+    guardar_reporte(data_temp, detecciones[indices])
+    st.session_state['conf_analizada'] = conf
+    st.session_state['analyzed'] = True
 
 # --- 4. FUNCIÓN PRINCIPAL ---
 def main():
@@ -115,6 +220,7 @@ def main():
         st.session_state['analyzed'] = False
         st.session_state['data_marketing'] = []
         st.session_state['img_final'] = None
+        st.session_state['img_original'] = None
 
     # Sidebar
     with st.sidebar:
@@ -124,15 +230,52 @@ def main():
         
         st.divider()
         st.subheader("⚙️ Configuración")
-        conf = st.slider("Sensibilidad IA", 0.1, 0.9, 0.25)
+        conf = st.slider("Sensibilidad IA", cache_detecciones.CONF_MINIMA, 0.9, 0.25)
+        modos = [MODO_MARCAS, MODO_HIBRIDO] if os.path.exists(deteccion.MODELO_MARCAS) else [MODO_HIBRIDO]
+        modo = st.radio("Modo de detección", modos,
+                        help="Marcas: el modelo entrenado (best.pt) reconoce cada marca. "
+                             "Híbrido: YOLO genérico detecta botellas y el color decide la familia.")
+        if st.session_state.get('modo') != modo:
+            st.session_state['modo'] = modo
+            st.session_state['analyzed'] = False  # El análisis anterior es de otro modelo
+        ruta_modelo = deteccion.MODELO_MARCAS if modo == MODO_MARCAS else None
+        precision = os.environ.get('STOCKVISION_PRECISION', 'fp32')
+        precisiones = backends_inferencia.precisiones_disponibles(ruta=ruta_modelo)
+        if precision not in precisiones:
+            st.caption(f"Este modelo no tiene variante {precision}: se usa fp32")
+            precision = 'fp32'
+        if len(precisiones) > 1:
+            precision = st.selectbox("Precisión del modelo", precisiones, index=precisiones.index(precision),
+                                     help="Variantes de cuantizar_modelo.py: INT8/FP16 ocupan menos y pueden "
+                                          "ser más rápidas, con algo menos de precisión (ver su tabla)")
+        if st.session_state.get('precision') != precision:
+            st.session_state['precision'] = precision
+            st.session_state['analyzed'] = False  # El análisis anterior es de otra variante del modelo
+        precargar_modelo(ruta_modelo, precision)  # No bloquea: arranca la carga en segundo plano
+        stats = load_detection_cache().estadisticas()
+        st.caption(f"Cache: {stats['hits']} hits / {stats['misses']} misses · {stats['entradas']} imágenes")
+
+        tiles = None
+        if st.toggle("Modo alta resolución (tiles)", help="Corta la foto en tiles solapados para no perder botellas chicas"):
+            tamanio_tile = st.select_slider("Tamaño de tile (px)", [320, 480, 640, 800, 960], value=inferencia_tiles.TAMANIO_TILE)
+            solape_tile = st.slider("Solape entre tiles", 0.0, 0.5, inferencia_tiles.SOLAPE_TILE, step=0.05)
+            tiles = (tamanio_tile, solape_tile)
+        panorama = st.toggle("Modo panorama (varias fotos)",
+                             help="Sube varias tomas solapadas de la misma góndola: se alinean y se cuentan una vez")
+        if st.session_state.get('panorama') != panorama:
+            st.session_state['panorama'] = panorama
+            st.session_state['analyzed'] = False  # El análisis anterior es de otro modo de carga
+        fps_video = st.slider("Frames por segundo (video)", 1, 10, auditoria_video.FPS_MUESTREO,
+                              help="Frames del recorrido que se analizan por cada segundo de video")
         
         # --- NUEVAS INSTRUCCIONES CLARAS ---
         st.divider()
         st.subheader("📝 Instrucciones")
         st.markdown("""
-        1. **Sube una foto** de la góndola (JPG/PNG).
+        1. **Sube una foto** de la góndola (JPG/PNG) o un **video** del recorrido (MP4/MOV).
         2. Ve a la pestaña **'Análisis Visual'**.
-        3. Presiona el botón rojo **'PROCESAR IMAGEN'**.
+        3. Presiona el botón rojo **'PROCESAR IMAGEN'** (o **'PROCESAR VIDEO'**).
+        En **modo panorama**, sube todas las tomas de la góndola y presiona **'PROCESAR PANORAMA'**.
         4. Revisa los gráficos en **'Reporte Gerencial'**.
         """)
 
@@ -143,69 +286,97 @@ def main():
         st.markdown("##### Inteligencia Artificial Híbrida para Retail")
 
     # Carga de Imagen
-    uploaded_file = st.file_uploader("Sube tu foto de góndola aquí", type=['jpg', 'jpeg', 'png'])
+    if panorama:
+        fotos = st.file_uploader("Sube las fotos solapadas de la góndola (en orden, de izquierda a derecha)",
+                                 type=['jpg', 'jpeg', 'png'], accept_multiple_files=True)
+        uploaded_file = fotos[0] if fotos else None
+    else:
+        tipos = ['jpg', 'jpeg', 'png'] + [e.lstrip('.') for e in auditoria_video.EXTENSIONES_VIDEO]
+        uploaded_file = st.file_uploader("Sube tu foto o video de góndola aquí", type=tipos)
 
     if uploaded_file:
-        image_pil = Image.open(uploaded_file)
-        img_array = np.array(image_pil)
-        model = load_generic_model()
+        es_video = uploaded_file.name.lower().endswith(auditoria_video.EXTENSIONES_VIDEO)
+        model = obtener_modelo(ruta_modelo, precision)
+        familias = deteccion.familias_modelo(model)
 
         # Pestañas
         tab_visual, tab_data, tab_export = st.tabs(["🖼️ Análisis Visual", "📊 Reporte Gerencial", "📥 Exportar"])
 
         # --- TAB 1: VISUAL ---
         with tab_visual:
-            if st.button("🚀 PROCESAR IMAGEN", use_container_width=True):
-                with st.spinner("Analizando espectro de color y objetos..."):
-                    results = model(image_pil, conf=conf, classes=[39]) # 39 = botella
-                    
-                    img_final = img_array.copy()
-                    data_temp = []
-
-                    for r in results:
-                        for box in r.boxes:
-                            x1, y1, x2, y2 = map(int, box.xyxy[0])
-                            
-                            if (x2-x1) < 10 or (y2-y1) < 10: continue
-
-                            bottle_crop = img_array[y1:y2, x1:x2]
-                            brand, color_rgb = detect_brand_color(bottle_crop)
-                            
-                            # Dibujo (Grosor 2 para que se vea bien)
-                            cv2.rectangle(img_final, (x1, y1), (x2, y2), color_rgb, 2)
-                            cv2.putText(img_final, brand, (x1, y1-5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color_rgb, 1)
-
-                            area = (x2-x1) * (y2-y1)
-                            data_temp.append({"Marca": brand, "Area": area})
-
-                    st.session_state['img_final'] = img_final
-                    st.session_state['data_marketing'] = data_temp
-                    st.session_state['analyzed'] = True
+            cache = load_detection_cache()
+            if panorama:
+                if st.button("🚀 PROCESAR PANORAMA", use_container_width=True):
+                    with st.spinner(f"Alineando {len(fotos)} fotos y analizando la góndola..."):
+                        analizar_panorama(model, fotos, conf)
                     st.rerun()
-
-            if st.session_state['analyzed']:
-                c1, c2 = st.columns(2)
-                with c1:
-                    st.image(image_pil, caption="Imagen Original", use_container_width=True)
-                with c2:
-                    st.image(st.session_state['img_final'], caption="Procesada por IA", use_container_width=True)
+                if (st.session_state['analyzed']
+                        and st.session_state.get('archivo_analizado') == "+".join(f.file_id for f in fotos)):
+                    metricas = st.session_state['metricas_panorama']
+                    m1, m2, m3, m4 = st.columns(4)
+                    m1.metric("Fotos alineadas", f"{metricas['fotos_alineadas']}/{metricas['fotos']}")
+                    m2.metric("Productos únicos", metricas['productos'])
+                    m3.metric("Duplicados fusionados", metricas['duplicados_fusionados'])
+                    m4.metric("Registro vs detección", f"{metricas['segundos_registro']}s / "
+                                                       f"{metricas['segundos_deteccion']}s")
+                    for i in metricas['fotos_sin_alinear']:
+                        st.warning(f"{fotos[i].name} no se pudo alinear con las demás: se audita sola.")
+                    st.image(st.session_state['img_final'], caption="Panorama procesado por IA",
+                             use_container_width=True)
+                else:
+                    st.info("👆 Presiona el botón rojo para alinear las fotos y auditar la góndola.")
+            elif es_video:
+                st.video(uploaded_file)
+                if st.button("🚀 PROCESAR VIDEO", use_container_width=True):
+                    analizar_video(model, uploaded_file, conf, fps_video)
+                    st.rerun()
+                if st.session_state['analyzed'] and st.session_state.get('archivo_analizado') == uploaded_file.file_id:
+                    metricas = st.session_state['metricas_video']
+                    m1, m2, m3, m4 = st.columns(4)
+                    m1.metric("Productos únicos", metricas['productos'])
+                    m2.metric("Frames analizados", metricas['frames_analizados'])
+                    m3.metric("Frames duplicados", metricas['frames_duplicados'])
+                    m4.metric("Velocidad", f"{metricas['velocidad_vs_tiempo_real']}x")
+                else:
+                    st.info("👆 Presiona el botón rojo para recorrer el video.")
             else:
-                st.info("👆 Presiona el botón rojo para iniciar.")
+                if st.button("🚀 PROCESAR IMAGEN", use_container_width=True):
+                    with st.spinner("Analizando espectro de color y objetos..."):
+                        imagen, escala = abrir_imagen_trabajo(uploaded_file, tiles)
+                        detecciones, clave = cache_detecciones.detectar_botellas_cache(
+                            model, cache, imagen, uploaded_file.getvalue(), conf, tiles=tiles, escala=escala)
+                        st.session_state['clave_cache'] = clave
+                        st.session_state['archivo_analizado'] = uploaded_file.file_id
+                        guardar_analisis(imagen, escala, detecciones, conf, familias, uploaded_file.name)
+                        st.rerun()
+                elif (st.session_state['analyzed'] and st.session_state.get('conf_analizada') != conf
+                      and st.session_state.get('archivo_analizado') == uploaded_file.file_id):
+                    # Cambió la sensibilidad: filtrar las cajas guardadas sin volver a correr YOLO
+                    detecciones = cache.obtener(st.session_state.get('clave_cache'), conf)
+                    if detecciones is not None:
+                        imagen, escala = abrir_imagen_trabajo(uploaded_file, tiles)
+                        guardar_analisis(imagen, escala, detecciones, conf, familias, uploaded_file.name)
+
+                if st.session_state['analyzed'] and st.session_state['img_final'] is not None:
+                    c1, c2 = st.columns(2)
+                    with c1:
+                        st.image(st.session_state['img_original'], caption="Imagen Original", use_container_width=True)
+                    with c2:
+                        st.image(st.session_state['img_final'], caption="Procesada por IA", use_container_width=True)
+                else:
+                    st.info("👆 Presiona el botón rojo para iniciar.")
 
         # --- TAB 2: DATOS ---
         with tab_data:
             if st.session_state['analyzed'] and st.session_state['data_marketing']:
-                df = pd.DataFrame(st.session_state['data_marketing'])
-                
-                # Cálculos
-                df_res = df.groupby("Marca")["Area"].sum().reset_index()
-                df_res["Share (%)"] = ((df_res["Area"] / df_res["Area"].sum()) * 100).round(1)
-                df_res = df_res.sort_values("Share (%)", ascending=False)
-                ganador = df_res.iloc[0]
+                reporte = st.session_state['reporte']
+                with perfilado.etapa('reporte.share'):
+                    df_res = reporte.share
+                    ganador = reporte.lider
 
                 # KPIs (Tarjetas Oscuras)
                 k1, k2, k3 = st.columns(3)
-                k1.metric("Productos", f"{len(df)}")
+                k1.metric("Productos", f"{reporte.productos}")
                 k2.metric("Líder", ganador['Marca'])
                 k3.metric("Dominio", f"{ganador['Share (%)']}%")
                 
@@ -215,33 +386,18 @@ def main():
                 
                 with c_izq:
                     st.subheader("Market Share")
-                    fig = px.pie(
-                        df_res, 
-                        values='Area', 
-                        names='Marca',
-                        hole=0.5,
-                        color='Marca',
-                        color_discrete_map={
-                            "Familia Coca-Cola": "#E60012",
-                            "Familia PepsiCo": "#004B93",
-                            "Otros / Genérico": "#808080"
-                        }
-                    )
-                    # Ajuste para fondo transparente en modo oscuro
-                    fig.update_layout(
-                        paper_bgcolor="rgba(0,0,0,0)",
-                        plot_bgcolor="rgba(0,0,0,0)",
-                        font_color="white",
-                        margin=dict(t=30, b=0, l=0, r=0)
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
+                    with perfilado.etapa('reporte.grafico'):
+                        st.plotly_chart(reporte.figura, use_container_width=True)
 
                 with c_der:
                     st.subheader("Valorización")
                     precio = st.number_input("Precio Unitario Estimado ($)", value=1500, step=100)
-                    st.success(f"**Total en Góndola:**\n# $ {len(df) * precio:,.0f}")
+                    st.success(f"**Total en Góndola:**\n# $ {reporte.productos * precio:,.0f}")
                     st.dataframe(df_res[["Marca", "Share (%)"]], hide_index=True, use_container_width=True)
 
+                if reporte.estantes is not None:
+                    panel_estantes(reporte.estantes)
+
             else:
                 st.warning("⚠️ Procesa la imagen primero.")
 
@@ -249,15 +405,24 @@ def main():
         with tab_export:
             if st.session_state['analyzed']:
                 st.markdown("### 📥 Descargar Datos")
-                df = pd.DataFrame(st.session_state['data_marketing'])
-                csv = df.to_csv(index=False).encode('utf-8')
-                st.download_button("📄 Bajar CSV", data=csv, file_name='stockvision_report.csv', mime='text/csv')
+                # Los archivos se generan al hacer clic (una vez por análisis), no en cada rerun
+                reporte = st.session_state['reporte']
+                col_csv, col_excel = st.columns(2)
+                col_csv.download_button("📄 Bajar CSV", data=lambda: reporte.csv, file_name='stockvision_report.csv',
+                                        mime='text/csv', use_container_width=True)
+                if reporte_gerencial.EXCEL_DISPONIBLE:
+                    col_excel.download_button("📊 Bajar Excel", data=lambda: reporte.excel,
+                                              file_name='stockvision_report.xlsx', use_container_width=True,
+                                              mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+                panel_historial()
             else:
                 st.info("Nada para exportar aún.")
 
     else:
         st.info("Esperando imagen...")
 
+    panel_memoria()
+
     # --- FOOTER (TU TEXTO PERSONALIZADO) ---
     st.markdown("---")
     st.markdown(
@@ -271,5 +436,83 @@ def main():
         unsafe_allow_html=True
     )
 
+# --- 5. HISTORIAL POR TIENDA (ALMACEN DE DETECCIONES) ---
+DIAS_HISTORIAL = 30  # Ventana del resumen por tienda en la pestaña Exportar
+
+def panel_historial():
+    from almacen_detecciones import AlmacenDetecciones
+
+    st.divider()
+    st.markdown("### 🗄️ Historial por Tienda")
+    almacen = AlmacenDetecciones()
+    col_tienda, col_boton = st.columns([3, 1])
+    tienda = col_tienda.text_input("Tienda", placeholder="Sucursal Centro", label_visibility="collapsed")
+    guardado = st.session_state.get('analisis_guardado')
+    if col_boton.button("💾 Guardar auditoría", disabled=not tienda or guardado is not None,
+                        use_container_width=True):
+        st.session_state['analisis_guardado'] = almacen.guardar(st.session_state['filas_almacen'], tienda)
+        st.rerun()
+    if guardado is not None:
+        st.success(f"Auditoría guardada en el historial ({len(st.session_state['filas_almacen'])} productos).")
+
+    desde = datetime.now() - timedelta(days=DIAS_HISTORIAL)
+    with perfilado.etapa('historial'):
+        df_historial = almacen.share(('tienda',), desde=desde)
+    if len(df_historial):
+        st.caption(f"Share of Shelf por tienda, últimos {DIAS_HISTORIAL} días")
+        tabla = df_historial.pivot_table(index='tienda', columns='Marca', values='Share (%)', fill_value=0)
+        st.dataframe(tabla, use_container_width=True)
+
+# --- 6. PANEL DE PERFILADO (STOCKVISION_PERFIL=1) ---
+def panel_perfilado(trazas):
+    import pandas as pd
+
+    with st.sidebar:
+        st.divider()
+        st.subheader("⏱️ Perfilado")
+        st.caption("Milisegundos por etapa en las últimas ejecuciones de la página")
+        recientes = list(trazas)[-5:]
+        df_etapas = pd.DataFrame({t.nombre: t.etapas() for t in recientes})
+        df_etapas = df_etapas.reindex([e for e in df_etapas.index if e != "total"] + ["total"])
+        st.dataframe(df_etapas.fillna(0), use_container_width=True)
+        st.download_button("📄 Bajar traza (Chrome)", data=json.dumps(perfilado.chrome_trace(trazas), default=str),
+                           file_name='stockvision_traza.json', mime='application/json')
+
+# --- 7. MEMORIA DE LA SESIÓN ---
+def panel_memoria():
+    tamanios = imagen_liviana.memoria_sesion(st.session_state)
+    total = sum(b for _, b in tamanios) / 1024**2
+    with st.sidebar:
+        with st.expander(f"🧠 Memoria de la sesión: {total:.1f} MB"):
+            st.markdown("| Clave | KB |\n|---|---:|\n" + "\n".join(f"| {clave} | {b / 1024:,.1f} |"
+                                                          for clave, b in tamanios))
+
+# --- 8. ESTANTES Y FRENTES VACÍOS ---
+def panel_estantes(estantes):
+    # Share por estante y huecos del planograma (estantes_gondola.py), calculados una vez por análisis
+    st.divider()
+    st.subheader("Por Estante")
+    with perfilado.etapa('reporte.estantes'):
+        resumen, share, huecos = estantes.resumen, estantes.share, estantes.huecos
+    e1, e2 = st.columns(2)
+    e1.metric("Estantes", estantes.cantidad)
+    e2.metric("Frentes vacíos", sum(h["Frentes vacios"] for h in huecos))
+    c_resumen, c_share = st.columns([1, 1.5])
+    c_resumen.dataframe(resumen, hide_index=True, use_container_width=True)
+    c_share.dataframe(share, hide_index=True, use_container_width=True)
+    if huecos:
+        st.warning("Frentes vacíos: " + ", ".join(f"estante {h['Estante']} ({h['Frentes vacios']})" for h in huecos))
+
 if __name__ == "__main__":
-    main()
+    if perfilado.ACTIVO:
+        trazas = st.session_state.setdefault('trazas', deque(maxlen=perfilado.MAX_TRAZAS))
+        ejecucion = st.session_state.get('ejecuciones', 0) + 1
+        st.session_state['ejecuciones'] = ejecucion
+        with perfilado.traza(f"Ejecución {ejecucion}") as traza_actual:
+            try:
+                main()
+            finally:
+                trazas.append(traza_actual)
+        panel_perfilado(trazas)
+    else:
+        main()
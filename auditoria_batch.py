@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Auditoria Batch de Gondolas (sin interfaz)
+Proyecto Integrador - IFTS24
+
+Procesa carpetas completas de fotos con el mismo pipeline de app.py:
+la decodificacion de JPEG corre en un pool de hilos mientras YOLO
+procesa lotes, y se escriben resultados por imagen, por estante (share,
+frentes y huecos) y agregados.
+
+Uso:
+    python auditoria_batch.py fotos/ --salida resultados/
+    python auditoria_batch.py manifiesto.txt --batch 16 --threads 32
+    python auditoria_batch.py fotos/ --backend onnx --modelo best.onnx
+    python auditoria_batch.py fotos/ --perfil   (traza_chrome.json por etapas)
+    python auditoria_batch.py fotos/ --tienda "Sucursal Centro"   (agrega las detecciones al almacen)
+    (sin --batch / --threads se usan los de ajuste_inferencia.json si se corrio autoajuste.py)
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+
+import backends_inferencia
+import deteccion
+import estantes_gondola
+import perfilado
+
+EXTENSIONES = {'.jpg', '.jpeg', '.png'}
+
+
+def listar_imagenes(entrada):
+    """Devuelve las rutas a procesar desde una carpeta o un manifiesto (una ruta por linea)."""
+    entrada = Path(entrada)
+    if entrada.is_dir():
+        return sorted(p for p in entrada.rglob('*') if p.suffix.lower() in EXTENSIONES)
+
+    rutas = []
+    with open(entrada, 'r', encoding='utf-8') as f:
+        for linea in f:
+            linea = linea.strip()
+            if not linea or linea.startswith('#'):
+                continue
+            # Manifiestos CSV: la ruta es la primera columna
+            ruta = Path(linea.split(',')[0].strip())
+            if not ruta.is_absolute():
+                ruta = entrada.parent / ruta
+            rutas.append(ruta)
+    return rutas
+
+
+def decodificar(ruta):
+    """Decodifica en un hilo del pool: RGB para el color y BGR para YOLO."""
+    try:
+        img_rgb = deteccion.cargar_imagen(ruta)
+        return ruta, img_rgb, cv2.cvtColor(img_rgb, cv2.COLOR_RGB2BGR), None
+    except Exception as e:
+        return ruta, None, None, str(e)
+
+
+def iterar_lotes(rutas, batch_size, workers):
+    """
+    Genera lotes de imagenes decodificadas. Mantiene en vuelo a lo sumo
+    2 lotes de decodificacion para acotar la memoria.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pendientes = deque()
+        rutas = iter(rutas)
+        lote = []
+
+        def encolar():
+            while len(pendientes) < 2 * batch_size:
+                ruta = next(rutas, None)
+                if ruta is None:
+                    return
+                pendientes.append(pool.submit(decodificar, ruta))
+
+        encolar()
+        while pendientes:
+            lote.append(pendientes.popleft().result())
+            encolar()
+            if len(lote) == batch_size:
+                yield lote
+                lote = []
+        if lote:
+            yield lote
+
+
+def auditar(rutas, model, conf=0.25, batch_size=8, workers=4, trazas=None):
+    """
+    Corre el pipeline completo. Devuelve (filas_detecciones, resumen_imagenes,
+    errores, estantes), con estantes = {"share": filas por imagen, estante y
+    marca, "huecos": frentes vacios por imagen}. Con el perfilado activo
+    agrega a `trazas` una traza por lote.
+    """
+    filas = []
+    resumen = []
+    errores = []
+    estantes = {"share": [], "huecos": []}
+    familias = deteccion.familias_modelo(model)  # None: YOLO generico, la marca sale del color
+
+    lotes = iterar_lotes(rutas, batch_size, workers)
+    for numero in itertools.count(1):
+        with perfilado.traza(f"Lote {numero}") as traza:
+            with perfilado.etapa('esperar_decodificacion'):
+                lote = next(lotes, None)
+            if lote is None:
+                break
+            if traza is not None and trazas is not None:
+                trazas.append(traza)
+
+            validas = []
+            for ruta, img_rgb, img_bgr, error in lote:
+                if error:
+                    errores.append({"imagen": str(ruta), "error": error})
+                else:
+                    validas.append((ruta, img_rgb, img_bgr))
+            if not validas:
+                continue
+
+            detecciones_lote = deteccion.detectar_botellas(model, [v[2] for v in validas], conf=conf)
+
+            for (ruta, img_rgb, _), detecciones in zip(validas, detecciones_lote):
+                with perfilado.etapa('imagen', imagen=str(ruta)):
+                    data, _, indices = deteccion.analizar_detecciones(img_rgb, detecciones, dibujar=False,
+                                                                      familias=familias)
+                    filas.extend(deteccion.filas_detecciones(data, detecciones, indices, ruta))
+
+                    with perfilado.etapa('estantes'):
+                        gondola = estantes_gondola.EstantesGondola(detecciones[indices], [d["Marca"] for d in data])
+                        estantes["share"].extend({"imagen": str(ruta), **f} for f in gondola.share)
+                        estantes["huecos"].extend({"imagen": str(ruta), **h} for h in gondola.huecos)
+
+                    por_imagen = {"imagen": str(ruta), "productos": len(data), "estantes": gondola.cantidad,
+                                  "frentes_vacios": sum(h["Frentes vacios"] for h in gondola.huecos)}
+                    if data:
+                        df_res = deteccion.calcular_share(data)
+                        por_imagen.update({f"Share {m} (%)": s for m, s in zip(df_res["Marca"], df_res["Share (%)"])})
+                    resumen.append(por_imagen)
+
+    return filas, resumen, errores, estantes
+
+
+def escribir_csv(ruta, filas, columnas):
+    """Escribe una lista de diccionarios como CSV (columnas base + las que aparezcan)."""
+    columnas = list(columnas)
+    for fila in filas:
+        columnas.extend(k for k in fila if k not in columnas)
+    with open(ruta, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=columnas)
+        writer.writeheader()
+        writer.writerows(filas)
+
+
+def main():
+    cpus = os.cpu_count() or 1
+
+    parser = argparse.ArgumentParser(description="Auditoria batch de Share of Shelf")
+    parser.add_argument('entrada', help="Carpeta con fotos o manifiesto con una ruta por linea")
+    parser.add_argument('--salida', default='resultados_auditoria', help="Carpeta de resultados")
+    parser.add_argument('--conf', type=float, default=0.25, help="Sensibilidad IA (confianza minima)")
+    parser.add_argument('--batch', type=int, help="Imagenes por llamada a YOLO (por defecto autoajuste u 8)")
+    parser.add_argument('--workers', type=int, default=max(2, cpus // 4),
+                        help="Hilos de decodificacion JPEG")
+    parser.add_argument('--threads', type=int, help="Hilos de inferencia (por defecto autoajuste o todos los nucleos)")
+    parser.add_argument('--backend', choices=backends_inferencia.BACKENDS, help="Runtime de inferencia")
+    parser.add_argument('--modelo', help="Pesos del modelo (.pt, .onnx o carpeta OpenVINO)")
+    parser.add_argument('--tienda', help="Guardar las detecciones en el almacen de detecciones con esta tienda")
+    parser.add_argument('--fecha', help="Fecha para el almacen (AAAA-MM-DD[THH:MM], por defecto ahora)")
+    parser.add_argument('--perfil', action='store_true',
+                        help="Medir cada etapa y guardar traza_chrome.json (igual que STOCKVISION_PERFIL=1)")
+    args = parser.parse_args()
+    ajuste = backends_inferencia.cargar_ajuste('lote', args.backend, args.modelo)
+    args.batch = args.batch or ajuste.get('batch') or 8
+    args.threads = args.threads or ajuste.get('threads') or cpus
+    if args.perfil:
+        perfilado.ACTIVO = True
+
+    print("="*60)
+    print("AUDITORIA BATCH - SHARE OF SHELF")
+    print("="*60)
+
+    rutas = listar_imagenes(args.entrada)
+    if not rutas:
+        print(f"[ERROR] No se encontraron imagenes en {args.entrada}")
+        return
+
+    print(f"Imagenes: {len(rutas)} | Batch: {args.batch} | Decodificacion: {args.workers} hilos | "
+          f"Inferencia: {args.threads} hilos" + (f" | imgsz (autoajuste): {ajuste['imgsz']}" if ajuste else ""))
+
+    model = deteccion.load_generic_model(args.backend, args.modelo, args.threads, uso='lote')
+
+    inicio = time.perf_counter()
+    trazas = []
+    filas, resumen, errores, estantes = auditar(rutas, model, args.conf, args.batch, args.workers, trazas)
+    duracion = time.perf_counter() - inicio
+
+    os.makedirs(args.salida, exist_ok=True)
+    salida = Path(args.salida)
+    escribir_csv(salida / 'detecciones.csv', filas, ["imagen", "Marca", "Area", "confianza"])
+    escribir_csv(salida / 'resumen_imagenes.csv', resumen, ["imagen", "productos"])
+    escribir_csv(salida / 'estantes.csv', estantes["share"],
+                 ["imagen", "Estante", "Marca", "Frentes", "Area", "Share (%)"])
+    escribir_csv(salida / 'huecos.csv', estantes["huecos"], ["imagen", "Estante", "x1", "x2", "Frentes vacios"])
+
+    df_total = deteccion.calcular_share(filas)
+    df_total.to_csv(salida / 'share_total.csv', index=False)
+
+    procesadas = len(resumen)
+    metricas = {
+        "imagenes": len(rutas),
+        "procesadas": procesadas,
+        "errores": errores,
+        "productos": len(filas),
+        "frentes_vacios": sum(h["Frentes vacios"] for h in estantes["huecos"]),
+        "segundos": round(duracion, 3),
+        "imagenes_por_segundo": round(procesadas / duracion, 2) if duracion > 0 else None,
+        "batch": args.batch,
+        "workers": args.workers,
+        "threads": args.threads,
+        "share": df_total.to_dict(orient='records'),
+    }
+    if trazas:
+        perfilado.exportar_chrome(trazas, salida / 'traza_chrome.json')
+        etapas = {}
+        for traza in trazas:
+            for nombre, ms in traza.etapas().items():
+                etapas[nombre] = etapas.get(nombre, 0.0) + ms
+        metricas["etapas_ms_por_imagen"] = {nombre: round(ms / max(procesadas, 1), 1) for nombre, ms in etapas.items()}
+    with open(salida / 'resumen.json', 'w', encoding='utf-8') as f:
+        json.dump(metricas, f, indent=2, ensure_ascii=False)
+
+    if args.tienda:
+        from almacen_detecciones import AlmacenDetecciones
+
+        fecha = datetime.fromisoformat(args.fecha) if args.fecha else None
+        analisis = AlmacenDetecciones().guardar(filas, args.tienda, fecha)
+        print(f"[OK] {len(filas)} detecciones guardadas en el almacen (tienda: {args.tienda}, analisis: {analisis})")
+
+    print(f"\n[OK] {procesadas} imagenes en {duracion:.1f}s ({metricas['imagenes_por_segundo']} img/s)")
+    if errores:
+        print(f"[ERROR] {len(errores)} imagenes no se pudieron leer (ver resumen.json)")
+    print("\nShare of Shelf total:")
+    for _, fila in df_total.iterrows():
+        print(f"  - {fila['Marca']}: {fila['Share (%)']}%")
+    print(f"\nResultados en: {salida}/")
+
+
+if __name__ == "__main__":
+    main()
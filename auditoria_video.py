@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Auditoria de Video (Recorrido de Gondola)
+Proyecto Integrador - IFTS24
+
+Los auditores filman el pasillo caminando. El video se decodifica como un
+stream (memoria acotada), se muestrean frames, se saltan los casi duplicados
+(camara quieta) y las botellas se siguen entre frames para contar cada
+producto fisico una sola vez antes de calcular el Share of Shelf.
+
+Uso:
+    python auditoria_video.py pasillo.mp4 --fps 5 --salida pasillo.csv
+"""
+
+import argparse
+import time
+from collections import Counter
+
+import cv2
+import numpy as np
+
+import deteccion
+
+EXTENSIONES_VIDEO = ('.mp4', '.mov', '.avi', '.mkv')
+FPS_MUESTREO = 5          # Frames analizados por segundo de video
+MAX_LADO = 1280           # Los frames 1080p se reducen antes de analizar
+UMBRAL_DUPLICADO = 2.0    # Diferencia media (0-255) de miniaturas para considerar casi duplicado
+UMBRAL_IOU_TRACK = 0.3
+MIN_APARICIONES = 2       # Frames en los que debe verse una botella para contarla
+MAX_PERDIDOS = 3          # Frames sin ver un track antes de cerrarlo
+LADO_MINIATURA = (160, 90)
+RESPUESTA_MINIMA = 0.1    # Pico de correlacion de fase por debajo del cual se asume velocidad constante
+
+
+def leer_frames(ruta, fps_muestreo=FPS_MUESTREO, max_lado=MAX_LADO):
+    """
+    Generador de frames RGB muestreados: (indice, segundo, frame).
+    Los frames intermedios solo se avanzan con grab(), sin convertirlos.
+    """
+    captura = cv2.VideoCapture(str(ruta))
+    if not captura.isOpened():
+        raise ValueError(f"No se pudo abrir el video: {ruta}")
+
+    fps = captura.get(cv2.CAP_PROP_FPS) or 30.0
+    salto = max(1, round(fps / fps_muestreo)) if fps_muestreo else 1
+    indice = 0
+    try:
+        while True:
+            if not captura.grab():
+                break
+            if indice % salto == 0:
+                ok, frame = captura.retrieve()
+                if not ok:
+                    break
+                alto, ancho = frame.shape[:2]
+                escala = max_lado / max(alto, ancho) if max_lado else 1.0
+                if escala < 1:
+                    frame = cv2.resize(frame, (round(ancho * escala), round(alto * escala)),
+                                       interpolation=cv2.INTER_AREA)
+                yield indice, indice / fps, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            indice += 1
+    finally:
+        captura.release()
+
+
+def duracion_video(ruta):
+    """Duracion en segundos segun los metadatos del contenedor (0 si no se conoce)."""
+    captura = cv2.VideoCapture(str(ruta))
+    try:
+        fps = captura.get(cv2.CAP_PROP_FPS)
+        frames = captura.get(cv2.CAP_PROP_FRAME_COUNT)
+        return frames / fps if fps and frames > 0 else 0.0
+    finally:
+        captura.release()
+
+
+def miniatura(frame):
+    """Miniatura en gris para comparar frames y estimar el desplazamiento de camara."""
+    gris = cv2.cvtColor(cv2.resize(frame, LADO_MINIATURA, interpolation=cv2.INTER_AREA), cv2.COLOR_RGB2GRAY)
+    return gris.astype(np.float32)
+
+
+class RastreadorIoU:
+    """
+    Seguimiento voraz por IoU. Antes de asociar, las cajas de los tracks se
+    desplazan con el movimiento global de camara (correlacion de fase entre
+    miniaturas), que en un recorrido de gondola es casi una traslacion.
+    """
+
+    def __init__(self, umbral_iou=UMBRAL_IOU_TRACK, max_perdidos=MAX_PERDIDOS):
+        self.umbral_iou = umbral_iou
+        self.max_perdidos = max_perdidos
+        self.cajas = np.zeros((0, 4), dtype=np.float32)
+        self.perdidos = np.zeros(0, dtype=int)
+        self.ids = np.zeros(0, dtype=int)
+        self.historial = {}  # id -> {"marcas": Counter, "areas": [], "apariciones": int}
+        self._siguiente_id = 0
+
+    def actualizar(self, cajas, marcas, desplazamiento=(0.0, 0.0)):
+        """Asocia las detecciones del frame a los tracks abiertos."""
+        dx, dy = desplazamiento
+        self.cajas = self.cajas + np.array([dx, dy, dx, dy], dtype=np.float32)
+
+        asignadas = np.full(len(cajas), -1)
+        if len(self.cajas) and len(cajas):
+            iou = deteccion.solapamiento(self.cajas, cajas)
+            # Pares de mayor IoU primero, cada track y cada caja una sola vez
+            pares = np.dstack(np.unravel_index(np.argsort(-iou, axis=None), iou.shape))[0]
+            track_usado = np.zeros(len(self.cajas), dtype=bool)
+            for t, d in pares:
+                if iou[t, d] < self.umbral_iou:
+                    break
+                if track_usado[t] or asignadas[d] >= 0:
+                    continue
+                track_usado[t] = True
+                asignadas[d] = t
+
+        vistos = np.zeros(len(self.cajas), dtype=bool)
+        nuevas_cajas, nuevos_ids = [], []
+        for d, t in enumerate(asignadas):
+            if t >= 0:
+                self.cajas[t] = cajas[d]
+                vistos[t] = True
+                track_id = self.ids[t]
+            else:
+                track_id = self._siguiente_id
+                self._siguiente_id += 1
+                nuevas_cajas.append(cajas[d])
+                nuevos_ids.append(track_id)
+                self.historial[track_id] = {"marcas": Counter(), "areas": [], "apariciones": 0}
+            registro = self.historial[track_id]
+            registro["marcas"][marcas[d]] += 1
+            registro["areas"].append(float((cajas[d, 2] - cajas[d, 0]) * (cajas[d, 3] - cajas[d, 1])))
+            registro["apariciones"] += 1
+
+        self.perdidos = np.where(vistos, 0, self.perdidos + 1)
+        abiertos = self.perdidos <= self.max_perdidos
+        self.cajas = np.concatenate([self.cajas[abiertos], np.asarray(nuevas_cajas, dtype=np.float32).reshape(-1, 4)])
+        self.ids = np.concatenate([self.ids[abiertos], np.asarray(nuevos_ids, dtype=int)])
+        self.perdidos = np.concatenate([self.perdidos[abiertos], np.zeros(len(nuevos_ids), dtype=int)])
+
+    def productos(self, min_apariciones=MIN_APARICIONES):
+        """Un registro {"Marca", "Area"} por producto fisico (marca por votacion, area mediana)."""
+        return [{"Marca": h["marcas"].most_common(1)[0][0], "Area": int(np.median(h["areas"]))}
+                for h in self.historial.values() if h["apariciones"] >= min_apariciones]
+
+
+def auditar_video(model, ruta, conf=0.25, fps_muestreo=FPS_MUESTREO, lote=8,
+                  umbral_duplicado=UMBRAL_DUPLICADO, progreso=None):
+    """
+    Procesa un video completo. Devuelve (data_marketing, metricas).
+    `progreso` es un callback opcional que recibe el segundo de video procesado.
+    """
+    rastreador = RastreadorIoU()
+    familias = deteccion.familias_modelo(model)
+    anterior = None
+    ventana = cv2.createHanningWindow(LADO_MINIATURA, cv2.CV_32F)
+    movimiento = (0.0, 0.0)
+    pendientes = []  # Frames esperando ir en lote a YOLO: (frame, movimiento desde el anterior)
+    metricas = {"frames_muestreados": 0, "frames_duplicados": 0, "frames_analizados": 0, "segundos_video": 0.0}
+
+    def procesar_lote():
+        detecciones_lote = deteccion.detectar_botellas(
+            model, [cv2.cvtColor(f, cv2.COLOR_RGB2BGR) for f, _ in pendientes], conf=conf)
+        for (frame, desplazamiento), detecciones in zip(pendientes, detecciones_lote):
+            data, _, indices = deteccion.analizar_detecciones(frame, detecciones, dibujar=False, familias=familias)
+            rastreador.actualizar(detecciones[indices, :4], [d["Marca"] for d in data], desplazamiento)
+        metricas["frames_analizados"] += len(pendientes)
+        pendientes.clear()
+
+    inicio = time.perf_counter()
+    for _, segundo, frame in leer_frames(ruta, fps_muestreo):
+        metricas["frames_muestreados"] += 1
+        metricas["segundos_video"] = segundo
+        actual = miniatura(frame)
+        if anterior is not None:
+            if np.abs(actual - anterior).mean() < umbral_duplicado:
+                metricas["frames_duplicados"] += 1
+                continue
+            (dx, dy), respuesta = cv2.phaseCorrelate(anterior, actual, ventana)
+            if respuesta >= RESPUESTA_MINIMA:
+                movimiento = (dx * frame.shape[1] / LADO_MINIATURA[0], dy * frame.shape[0] / LADO_MINIATURA[1])
+        anterior = actual
+
+        pendientes.append((frame, movimiento))
+        if len(pendientes) == lote:
+            procesar_lote()
+            if progreso:
+                progreso(segundo)
+    if pendientes:
+        procesar_lote()
+
+    duracion = time.perf_counter() - inicio
+    data_marketing = rastreador.productos()
+    metricas.update({
+        "productos": len(data_marketing),
+        "segundos_proceso": round(duracion, 2),
+        "velocidad_vs_tiempo_real": round(metricas["segundos_video"] / duracion, 2) if duracion > 0 else None,
+    })
+    return data_marketing, metricas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auditoria de Share of Shelf sobre video de gondola")
+    parser.add_argument('video', help="Video del recorrido (mp4, mov, avi, mkv)")
+    parser.add_argument('--fps', type=float, default=FPS_MUESTREO, help="Frames analizados por segundo de video")
+    parser.add_argument('--conf', type=float, default=0.25, help="Sensibilidad IA (confianza minima)")
+    parser.add_argument('--salida', help="CSV con un producto por fila")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("AUDITORIA DE VIDEO - SHARE OF SHELF")
+    print("="*60)
+
+    model = deteccion.load_generic_model(uso='lote')
+    data, metricas = auditar_video(model, args.video, args.conf, args.fps)
+
+    for clave, valor in metricas.items():
+        print(f"  {clave}: {valor}")
+    print("\nShare of Shelf del pasillo:")
+    for _, fila in deteccion.calcular_share(data).iterrows():
+        print(f"  - {fila['Marca']}: {fila['Share (%)']}%")
+
+    if args.salida:
+        import pandas as pd
+        pd.DataFrame(data, columns=["Marca", "Area"]).to_csv(args.salida, index=False)
+        print(f"\nProductos guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Autoajuste de Inferencia en CPU
+Proyecto Integrador - IFTS24
+
+Prueba en la maquina real combinaciones de imgsz, tamanio de lote, hilos de
+inferencia y replicas del modelo en procesos (servidor_modelos.py) sobre
+fotos de gondola de muestra, e informa throughput y latencia de cada una.
+Cada combinacion corre en un proceso aparte (los hilos de torch y la
+afinidad no se pueden cambiar a mitad de camino).
+
+Con los resultados escribe ajuste_inferencia.json con dos configuraciones:
+    app:  una imagen por llamada (lo que hace la app); elige imgsz, hilos y
+          replicas con mas imagenes/segundo (y p95 bajo --latencia-max)
+    lote: un modelo en proceso con lotes (auditoria_batch.py, servicio_api.py,
+          auditoria_video.py); elige imgsz, lote e hilos con mas imagenes/segundo
+Solo se eligen imgsz que conservan al menos --retencion de las detecciones del
+imgsz mas grande. La app y los scripts leen el perfil al arrancar si fue
+medido con el mismo backend y modelo; las variables STOCKVISION_* y los
+argumentos explicitos tienen prioridad.
+
+Uso:
+    python autoajuste.py fotos_sucursal/ --imagenes 16
+    python autoajuste.py --sinteticas 12 --imgsz 480 640 --batch 1 8 --latencia-max 400
+    python autoajuste.py fotos/ --backend onnx --modelo best.onnx
+    (STOCKVISION_AJUSTE=otro_perfil.json cambia el archivo que se escribe y se lee)
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+import backends_inferencia
+import deteccion
+from auditoria_batch import listar_imagenes
+
+IMGSZ_CANDIDATOS = [416, 512, 640]
+LOTES_CANDIDATOS = [1, 4, 8]
+MAX_PROCESOS = 8          # Replicas maximas probadas por defecto
+RETENCION_MINIMA = 0.95   # Fraccion de detecciones (vs el imgsz mayor) que debe conservar un imgsz elegible
+RONDAS = 2                # Pasadas cronometradas sobre las fotos de muestra
+
+
+def nucleos_disponibles():
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def potencias_de_dos(maximo, minimo=1):
+    valores, v = {maximo}, 1
+    while v < maximo:
+        if v >= minimo:
+            valores.add(v)
+        v *= 2
+    return sorted(valores)
+
+
+def configuraciones(imgszs, lotes, hilos, procesos, nucleos):
+    """
+    Combinaciones a probar. Con un proceso se barren los hilos; con replicas
+    los nucleos se reparten en partes iguales (como servidor_modelos) y se
+    prueba solo lote 1, que es como las usa la app.
+    """
+    pares = [(h, 1) for h in hilos if h <= nucleos]
+    pares += [(nucleos // p, p) for p in procesos if 1 < p <= nucleos]
+    combinaciones = []
+    for imgsz in imgszs:
+        for threads, replicas in pares:
+            for lote in (lotes if replicas == 1 else [1]):
+                combinaciones.append({"imgsz": imgsz, "batch": lote, "threads": threads, "procesos": replicas})
+    return combinaciones
+
+
+def medir(rutas, config, backend, modelo, conf, rondas):
+    """Corre en el proceso hijo: carga el modelo con la configuracion y cronometra cada llamada."""
+    import servidor_modelos
+
+    imagenes = [cv2.cvtColor(deteccion.cargar_imagen(r), cv2.COLOR_RGB2BGR) for r in rutas]
+    imgsz, lote, threads, procesos = config["imgsz"], config["batch"], config["threads"], config["procesos"]
+    lotes = [imagenes[i:i+lote] for i in range(0, len(imagenes), lote)]
+
+    inicio = time.perf_counter()
+    if procesos > 1:
+        nucleos = servidor_modelos.nucleos_disponibles()[:procesos * threads]
+        model = servidor_modelos.ServidorModelos(procesos, backend, modelo, nucleos)
+    else:
+        model = deteccion.load_generic_model(backend, modelo, threads)
+    carga = time.perf_counter() - inicio
+
+    try:
+        if procesos > 1:
+            # Calentamiento de todas las replicas a la vez
+            for futuro in [model.enviar(lotes[0], conf=conf, imgsz=imgsz) for _ in range(procesos)]:
+                futuro.result()
+        else:
+            deteccion.detectar_botellas(model, lotes[0], conf=conf, imgsz=imgsz)
+
+        latencias, detecciones = [], []
+        inicio = time.perf_counter()
+        for _ in range(rondas):
+            if procesos > 1:
+                # Tantas llamadas en vuelo como replicas: simula sesiones concurrentes
+                en_vuelo = []
+                for grupo in lotes:
+                    if len(en_vuelo) == procesos:
+                        enviado, futuro = en_vuelo.pop(0)
+                        detecciones.extend(futuro.result())
+                        latencias.append(time.perf_counter() - enviado)
+                    en_vuelo.append((time.perf_counter(), model.enviar(grupo, conf=conf, imgsz=imgsz)))
+                for enviado, futuro in en_vuelo:
+                    detecciones.extend(futuro.result())
+                    latencias.append(time.perf_counter() - enviado)
+            else:
+                for grupo in lotes:
+                    llamada = time.perf_counter()
+                    detecciones.extend(deteccion.detectar_botellas(model, grupo, conf=conf, imgsz=imgsz))
+                    latencias.append(time.perf_counter() - llamada)
+        duracion = time.perf_counter() - inicio
+    finally:
+        if procesos > 1:
+            model.cerrar()
+
+    latencias = np.array(latencias) * 1000
+    return {
+        **config,
+        "carga_s": round(carga, 2),
+        "imagenes_por_segundo": round(len(imagenes) * rondas / duracion, 2),
+        "latencia_p50_ms": round(float(np.percentile(latencias, 50)), 1),
+        "latencia_p95_ms": round(float(np.percentile(latencias, 95)), 1),
+        "ms_por_imagen": round(float(np.percentile(latencias, 50)) / lote, 1),
+        "detecciones_media": round(float(np.mean([len(d) for d in detecciones])), 2),
+    }
+
+
+def elegir(resultados, retencion, latencia_max=None):
+    """Devuelve (config app, config lote) segun throughput, entre las que cumplen retencion y latencia."""
+    mayor = max(resultados, key=lambda r: (r["imgsz"], r["detecciones_media"]))
+    referencia = mayor["detecciones_media"]
+    if referencia > 0:
+        elegibles = [r for r in resultados if r["detecciones_media"] >= retencion * referencia]
+    else:
+        # Sin detecciones en la referencia la retencion no se puede medir (0 >= 0 para todos):
+        # se conserva el imgsz de referencia y solo se ajustan lote, hilos y replicas
+        print(f"[AVISO] El modelo no detecto nada con imgsz={mayor['imgsz']}: no se puede medir la retencion "
+              f"de detecciones. Se mantiene imgsz={mayor['imgsz']}; revisar modelo, --conf o fotos de muestra")
+        elegibles = [r for r in resultados if r["imgsz"] == mayor["imgsz"]]
+
+    app = [r for r in elegibles if r["batch"] == 1]
+    if latencia_max:
+        app = [r for r in app if r["latencia_p95_ms"] <= latencia_max] or app
+    lote = [r for r in elegibles if r["procesos"] == 1]
+
+    mejor_app = max(app, key=lambda r: r["imagenes_por_segundo"], default=None)
+    mejor_lote = max(lote, key=lambda r: r["imagenes_por_segundo"], default=None)
+    campos_app = ("imgsz", "threads", "procesos", "imagenes_por_segundo", "latencia_p95_ms")
+    campos_lote = ("imgsz", "batch", "threads", "imagenes_por_segundo", "latencia_p95_ms")
+    return ({k: mejor_app[k] for k in campos_app} if mejor_app else None,
+            {k: mejor_lote[k] for k in campos_lote} if mejor_lote else None)
+
+
+def fotos_sinteticas(carpeta, cantidad):
+    """Gondolas de benchmarks/gondola_sintetica.py, para probar sin fotos reales."""
+    sys.path.insert(0, str(Path(__file__).resolve().parent / 'benchmarks'))
+    import gondola_sintetica
+
+    gondola_sintetica.guardar_dataset(carpeta, cantidad, 1920, 1080, 12)
+    return sorted((carpeta / 'images').glob('*.jpg'))
+
+
+def main():
+    nucleos = nucleos_disponibles()
+
+    parser = argparse.ArgumentParser(description="Autoajuste de imgsz, lote, hilos y replicas para inferencia en CPU")
+    parser.add_argument('fotos', nargs='?', help="Carpeta o manifiesto con fotos de muestra")
+    parser.add_argument('--sinteticas', type=int, default=12, help="Gondolas sinteticas a usar si no hay fotos")
+    parser.add_argument('--imagenes', type=int, default=16, help="Fotos de muestra maximas")
+    parser.add_argument('--imgsz', type=int, nargs='+', default=IMGSZ_CANDIDATOS)
+    parser.add_argument('--batch', type=int, nargs='+', default=LOTES_CANDIDATOS)
+    parser.add_argument('--threads', type=int, nargs='+', help="Hilos a probar con un proceso (por defecto potencias "
+                        "de 2 desde un cuarto de los nucleos)")
+    parser.add_argument('--procesos', type=int, nargs='+', help="Replicas a probar (por defecto potencias de 2 "
+                        f"hasta {MAX_PROCESOS})")
+    parser.add_argument('--backend', choices=backends_inferencia.BACKENDS, help="Runtime de inferencia")
+    parser.add_argument('--modelo', help="Pesos del modelo (.pt, .onnx o carpeta OpenVINO)")
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--rondas', type=int, default=RONDAS, help="Pasadas cronometradas por configuracion")
+    parser.add_argument('--latencia-max', type=float, help="p95 maximo (ms) para la configuracion de la app")
+    parser.add_argument('--retencion', type=float, default=RETENCION_MINIMA,
+                        help="Fraccion minima de detecciones respecto del imgsz mayor")
+    parser.add_argument('--salida', help=f"Perfil a escribir (por defecto STOCKVISION_AJUSTE o "
+                        f"{backends_inferencia.ARCHIVO_AJUSTE})")
+    parser.add_argument('--configuracion', help=argparse.SUPPRESS)  # Uso interno: proceso hijo
+    args = parser.parse_args()
+
+    backend = args.backend or os.environ.get('STOCKVISION_BACKEND', 'pytorch')
+    modelo = args.modelo or os.environ.get('STOCKVISION_MODELO') or backends_inferencia.MODELOS_POR_DEFECTO[backend]
+
+    if args.configuracion:
+        rutas = listar_imagenes(args.fotos)
+        print(json.dumps(medir(rutas, json.loads(args.configuracion), backend, modelo, args.conf, args.rondas)))
+        return
+
+    print("="*60)
+    print("AUTOAJUSTE DE INFERENCIA EN CPU")
+    print("="*60)
+
+    temporal = Path(tempfile.mkdtemp(prefix='autoajuste_'))
+    try:
+        if args.fotos:
+            rutas = listar_imagenes(args.fotos)[:args.imagenes]
+            if not rutas:
+                print(f"[ERROR] No se encontraron imagenes en {args.fotos}")
+                sys.exit(1)
+        else:
+            rutas = fotos_sinteticas(temporal, min(args.sinteticas, args.imagenes))
+            print(f"[OK] Sin fotos de muestra: {len(rutas)} gondolas sinteticas de 1920x1080")
+        manifiesto = temporal / 'fotos.txt'
+        manifiesto.write_text('\n'.join(str(Path(r).resolve()) for r in rutas), encoding='utf-8')
+
+        hilos = args.threads or potencias_de_dos(nucleos, minimo=max(1, nucleos // 4))
+        procesos = args.procesos or [p for p in potencias_de_dos(min(nucleos, MAX_PROCESOS)) if p > 1]
+        combinaciones = configuraciones(args.imgsz, args.batch, hilos, procesos, nucleos)
+        print(f"Backend: {backend} | Modelo: {modelo} | Nucleos: {nucleos} | Fotos: {len(rutas)} | "
+              f"Configuraciones: {len(combinaciones)}")
+
+        resultados = []
+        for config in combinaciones:
+            etiqueta = (f"imgsz={config['imgsz']} lote={config['batch']} hilos={config['threads']} "
+                        f"procesos={config['procesos']}")
+            comando = [sys.executable, __file__, str(manifiesto), '--configuracion', json.dumps(config),
+                       '--backend', backend, '--modelo', modelo, '--conf', str(args.conf),
+                       '--rondas', str(args.rondas)]
+            try:
+                salida = subprocess.run(comando, capture_output=True, text=True, check=True).stdout
+            except subprocess.CalledProcessError as e:
+                ultima = (e.stderr.strip().splitlines() or ['sin detalle'])[-1]
+                print(f"[ERROR] {etiqueta}: {ultima}")
+                continue
+            r = json.loads(salida.strip().splitlines()[-1])
+            resultados.append(r)
+            print(f"[OK] {etiqueta}: {r['imagenes_por_segundo']} img/s, p95 {r['latencia_p95_ms']} ms")
+    finally:
+        shutil.rmtree(temporal, ignore_errors=True)
+
+    if not resultados:
+        print("[ERROR] Ninguna configuracion se pudo medir")
+        sys.exit(1)
+
+    print(f"\n{'imgsz':>6}{'Lote':>6}{'Hilos':>7}{'Procesos':>10}{'img/s':>8}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'ms/img':>8}{'Detec.':>8}")
+    for r in sorted(resultados, key=lambda r: -r["imagenes_por_segundo"]):
+        print(f"{r['imgsz']:>6}{r['batch']:>6}{r['threads']:>7}{r['procesos']:>10}{r['imagenes_por_segundo']:>8}"
+              f"{r['latencia_p50_ms']:>9}{r['latencia_p95_ms']:>9}{r['ms_por_imagen']:>8}{r['detecciones_media']:>8}")
+
+    app, lote = elegir(resultados, args.retencion, args.latencia_max)
+    perfil = {
+        "fecha": time.strftime('%Y-%m-%d %H:%M:%S'),
+        "backend": backend,
+        "modelo": os.path.abspath(modelo),
+        "cpu": platform.processor() or platform.machine(),
+        "nucleos": nucleos,
+        "fotos": len(rutas),
+        "app": app,
+        "lote": lote,
+        "resultados": resultados,
+    }
+    salida = Path(args.salida or os.environ.get('STOCKVISION_AJUSTE') or backends_inferencia.ARCHIVO_AJUSTE)
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    with open(salida, 'w', encoding='utf-8') as f:
+        json.dump(perfil, f, indent=2)
+
+    print(f"\nApp:  {app}")
+    print(f"Lote: {lote}")
+    print(f"\n[OK] Perfil guardado en {salida} (lo leen app.py, auditoria_batch.py, servicio_api.py y "
+          f"auditoria_video.py al arrancar)")
+
+
+if __name__ == "__main__":
+    main()
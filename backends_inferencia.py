@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Backends de Inferencia para CPU (PyTorch / ONNX Runtime / OpenVINO)
+Proyecto Integrador - IFTS24
+
+Los servidores no tienen GPU: los modelos exportados por
+train_yolo_model.exportar_modelo() se cargan con un runtime optimizado para
+CPU y una cantidad de hilos configurable. Los detectores exportados exponen
+detectar(), que deteccion.detectar_botellas usa en lugar de la llamada a YOLO.
+
+Configuracion por variables de entorno (app y scripts):
+    STOCKVISION_BACKEND=pytorch|onnx|openvino
+    STOCKVISION_MODELO=ruta a los pesos (.pt, .onnx o carpeta *_openvino_model)
+    STOCKVISION_THREADS=hilos de inferencia
+    STOCKVISION_PRECISION=fp32|fp16|int8-dinamico|int8-estatico (variantes ONNX de cuantizar_modelo.py)
+    STOCKVISION_AJUSTE=perfil de autoajuste.py (por defecto ajuste_inferencia.json)
+"""
+
+import ast
+import json
+import os
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image
+
+import perfilado
+
+BACKENDS = ('pytorch', 'onnx', 'openvino')
+MODELOS_POR_DEFECTO = {
+    'pytorch': 'yolov8n.pt',
+    'onnx': 'yolov8n.onnx',
+    'openvino': 'yolov8n_openvino_model',
+}
+IMGSZ = 640
+IOU_NMS = 0.7      # Mismo valor por defecto que ultralytics
+MAX_DET = 300
+COLOR_RELLENO = 114
+ARCHIVO_AJUSTE = 'ajuste_inferencia.json'  # Perfil que escribe autoajuste.py
+# Sufijo del .onnx de cada precision junto a los pesos (best.pt -> best_int8_estatico.onnx)
+SUFIJOS_PRECISION = {
+    'fp32': '',
+    'fp16': '_fp16',
+    'int8-dinamico': '_int8',  # El mismo que deja train_yolo_model.exportar_modelo()
+    'int8-estatico': '_int8_estatico',
+}
+PRECISIONES = tuple(SUFIJOS_PRECISION)
+
+
+def letterbox(img_bgr, imgsz=IMGSZ, rect=False, stride=32):
+    """
+    Redimensiona manteniendo proporcion y rellena a imgsz x imgsz (o, con rect,
+    solo hasta el siguiente multiplo de stride). Devuelve (img, escala, (pad_x, pad_y)).
+    """
+    alto, ancho = img_bgr.shape[:2]
+    escala = min(imgsz / alto, imgsz / ancho)
+    nuevo_ancho, nuevo_alto = round(ancho * escala), round(alto * escala)
+    if (nuevo_ancho, nuevo_alto) != (ancho, alto):
+        img_bgr = cv2.resize(img_bgr, (nuevo_ancho, nuevo_alto), interpolation=cv2.INTER_LINEAR)
+    pad_x, pad_y = imgsz - nuevo_ancho, imgsz - nuevo_alto
+    if rect:
+        pad_x, pad_y = pad_x % stride, pad_y % stride
+    pad_x, pad_y = pad_x / 2, pad_y / 2
+    arriba, izquierda = round(pad_y - 0.1), round(pad_x - 0.1)
+    abajo, derecha = round(pad_y + 0.1), round(pad_x + 0.1)
+    img_bgr = cv2.copyMakeBorder(img_bgr, arriba, abajo, izquierda, derecha, cv2.BORDER_CONSTANT,
+                                 value=(COLOR_RELLENO,) * 3)
+    return img_bgr, escala, (izquierda, arriba)
+
+
+def imgsz_modelo(model):
+    """imgsz al que corre el modelo si la llamada no pasa uno (el del perfil de autoajuste, si se aplico)."""
+    return getattr(model, 'imgsz', None) or getattr(model, 'overrides', {}).get('imgsz') or IMGSZ
+
+
+def preparar_lote(imagenes_bgr, imgsz=IMGSZ, rect=False):
+    """Tensor (N, 3, imgsz, imgsz) RGB en 0-1 que esperan los modelos exportados y el letterbox de cada imagen."""
+    preparadas = [letterbox(img, imgsz, rect) for img in imagenes_bgr]
+    tensor = np.stack([p[0] for p in preparadas])[..., ::-1].transpose(0, 3, 1, 2)
+    return np.ascontiguousarray(tensor, dtype=np.float32) / 255.0, preparadas
+
+
+def ruta_precision(ruta, precision):
+    """Ruta del .onnx de `precision` que cuantizar_modelo.py deja al lado de los pesos `ruta` (.pt u .onnx)."""
+    if precision not in SUFIJOS_PRECISION:
+        raise ValueError(f"Precision desconocida: {precision} (opciones: {', '.join(PRECISIONES)})")
+    ruta = Path(ruta)
+    base = ruta.stem
+    for sufijo in sorted(filter(None, SUFIJOS_PRECISION.values()), key=len, reverse=True):
+        if ruta.suffix == '.onnx' and base.endswith(sufijo):
+            base = base[:-len(sufijo)]  # Ya es una variante: se parte del modelo FP32
+            break
+    return str(ruta.with_name(base + SUFIJOS_PRECISION[precision] + '.onnx'))
+
+
+def resolver_precision(backend=None, ruta=None, precision=None):
+    """
+    (backend, ruta) a cargar para `precision` (por defecto STOCKVISION_PRECISION).
+    En FP32 no cambia nada; las demas precisiones son variantes ONNX, asi que
+    pasan al backend onnx con el archivo de la variante.
+    """
+    backend = backend or os.environ.get('STOCKVISION_BACKEND', 'pytorch')
+    ruta = ruta or os.environ.get('STOCKVISION_MODELO') or MODELOS_POR_DEFECTO.get(backend, '')
+    precision = precision or os.environ.get('STOCKVISION_PRECISION', 'fp32')
+    if precision == 'fp32':
+        return backend, ruta
+    if backend == 'openvino':
+        raise ValueError("Las variantes de precision son ONNX: usar el backend pytorch u onnx")
+    variante = ruta_precision(ruta, precision)
+    if not os.path.exists(variante):
+        raise FileNotFoundError(f"No existe {variante}: generarlo con python cuantizar_modelo.py --modelo {ruta}")
+    return 'onnx', variante
+
+
+def precisiones_disponibles(backend=None, ruta=None):
+    """Precisiones que se pueden cargar para el modelo: fp32 y las variantes ya generadas."""
+    backend = backend or os.environ.get('STOCKVISION_BACKEND', 'pytorch')
+    ruta = ruta or os.environ.get('STOCKVISION_MODELO') or MODELOS_POR_DEFECTO.get(backend, '')
+    if backend == 'openvino':
+        return ['fp32']
+    return [p for p in PRECISIONES if p == 'fp32' or os.path.exists(ruta_precision(ruta, p))]
+
+
+def _a_bgr(imagen):
+    """Misma convencion que ultralytics: PIL en RGB, arrays en BGR, rutas se leen del disco."""
+    if isinstance(imagen, (str, Path)):
+        return cv2.imread(str(imagen))
+    if isinstance(imagen, Image.Image):
+        return cv2.cvtColor(np.asarray(imagen.convert('RGB')), cv2.COLOR_RGB2BGR)
+    return imagen
+
+
+class DetectorExportado:
+    """Pre y post-procesamiento YOLOv8 comun a los runtimes exportados."""
+
+    imgsz = IMGSZ
+    imgsz_fijo = False  # True si el modelo se exporto con tamanio de entrada estatico
+    lote_fijo = None    # Tamanio de lote si el modelo se exporto sin ejes dinamicos
+    names = None        # {id: clase} guardado por ultralytics al exportar
+
+    def _inferir(self, tensor):
+        raise NotImplementedError
+
+    def detectar(self, imagenes, conf=0.25, classes=None, iou=IOU_NMS, max_det=MAX_DET, imgsz=None, **kwargs):
+        """Devuelve, por imagen, un array (N, 6): x1, y1, x2, y2, confianza, clase."""
+        if not isinstance(imagenes, (list, tuple)):
+            imagenes = [imagenes]
+        imagenes = [_a_bgr(img) for img in imagenes]
+        imgsz = self.imgsz if self.imgsz_fijo else (imgsz or self.imgsz)
+        # Con entrada dinamica y un lote de igual forma alcanza con rellenar a multiplo de 32
+        rect = not self.imgsz_fijo and len({img.shape for img in imagenes}) == 1
+
+        with perfilado.etapa('yolo.preproceso'):
+            tensor, preparadas = preparar_lote(imagenes, imgsz, rect)
+
+        with perfilado.etapa('yolo.inferencia'):
+            if self.lote_fijo:
+                salidas = np.concatenate([self._inferir(tensor[i:i+self.lote_fijo])
+                                          for i in range(0, len(tensor), self.lote_fijo)])
+            else:
+                salidas = self._inferir(tensor)
+
+        with perfilado.etapa('yolo.postproceso'):
+            return [self._postprocesar(pred, img.shape[:2], escala, pad, conf, classes, iou, max_det)
+                    for pred, img, (_, escala, pad) in zip(salidas, imagenes, preparadas)]
+
+    def _postprocesar(self, pred, forma, escala, pad, conf, classes, iou, max_det):
+        """Decodifica la salida (4 + nc, anclas), filtra, aplica NMS y vuelve a coordenadas originales."""
+        pred = pred.T
+        puntajes = pred[:, 4:]
+        # Como ultralytics: la mejor clase de cada ancla sobre todas las clases, luego el filtro
+        clase = puntajes.argmax(axis=1)
+        confianza = puntajes[np.arange(len(puntajes)), clase]
+
+        filtro = confianza >= conf
+        if classes is not None:
+            filtro &= np.isin(clase, classes)
+        if not filtro.any():
+            return np.zeros((0, 6), dtype=np.float32)
+        cxcywh, confianza, clase = pred[filtro, :4], confianza[filtro], clase[filtro]
+
+        xywh = cxcywh.copy()
+        xywh[:, :2] -= cxcywh[:, 2:] / 2
+        indices = cv2.dnn.NMSBoxesBatched(xywh.tolist(), confianza.tolist(), clase.tolist(), conf, iou)
+        indices = np.asarray(indices, dtype=int).ravel()[:max_det]
+
+        cajas = xywh[indices]
+        cajas[:, 2:] += cajas[:, :2]
+        cajas[:, [0, 2]] = (cajas[:, [0, 2]] - pad[0]) / escala
+        cajas[:, [1, 3]] = (cajas[:, [1, 3]] - pad[1]) / escala
+        cajas[:, [0, 2]] = cajas[:, [0, 2]].clip(0, forma[1])
+        cajas[:, [1, 3]] = cajas[:, [1, 3]].clip(0, forma[0])
+
+        return np.column_stack([cajas, confianza[indices], clase[indices]]).astype(np.float32)
+
+
+class DetectorONNX(DetectorExportado):
+    """Modelo YOLOv8 exportado a ONNX, ejecutado con ONNX Runtime en CPU."""
+
+    def __init__(self, ruta, threads=None):
+        import onnxruntime as ort
+
+        opciones = ort.SessionOptions()
+        opciones.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        opciones.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        if threads:
+            opciones.intra_op_num_threads = threads
+            opciones.inter_op_num_threads = 1
+
+        self.ckpt_path = str(ruta)
+        self.sesion = ort.InferenceSession(str(ruta), opciones, providers=['CPUExecutionProvider'])
+        entrada = self.sesion.get_inputs()[0]
+        self.nombre_entrada = entrada.name
+        if isinstance(entrada.shape[2], int):
+            self.imgsz, self.imgsz_fijo = entrada.shape[2], True
+        if isinstance(entrada.shape[0], int):
+            self.lote_fijo = entrada.shape[0]
+        nombres = self.sesion.get_modelmeta().custom_metadata_map.get('names')
+        if nombres:
+            self.names = ast.literal_eval(nombres)
+
+    def _inferir(self, tensor):
+        return self.sesion.run(None, {self.nombre_entrada: tensor})[0]
+
+
+class DetectorOpenVINO(DetectorExportado):
+    """Modelo YOLOv8 exportado a OpenVINO IR, compilado para CPU."""
+
+    def __init__(self, ruta, threads=None):
+        import openvino as ov
+
+        ruta = Path(ruta)
+        xml = next(ruta.glob('*.xml')) if ruta.is_dir() else ruta
+        self.ckpt_path = str(xml)
+
+        core = ov.Core()
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if threads:
+            config["INFERENCE_NUM_THREADS"] = threads
+        modelo = core.read_model(str(xml))
+        forma = modelo.inputs[0].get_partial_shape()
+        if forma[2].is_static:
+            self.imgsz, self.imgsz_fijo = forma[2].get_length(), True
+        if forma[0].is_static:
+            self.lote_fijo = forma[0].get_length()
+        metadata = xml.parent / 'metadata.yaml'
+        if metadata.exists():
+            import yaml
+
+            with open(metadata, 'r', encoding='utf-8') as f:
+                self.names = (yaml.safe_load(f) or {}).get('names')
+        self.compilado = core.compile_model(modelo, 'CPU', config)
+
+    def _inferir(self, tensor):
+        return self.compilado(tensor)[0]
+
+
+def cargar_ajuste(uso, backend=None, ruta=None, precision=None):
+    """
+    Configuracion medida por autoajuste.py para `uso` ('app' o 'lote'): imgsz,
+    hilos, lote y replicas. Devuelve {} si no hay perfil o si se midio con
+    otro backend o modelo (la variante de precision cuenta como otro modelo).
+    """
+    archivo = os.environ.get('STOCKVISION_AJUSTE', ARCHIVO_AJUSTE)
+    try:
+        with open(archivo, 'r', encoding='utf-8') as f:
+            perfil = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    try:
+        backend, ruta = resolver_precision(backend, ruta, precision)
+    except (ValueError, OSError):
+        return {}  # cargar_modelo informa el error
+    if perfil.get('backend') != backend or perfil.get('modelo') != os.path.abspath(ruta):
+        return {}
+    return perfil.get(uso) or {}
+
+
+def cargar_modelo(backend=None, ruta=None, threads=None, uso=None, precision=None):
+    """
+    Carga el modelo con el backend y la precision pedidos (por defecto, segun
+    las variables de entorno). Con `uso`, los hilos y el imgsz que falten salen
+    del perfil de autoajuste.
+    """
+    backend, ruta = resolver_precision(backend, ruta, precision)
+    ajuste = cargar_ajuste(uso, backend, ruta, 'fp32') if uso else {}
+    threads = threads or int(os.environ.get('STOCKVISION_THREADS', 0)) or ajuste.get('threads')
+    imgsz = ajuste.get('imgsz')
+
+    if backend == 'onnx':
+        modelo = DetectorONNX(ruta, threads)
+    elif backend == 'openvino':
+        modelo = DetectorOpenVINO(ruta, threads)
+    elif backend != 'pytorch':
+        raise ValueError(f"Backend desconocido: {backend} (opciones: {', '.join(BACKENDS)})")
+    else:
+        import torch
+        from ultralytics import YOLO
+
+        if threads:
+            torch.set_num_threads(threads)
+        modelo = YOLO(ruta)
+
+    if imgsz:
+        # Un imgsz pasado en la llamada (tiles) sigue teniendo prioridad
+        if not isinstance(modelo, DetectorExportado):
+            modelo.overrides['imgsz'] = imgsz
+        elif not modelo.imgsz_fijo:
+            modelo.imgsz = imgsz
+    return modelo
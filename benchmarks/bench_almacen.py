@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Almacen Columnar de Detecciones
+Proyecto Integrador - IFTS24
+
+Llena un almacen temporal (almacen_detecciones.py) con millones de
+detecciones sinteticas repartidas entre tiendas y dias, y mide las
+consultas de Share of Shelf tipicas (por tienda, por tienda y semana, una
+tienda en un mes, filtro de marcas y confianza) en tres estados: sin
+compactar (un archivo por tanda de auditorias), con la compactacion
+automatica de los dias cerrados (lo normal) y todo compactado. Informa la
+mediana de varias repeticiones de cada consulta.
+
+Uso:
+    python benchmarks/bench_almacen.py
+    python benchmarks/bench_almacen.py --detecciones 10000000 --tiendas 200 --dias 365 --archivos-por-dia 50
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from almacen_detecciones import ESQUEMA, AlmacenDetecciones  # noqa: E402
+
+MARCAS = ["Familia Coca-Cola", "Familia PepsiCo", "Otros / Genérico"]
+INICIO = datetime(2026, 1, 1)
+ESTADOS = ['sin_compactar', 'automatica', 'compactado']
+
+
+def llenar(almacen, detecciones, tiendas, dias, archivos_por_dia, semilla=0):
+    """Escribe `detecciones` filas: cada archivo es una tanda de auditorias del mismo dia."""
+    rng = np.random.default_rng(semilla)
+    nombres_tiendas = np.array([f"Sucursal {i:03d}" for i in range(tiendas)], dtype=object)
+    por_archivo = max(1, detecciones // (dias * archivos_por_dia))
+    escritas = 0
+    for dia in range(dias):
+        base = np.datetime64(INICIO + timedelta(days=dia), 's')
+        for archivo in range(archivos_por_dia):
+            n = min(por_archivo, detecciones - escritas)
+            if n <= 0:
+                return escritas
+            x1 = rng.integers(0, 3800, n)
+            y1 = rng.integers(0, 2800, n)
+            ancho = rng.integers(40, 220, n)
+            alto = rng.integers(120, 480, n)
+            columnas = {
+                'analisis': np.full(n, f"{dia:04d}_{archivo:03d}", dtype=object),
+                'tienda': nombres_tiendas[rng.integers(0, tiendas, n)],
+                'fecha': base + rng.integers(8 * 3600, 21 * 3600, n).astype('timedelta64[s]'),
+                'imagen': np.full(n, f"foto_{archivo:03d}.jpg", dtype=object),
+                'marca': np.array(MARCAS, dtype=object)[rng.choice(len(MARCAS), n, p=(0.4, 0.35, 0.25))],
+                'area': ancho * alto,
+                'confianza': rng.uniform(0.1, 1.0, n).astype(np.float32),
+                'x1': x1, 'y1': y1, 'x2': x1 + ancho, 'y2': y1 + alto,
+            }
+            almacen.agregar_tabla(pa.table(columnas).cast(ESQUEMA), nombre=f"tanda_{dia:04d}_{archivo:03d}")
+            escritas += n
+    return escritas
+
+
+def cronometrar(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return round(float(np.median(tiempos)), 1), len(resultado)
+
+
+def consultas(almacen, tiendas, dias):
+    tienda = f"Sucursal {tiendas // 2:03d}"
+    desde = INICIO + timedelta(days=max(0, dias - 30))
+    return {
+        "share por tienda": lambda: almacen.share(('tienda',)),
+        "share por tienda y semana": lambda: almacen.share(('tienda',), 'semana'),
+        "una tienda, ultimos 30 dias": lambda: almacen.share(('tienda',), 'dia', tiendas=[tienda], desde=desde),
+        "total por mes, conf >= 0.5": lambda: almacen.share((), 'mes', conf_minima=0.5),
+        "marcas Coca/Pepsi por tienda": lambda: almacen.share(('tienda',), marcas=MARCAS[:2]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del almacen columnar de detecciones")
+    parser.add_argument('--detecciones', type=int, default=5_000_000)
+    parser.add_argument('--tiendas', type=int, default=100)
+    parser.add_argument('--dias', type=int, default=180)
+    parser.add_argument('--archivos-por-dia', type=int, default=20, help="Tandas de auditorias (archivos) por dia")
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--salida', help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("BENCHMARK - ALMACEN COLUMNAR DE DETECCIONES")
+    print("="*60)
+
+    resultados = {"consultas": {}, "archivos": {}}
+    for estado in ESTADOS:
+        carpeta = Path(tempfile.mkdtemp(prefix='bench_almacen_'))
+        try:
+            almacen = AlmacenDetecciones(carpeta, compactar_automatico=estado != 'sin_compactar')
+            inicio = time.perf_counter()
+            escritas = llenar(almacen, args.detecciones, args.tiendas, args.dias, args.archivos_por_dia)
+            escritura = time.perf_counter() - inicio
+            if estado == 'compactado':
+                almacen.compactar()
+            tamanio = sum(p.stat().st_size for p in carpeta.rglob('*.parquet')) / 1024**2
+            resultados["archivos"][estado] = len(almacen.dataset().files)
+            print(f"[OK] {estado}: {escritas} detecciones escritas en {escritura:.1f}s "
+                  f"({escritas / escritura:,.0f} filas/s), {resultados['archivos'][estado]} archivos, "
+                  f"{tamanio:.0f} MB")
+            for nombre, funcion in consultas(almacen, args.tiendas, args.dias).items():
+                resultados["consultas"].setdefault(nombre, {})[estado] = cronometrar(funcion, args.repeticiones)
+        finally:
+            shutil.rmtree(carpeta, ignore_errors=True)
+    resultados["detecciones"] = escritas
+
+    print(f"\n{'Consulta (ms)':<32}{'Filas':>8}" + "".join(f"{e:>16}" for e in ESTADOS))
+    for nombre, r in resultados["consultas"].items():
+        print(f"{nombre:<32}{r[ESTADOS[0]][1]:>8}" + "".join(f"{r[e][0]:>16}" for e in ESTADOS))
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
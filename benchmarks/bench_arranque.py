@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Arranque en Frio de la App
+Proyecto Integrador - IFTS24
+
+Mide lo que paga un contenedor nuevo antes de atender la primera foto:
+  - Imports del arranque de app.py: los modulos que importa al inicio, en su
+    orden, con el tiempo que agrega cada uno (proceso nuevo).
+  - Modulos diferidos (pandas, plotly, torch, ultralytics): tiempo de import
+    aislado de cada uno y si el arranque los carga o no.
+  - Modelo: import de ultralytics, carga de pesos e inferencia de
+    calentamiento, y latencia de la primera foto con el modelo en frio vs
+    precalentado (lo que hace el hilo de precarga de app.py).
+Cada medicion corre en un proceso aparte para no heredar modulos cargados.
+
+Uso:
+    python benchmarks/bench_arranque.py
+    python benchmarks/bench_arranque.py --modelo best.pt --repeticiones 5 --salida arranque.json
+"""
+
+import argparse
+import ast
+import importlib
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+MODULOS_DIFERIDOS = ['pandas', 'plotly.express', 'torch', 'ultralytics']
+
+
+def imports_app():
+    """Modulos que app.py importa a nivel de modulo, en orden."""
+    arbol = ast.parse((RAIZ / 'app.py').read_text(encoding='utf-8'))
+    modulos = []
+    for nodo in arbol.body:
+        if isinstance(nodo, ast.Import):
+            modulos.extend(alias.name for alias in nodo.names)
+        elif isinstance(nodo, ast.ImportFrom) and nodo.level == 0:
+            modulos.append(nodo.module)
+    return list(dict.fromkeys(modulos))
+
+
+def medir_imports(modulos):
+    """Corre en el proceso hijo: ms que agrega cada import, en orden, y que diferidos quedaron cargados."""
+    tiempos = {}
+    for modulo in modulos:
+        inicio = time.perf_counter()
+        importlib.import_module(modulo)
+        tiempos[modulo] = round((time.perf_counter() - inicio) * 1000, 1)
+    return {"tiempos": tiempos, "cargados": [m for m in MODULOS_DIFERIDOS if m in sys.modules]}
+
+
+def medir_modelo(ruta, calentar):
+    """Corre en el proceso hijo: carga del modelo y latencia de la primera foto."""
+    import cv2
+
+    import gondola_sintetica
+
+    inicio = time.perf_counter()
+    import deteccion  # noqa: F401 (incluido en el tiempo de import)
+    import ultralytics  # noqa: F401
+    resultado = {"import_s": round(time.perf_counter() - inicio, 2)}
+
+    inicio = time.perf_counter()
+    model = deteccion.load_generic_model(ruta=ruta)
+    resultado["carga_s"] = round(time.perf_counter() - inicio, 2)
+    if calentar:
+        inicio = time.perf_counter()
+        deteccion.calentar_modelo(model)
+        resultado["calentamiento_s"] = round(time.perf_counter() - inicio, 2)
+
+    img = cv2.cvtColor(gondola_sintetica.generar_gondola(1920, 1080, 12, 0)[0], cv2.COLOR_RGB2BGR)
+    latencias = []
+    for _ in range(2):
+        inicio = time.perf_counter()
+        deteccion.detectar_botellas(model, img)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    resultado["primera_foto_ms"], resultado["segunda_foto_ms"] = (round(v, 1) for v in latencias)
+    return resultado
+
+
+def correr(argumentos):
+    comando = [sys.executable, __file__] + argumentos
+    salida = subprocess.run(comando, capture_output=True, text=True, check=True, cwd=RAIZ).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def mediana(valores):
+    valores = sorted(valores)
+    return valores[len(valores) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de arranque en frio de la app")
+    parser.add_argument('--modelo', help="Pesos a cargar (por defecto STOCKVISION_MODELO o yolov8n.pt)")
+    parser.add_argument('--repeticiones', type=int, default=3, help="Procesos por medicion (se informa la mediana)")
+    parser.add_argument('--salida', help="Guardar resultados en JSON")
+    parser.add_argument('--imports', nargs='+', help=argparse.SUPPRESS)  # Uso interno: proceso hijo
+    parser.add_argument('--fase-modelo', choices=['frio', 'precalentado'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.imports:
+        print(json.dumps(medir_imports(args.imports)))
+        return
+    if args.fase_modelo:
+        print(json.dumps(medir_modelo(args.modelo, args.fase_modelo == 'precalentado')))
+        return
+
+    print("="*60)
+    print("BENCHMARK - ARRANQUE EN FRIO DE LA APP")
+    print("="*60)
+
+    modulos = imports_app()
+    corridas = [correr(['--imports'] + modulos) for _ in range(args.repeticiones)]
+    secuencia = {m: mediana([c["tiempos"][m] for c in corridas]) for m in modulos}
+    cargados = corridas[0]["cargados"]
+    print(f"[OK] Imports de app.py ({len(modulos)} modulos)")
+
+    aislados = {m: mediana([correr(['--imports', m])["tiempos"][m] for _ in range(args.repeticiones)])
+                for m in MODULOS_DIFERIDOS}
+    print("[OK] Modulos diferidos")
+
+    argumentos_modelo = ['--modelo', args.modelo] if args.modelo else []
+    fases = {fase: correr(['--fase-modelo', fase] + argumentos_modelo) for fase in ('frio', 'precalentado')}
+    print("[OK] Modelo")
+
+    print(f"\n{'Import (arranque de app.py)':<32}{'ms':>10}")
+    for modulo, ms in secuencia.items():
+        print(f"{modulo:<32}{ms:>10}")
+    print(f"{'TOTAL':<32}{round(sum(secuencia.values()), 1):>10}")
+
+    print(f"\n{'Modulo diferido':<32}{'ms aislado':>12}{'En el arranque':>16}")
+    for modulo, ms in aislados.items():
+        print(f"{modulo:<32}{ms:>12}{'si' if modulo in cargados else 'no':>16}")
+
+    frio, caliente = fases['frio'], fases['precalentado']
+    print(f"\n{'Modelo':<32}{'Frio':>10}{'Precalentado':>14}")
+    print(f"{'Import ultralytics (s)':<32}{frio['import_s']:>10}{caliente['import_s']:>14}")
+    print(f"{'Carga de pesos (s)':<32}{frio['carga_s']:>10}{caliente['carga_s']:>14}")
+    print(f"{'Calentamiento (s)':<32}{'-':>10}{caliente['calentamiento_s']:>14}")
+    print(f"{'Primera foto (ms)':<32}{frio['primera_foto_ms']:>10}{caliente['primera_foto_ms']:>14}")
+    print(f"{'Segunda foto (ms)':<32}{frio['segunda_foto_ms']:>10}{caliente['segunda_foto_ms']:>14}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump({"imports_app_ms": secuencia, "diferidos_ms": aislados, "diferidos_en_arranque": cargados,
+                       "modelo": fases}, f, indent=2)
+        print(f"\nResultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: PyTorch vs ONNX FP32 vs ONNX INT8 en CPU
+Proyecto Integrador - IFTS24
+
+Mide el arranque en frio (importar + cargar + primera inferencia, en un
+proceso nuevo) y la latencia por imagen de cada backend. Si faltan los
+modelos ONNX los exporta con train_yolo_model.exportar_modelo().
+
+Uso:
+    python benchmarks/bench_backends.py --pesos yolov8n.pt --imagenes fotos/
+    python benchmarks/bench_backends.py --pesos best.pt --threads 8 --openvino
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+INICIO_PROCESO = time.perf_counter()
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def imagenes_de_prueba(carpeta, limite):
+    """Fotos reales si hay carpeta; si no, imagenes sinteticas de 1280x720."""
+    import numpy as np
+
+    import deteccion
+    from auditoria_batch import listar_imagenes
+
+    if carpeta:
+        return [deteccion.cargar_imagen(r) for r in listar_imagenes(carpeta)[:limite]]
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, (720, 1280, 3), dtype=np.uint8) for _ in range(limite)]
+
+
+def medir(backend, ruta, threads, carpeta, limite, repeticiones):
+    """Corre en el proceso hijo: arranque en frio y latencia por imagen."""
+    import numpy as np
+
+    import deteccion
+
+    inicio_imagenes = time.perf_counter()
+    imagenes = imagenes_de_prueba(carpeta, limite)
+    tiempo_imagenes = time.perf_counter() - inicio_imagenes
+
+    inicio_carga = time.perf_counter()
+    model = deteccion.load_generic_model(backend, ruta, threads)
+    carga = time.perf_counter() - inicio_carga
+    deteccion.detectar_botellas(model, imagenes[0])
+    arranque = time.perf_counter() - INICIO_PROCESO - tiempo_imagenes
+
+    latencias = []
+    for _ in range(repeticiones):
+        for img in imagenes:
+            inicio = time.perf_counter()
+            deteccion.detectar_botellas(model, img)
+            latencias.append(time.perf_counter() - inicio)
+
+    latencias = np.array(latencias) * 1000
+    return {
+        "carga_modelo_s": round(carga, 3),
+        "arranque_frio_s": round(arranque, 3),
+        "latencia_media_ms": round(float(latencias.mean()), 1),
+        "latencia_p50_ms": round(float(np.percentile(latencias, 50)), 1),
+        "latencia_p95_ms": round(float(np.percentile(latencias, 95)), 1),
+        "tamanio_mb": round(sum(f.stat().st_size for f in ([Path(ruta)] if Path(ruta).is_file()
+                                                               else Path(ruta).glob('*'))) / 1024**2, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de backends de inferencia en CPU")
+    parser.add_argument('--pesos', default='yolov8n.pt', help="Modelo PyTorch de referencia")
+    parser.add_argument('--imagenes', help="Carpeta con fotos de gondolas (opcional)")
+    parser.add_argument('--threads', type=int, help="Hilos de inferencia (todos los backends)")
+    parser.add_argument('--limite', type=int, default=10)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--openvino', action='store_true', help="Incluir OpenVINO (requiere el paquete openvino)")
+    parser.add_argument('--salida', help="Guardar resultados en JSON")
+    parser.add_argument('--medir', nargs=2, metavar=('BACKEND', 'RUTA'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir:
+        print(json.dumps(medir(args.medir[0], args.medir[1], args.threads, args.imagenes,
+                               args.limite, args.repeticiones)))
+        return
+
+    print("="*60)
+    print("BENCHMARK - BACKENDS DE INFERENCIA EN CPU")
+    print("="*60)
+
+    pesos = Path(args.pesos)
+    ruta_onnx = pesos.with_suffix('.onnx')
+    ruta_int8 = pesos.with_name(pesos.stem + '_int8.onnx')
+    ruta_openvino = pesos.with_name(pesos.stem + '_openvino_model')
+
+    if not ruta_onnx.exists() or not ruta_int8.exists() or (args.openvino and not ruta_openvino.exists()):
+        from train_yolo_model import exportar_modelo
+        exportar_modelo(str(pesos), openvino=args.openvino)
+
+    variantes = [('PyTorch FP32', 'pytorch', pesos), ('ONNX FP32', 'onnx', ruta_onnx), ('ONNX INT8', 'onnx', ruta_int8)]
+    if args.openvino:
+        variantes.append(('OpenVINO FP32', 'openvino', ruta_openvino))
+
+    resultados = []
+    for nombre, backend, ruta in variantes:
+        comando = [sys.executable, __file__, '--medir', backend, str(ruta),
+                   '--limite', str(args.limite), '--repeticiones', str(args.repeticiones)]
+        if args.threads:
+            comando += ['--threads', str(args.threads)]
+        if args.imagenes:
+            comando += ['--imagenes', args.imagenes]
+        salida = subprocess.run(comando, capture_output=True, text=True, check=True).stdout
+        resultado = json.loads(salida.strip().splitlines()[-1])
+        resultado["variante"] = nombre
+        resultados.append(resultado)
+        print(f"[OK] {nombre}")
+
+    print(f"\n{'Variante':<16}{'Arranque s':>12}{'Carga s':>10}{'Media ms':>10}{'p95 ms':>10}{'MB':>8}")
+    for r in resultados:
+        print(f"{r['variante']:<16}{r['arranque_frio_s']:>12}{r['carga_modelo_s']:>10}"
+              f"{r['latencia_media_ms']:>10}{r['latencia_p95_ms']:>10}{r['tamanio_mb']:>8}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+        print(f"\nResultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Cache de Imagenes para Entrenamiento
+Proyecto Integrador - IFTS24
+
+Entrena unas epocas sobre gondolas sinteticas con tres formas de leer las
+imagenes: sin cache (decodifica cada JPEG en cada epoca, lo que hace hoy
+train_yolo_model.py), cache='ram' de ultralytics y la cache mapeada de
+cache_entrenamiento.py. Informa tiempo de preparacion, tiempo medio por
+epoca (fase de entrenamiento), imagenes por segundo y memoria. Cada modo
+corre en un proceso aparte sobre el mismo dataset. "Carga ms" es el costo
+del DataLoader por imagen sin el modelo: es lo que se ahorra por epoca cuando
+el computo no tapa la lectura (GPU o muchos nucleos).
+
+Uso:
+    python benchmarks/bench_cache_entrenamiento.py
+    python benchmarks/bench_cache_entrenamiento.py --imagenes 200 --epocas 3 --imgsz 640 --workers 4
+"""
+
+import argparse
+import json
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+MODOS = ['sin_cache', 'ram', 'memmap']
+
+
+def memoria_proceso():
+    """RSS pico y memoria no liberable (anonima + compartida) en MB, leidas de /proc (Linux)."""
+    campos = {}
+    try:
+        with open('/proc/self/status', 'r', encoding='utf-8') as f:
+            for linea in f:
+                clave, _, valor = linea.partition(':')
+                campos[clave] = int(valor.split()[0]) / 1024 if valor.strip().endswith('kB') else None
+    except OSError:
+        pass
+    pico = campos.get('VmHWM') or resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    fija = (campos.get('RssAnon') or 0) + (campos.get('RssShmem') or 0)
+    return round(pico, 1), round(fija, 1) if fija else None
+
+
+def generar_dataset(carpeta, cantidad, resolucion):
+    """Gondolas sinteticas en train/ y val/ (una clase: bottle) con su data.yaml."""
+    import gondola_sintetica
+
+    ancho, alto = gondola_sintetica.parsear_resolucion(resolucion)
+    gondola_sintetica.guardar_dataset(carpeta / 'train', cantidad, ancho, alto, 10, semilla=0, clase=0)
+    gondola_sintetica.guardar_dataset(carpeta / 'val', max(4, cantidad // 5), ancho, alto, 10, semilla=10000, clase=0)
+    with open(carpeta / 'data.yaml', 'w', encoding='utf-8') as f:
+        f.write(f"path: {carpeta}\ntrain: train/images\nval: val/images\nnames:\n  0: bottle\nnc: 1\n")
+
+
+def medir(modo, carpeta, epocas, imgsz, batch, workers, modelo):
+    """Corre en el proceso hijo: entrena y devuelve tiempos y memoria."""
+    from ultralytics import YOLO
+
+    from cache_entrenamiento import EntrenadorMemmap
+
+    model = YOLO(modelo)
+    tiempos = {"inicio": time.perf_counter(), "epocas": []}
+    memoria = {}
+
+    def inicio_epoca(trainer):
+        tiempos.setdefault("primera_epoca", time.perf_counter())
+        tiempos["epoca"] = time.perf_counter()
+
+    def fin_epoca(trainer):
+        tiempos["epocas"].append(time.perf_counter() - tiempos["epoca"])
+        tiempos["imagenes"] = len(trainer.train_loader.dataset)
+
+    def fin_entrenamiento(trainer):
+        memoria["pico"], memoria["fija"] = memoria_proceso()
+        # Costo aislado del DataLoader (lectura + aumentaciones) por imagen, sin el modelo
+        dataset = trainer.train_loader.dataset
+        inicio = time.perf_counter()
+        for i in range(len(dataset)):
+            dataset[i]
+        tiempos["carga_ms"] = (time.perf_counter() - inicio) / len(dataset) * 1000
+
+    model.add_callback('on_train_epoch_start', inicio_epoca)
+    model.add_callback('on_train_epoch_end', fin_epoca)
+    model.add_callback('on_train_end', fin_entrenamiento)
+    model.train(data=str(carpeta / 'data.yaml'), epochs=epocas, imgsz=imgsz, batch=batch, workers=workers,
+                device='cpu', cache='ram' if modo == 'ram' else False,
+                trainer=EntrenadorMemmap if modo == 'memmap' else None,
+                val=False, plots=False, verbose=False, project=str(carpeta / 'runs'), name=modo, exist_ok=True)
+
+    # La primera epoca calienta cachés del sistema y del DataLoader: se promedian las siguientes
+    medidas = tiempos["epocas"][1:] or tiempos["epocas"]
+    epoca = sum(medidas) / len(medidas)
+    return {
+        "modo": modo,
+        "preparacion_s": round(tiempos["primera_epoca"] - tiempos["inicio"], 2),
+        "epoca_s": round(epoca, 2),
+        "imagenes_por_segundo": round(tiempos["imagenes"] / epoca, 2),
+        "carga_ms_imagen": round(tiempos["carga_ms"], 1),
+        "rss_pico_mb": memoria.get("pico"),
+        "memoria_fija_mb": memoria.get("fija"),
+        "rss_pico_workers_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de cache de imagenes para entrenamiento")
+    parser.add_argument('--imagenes', type=int, default=64, help="Imagenes de entrenamiento sinteticas")
+    parser.add_argument('--resolucion', default='1920x1080', help="ANCHOxALTO de las fotos")
+    parser.add_argument('--epocas', type=int, default=3)
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--batch', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--modelo', default='yolov8n.yaml', help="Arquitectura o pesos (por defecto sin descargar)")
+    parser.add_argument('--modos', nargs='+', default=MODOS, choices=MODOS)
+    parser.add_argument('--salida', help="Guardar resultados en JSON")
+    parser.add_argument('--modo', help=argparse.SUPPRESS)  # Uso interno: proceso hijo
+    parser.add_argument('--carpeta', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.modo:
+        print(json.dumps(medir(args.modo, Path(args.carpeta), args.epocas, args.imgsz, args.batch,
+                               args.workers, args.modelo)))
+        return
+
+    print("="*60)
+    print("BENCHMARK - CACHE DE IMAGENES PARA ENTRENAMIENTO")
+    print("="*60)
+
+    carpeta = Path(tempfile.mkdtemp(prefix='bench_cache_'))
+    try:
+        generar_dataset(carpeta, args.imagenes, args.resolucion)
+        print(f"[OK] Dataset sintetico: {args.imagenes} imagenes de {args.resolucion} en {carpeta}")
+
+        resultados = []
+        for modo in args.modos:
+            comando = [sys.executable, __file__, '--modo', modo, '--carpeta', str(carpeta),
+                       '--epocas', str(args.epocas), '--imgsz', str(args.imgsz), '--batch', str(args.batch),
+                       '--workers', str(args.workers), '--modelo', args.modelo]
+            salida = subprocess.run(comando, capture_output=True, text=True, check=True).stdout
+            resultados.append(json.loads(salida.strip().splitlines()[-1]))
+            print(f"[OK] {modo}")
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+    base = next((r for r in resultados if r["modo"] == 'sin_cache'), resultados[0])
+    print(f"\n{'Modo':<12}{'Prep s':>8}{'Epoca s':>9}{'img/s':>8}{'vs sin cache':>14}"
+          f"{'Carga ms':>10}{'RSS MB':>9}{'Fija MB':>9}{'Workers MB':>12}")
+    for r in resultados:
+        mejora = f"{(base['epoca_s'] / r['epoca_s'] - 1) * 100:+.0f}%"
+        fija = r['memoria_fija_mb'] if r['memoria_fija_mb'] is not None else '-'
+        print(f"{r['modo']:<12}{r['preparacion_s']:>8}{r['epoca_s']:>9}{r['imagenes_por_segundo']:>8}{mejora:>14}"
+              f"{r['carga_ms_imagen']:>10}{r['rss_pico_mb']:>9}{fija:>9}{r['rss_pico_workers_mb']:>12}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+        print(f"\nResultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
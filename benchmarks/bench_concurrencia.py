@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Usuarios Concurrentes (modelo compartido vs servidor multiproceso)
+Proyecto Integrador - IFTS24
+
+Simula sesiones de Streamlit (un hilo por sesion) que analizan fotos al
+mismo tiempo y mide la latencia p50/p95 por solicitud y el throughput a
+medida que crecen las sesiones. Compara el modelo unico en el proceso de la
+app (lo que da @st.cache_resource; las llamadas se serializan con un lock)
+contra servidor_modelos con N replicas. Cada configuracion corre en un
+proceso aparte.
+
+Uso:
+    python benchmarks/bench_concurrencia.py --procesos 2 4 --sesiones 1 2 4 8 16
+    python benchmarks/bench_concurrencia.py --imagenes fotos/ --solicitudes 20 --salida carga.json
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def imagenes_de_prueba(carpeta, limite):
+    """Fotos reales si hay carpeta; si no, imagenes sinteticas de 1280x720 (BGR, como las manda la app)."""
+    import numpy as np
+
+    import deteccion
+    from auditoria_batch import listar_imagenes
+
+    if carpeta:
+        return [deteccion.cargar_imagen(r)[..., ::-1].copy() for r in listar_imagenes(carpeta)[:limite]]
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, (720, 1280, 3), dtype=np.uint8) for _ in range(limite)]
+
+
+def medir(modo, niveles, solicitudes, carpeta, limite, ruta):
+    """Corre en el proceso hijo: latencias por nivel de concurrencia."""
+    import numpy as np
+
+    import deteccion
+
+    imagenes = imagenes_de_prueba(carpeta, limite)
+    if modo == 'compartido':
+        model = deteccion.load_generic_model(ruta=ruta)
+        lock = threading.Lock()
+
+        def analizar(img):
+            with lock:
+                return deteccion.detectar_botellas(model, img)
+    else:
+        import servidor_modelos
+
+        model = servidor_modelos.ServidorModelos(int(modo.split(':')[1]), ruta=ruta)
+
+        def analizar(img):
+            return deteccion.detectar_botellas(model, img)
+
+    for img in imagenes[:2]:
+        analizar(img)  # Calentamiento
+
+    resultados = []
+    for sesiones in niveles:
+        def sesion(numero):
+            latencias = []
+            for i in range(solicitudes):
+                inicio = time.perf_counter()
+                analizar(imagenes[(numero + i) % len(imagenes)])
+                latencias.append(time.perf_counter() - inicio)
+            return latencias
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=sesiones) as pool:
+            latencias = np.concatenate(list(pool.map(sesion, range(sesiones)))) * 1000
+        duracion = time.perf_counter() - inicio
+        resultados.append({
+            "modo": modo,
+            "sesiones": sesiones,
+            "latencia_p50_ms": round(float(np.percentile(latencias, 50)), 1),
+            "latencia_p95_ms": round(float(np.percentile(latencias, 95)), 1),
+            "imagenes_por_segundo": round(len(latencias) / duracion, 2),
+        })
+
+    if modo != 'compartido':
+        model.cerrar()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de sesiones concurrentes")
+    parser.add_argument('--modelo', help="Pesos a usar (por defecto STOCKVISION_MODELO o yolov8n.pt)")
+    parser.add_argument('--imagenes', help="Carpeta con fotos de gondolas (opcional)")
+    parser.add_argument('--procesos', type=int, nargs='+', default=[2], help="Replicas del servidor a probar")
+    parser.add_argument('--sesiones', type=int, nargs='+', default=[1, 2, 4, 8], help="Sesiones concurrentes")
+    parser.add_argument('--solicitudes', type=int, default=10, help="Fotos analizadas por cada sesion")
+    parser.add_argument('--limite', type=int, default=8)
+    parser.add_argument('--salida', help="Guardar resultados en JSON")
+    parser.add_argument('--modo', help=argparse.SUPPRESS)  # Uso interno: proceso hijo
+    args = parser.parse_args()
+
+    if args.modo:
+        print(json.dumps(medir(args.modo, args.sesiones, args.solicitudes, args.imagenes, args.limite, args.modelo)))
+        return
+
+    print("="*60)
+    print("BENCHMARK - SESIONES CONCURRENTES")
+    print("="*60)
+
+    resultados = []
+    for modo in ['compartido'] + [f'procesos:{n}' for n in args.procesos]:
+        comando = [sys.executable, __file__, '--modo', modo, '--solicitudes', str(args.solicitudes),
+                   '--limite', str(args.limite), '--sesiones'] + [str(s) for s in args.sesiones]
+        if args.modelo:
+            comando += ['--modelo', args.modelo]
+        if args.imagenes:
+            comando += ['--imagenes', args.imagenes]
+        salida = subprocess.run(comando, capture_output=True, text=True, check=True).stdout
+        resultados.extend(json.loads(salida.strip().splitlines()[-1]))
+        print(f"[OK] {modo}")
+
+    print(f"\n{'Modo':<14}{'Sesiones':>10}{'p50 ms':>10}{'p95 ms':>10}{'img/s':>8}")
+    for r in resultados:
+        print(f"{r['modo']:<14}{r['sesiones']:>10}{r['latencia_p50_ms']:>10}"
+              f"{r['latencia_p95_ms']:>10}{r['imagenes_por_segundo']:>8}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+        print(f"\nResultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Estantes, Frentes y Huecos
+Proyecto Integrador - IFTS24
+
+Arma gondolas largas con modulos sinteticos de gondola_sintetica (uno al
+lado del otro y apilados), saca al azar una fraccion de las botellas
+(frentes vacios conocidos) y pasa las cajas que quedan por
+estantes_gondola.EstantesGondola. Informa:
+  - Tiempo de armar estantes, frentes, huecos, share por estante e indice.
+  - Estantes encontrados vs reales y frentes vacios encontrados vs sacados.
+  - Consulta de una region: indice de grilla vs filtrar todas las cajas.
+
+Uso:
+    python benchmarks/bench_estantes.py
+    python benchmarks/bench_estantes.py --modulos 2 10 40 --pisos 3 --vaciar 0.2 --salida estantes.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import estantes_gondola  # noqa: E402
+import gondola_sintetica  # noqa: E402
+
+MODULO = (1600, 1080)  # ANCHOxALTO de cada modulo sintetico (3 estantes)
+
+
+def gondola_modular(columnas, pisos, densidad, semilla):
+    """Cajas (N, 4), marcas y estantes reales de columnas x pisos modulos de gondola_sintetica."""
+    ancho, alto = MODULO
+    cajas, marcas = [], []
+    for piso in range(pisos):
+        for columna in range(columnas):
+            _, c, m = gondola_sintetica.generar_gondola(ancho, alto, densidad, semilla + piso * columnas + columna)
+            cajas.append(c + [columna * ancho, piso * alto, columna * ancho, piso * alto])
+            marcas.extend(m)
+    cajas = np.concatenate(cajas)
+    return cajas, marcas, len(np.unique(cajas[:, 3]))
+
+
+def cronometrar(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return round(float(np.median(tiempos)), 3)
+
+
+def armar(cajas, marcas):
+    """Todo lo que calcula la app para un analisis."""
+    estantes = estantes_gondola.EstantesGondola(cajas, marcas)
+    estantes.share, estantes.huecos, estantes.resumen, estantes.indice
+    return estantes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estantes, frentes y huecos sobre gondolas sinteticas")
+    parser.add_argument('--modulos', type=int, nargs='+', default=[1, 4, 12],
+                        help="Modulos de gondola uno al lado del otro")
+    parser.add_argument('--pisos', type=int, default=2, help="Modulos apilados (3 estantes cada uno)")
+    parser.add_argument('--densidad', type=int, default=12, help="Botellas por estante en cada modulo")
+    parser.add_argument('--vaciar', type=float, default=0.1, help="Fraccion de botellas que se sacan")
+    parser.add_argument('--consultas', type=int, default=200, help="Regiones consultadas por gondola")
+    parser.add_argument('--repeticiones', type=int, default=20)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--salida', help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("BENCHMARK - ESTANTES, FRENTES Y HUECOS")
+    print("="*60)
+
+    rng = np.random.default_rng(args.semilla)
+    resultados = []
+    for columnas in args.modulos:
+        cajas, marcas, reales = gondola_modular(columnas, args.pisos, args.densidad, args.semilla)
+        sacadas = rng.choice(len(cajas), int(len(cajas) * args.vaciar), replace=False)
+        quedan = np.setdiff1d(np.arange(len(cajas)), sacadas)
+        cajas, marcas = cajas[quedan], [marcas[i] for i in quedan]
+
+        estantes = armar(cajas, marcas)
+        alto, ancho = cajas[:, 3].max(), cajas[:, 2].max()
+        # Unos tres frentes de un estante
+        regiones = [(x, y, x + 3 * MODULO[0] / args.densidad, y + MODULO[1] / 3)
+                    for x, y in rng.uniform(0, 1, (args.consultas, 2)) * [ancho, alto]]
+
+        def por_indice():
+            return [estantes.indice.consultar(*r) for r in regiones]
+
+        def filtrando():
+            c = estantes.cajas
+            return [np.flatnonzero((c[:, 0] < x2) & (c[:, 2] > x1) & (c[:, 1] < y2) & (c[:, 3] > y1))
+                    for x1, y1, x2, y2 in regiones]
+
+        iguales = all(np.array_equal(a, b) for a, b in zip(por_indice(), filtrando()))
+        fila = {
+            "modulos": columnas * args.pisos,
+            "cajas": len(cajas),
+            "armado_ms": cronometrar(lambda: armar(cajas, marcas), args.repeticiones),
+            "estantes": estantes.cantidad,
+            "estantes_reales": reales,
+            "frentes_vacios": sum(h["Frentes vacios"] for h in estantes.huecos),
+            "botellas_sacadas": len(sacadas),
+            "consulta_indice_us": round(cronometrar(por_indice, args.repeticiones) * 1000 / args.consultas, 1),
+            "consulta_filtro_us": round(cronometrar(filtrando, args.repeticiones) * 1000 / args.consultas, 1),
+            "mismas_cajas": bool(iguales),
+        }
+        resultados.append(fila)
+        print(f"[OK] {len(cajas)} cajas" + ("" if iguales else " [ERROR] el indice no coincide con el filtro"))
+
+    print(f"\n{'Cajas':>7}{'Armado ms':>11}{'Estantes':>10}{'Vacios':>8}{'Sacadas':>9}"
+          f"{'Indice us':>11}{'Filtro us':>11}")
+    for r in resultados:
+        print(f"{r['cajas']:>7}{r['armado_ms']:>11}{r['estantes']:>6}/{r['estantes_reales']:<3}{r['frentes_vacios']:>8}"
+              f"{r['botellas_sacadas']:>9}{r['consulta_indice_us']:>11}{r['consulta_filtro_us']:>11}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+        print(f"\nResultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Firmas de Color vs Rangos HSV Fijos
+Proyecto Integrador - IFTS24
+
+Compara la clasificacion por color de deteccion.detect_brand_colors (rangos
+HSV fijos) con firma_color.ClasificadorColor (firmas aprendidas) sobre las
+mismas cajas etiquetadas:
+  - Acierto por familia y latencia por imagen de cada metodo.
+  - Con gondolas sinteticas (por defecto) las firmas se entrenan con otras
+    gondolas y se prueba con varias iluminaciones (brillo multiplicado).
+  - Con --dataset se usa el split de validacion del dataset real y las
+    firmas ya entrenadas con firma_color.py (--firmas).
+  - Costo de clasificar con mas marcas: prototipos de marcas ficticias
+    agregados hasta --marcas clases.
+
+Uso:
+    python benchmarks/bench_firma_color.py
+    python benchmarks/bench_firma_color.py --iluminacion 0.4 0.7 1.0 1.3 --marcas 3 10 50
+    python benchmarks/bench_firma_color.py --dataset datasets --firmas firmas_color.npz --salida firmas.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import deteccion  # noqa: E402
+import firma_color  # noqa: E402
+import gondola_sintetica  # noqa: E402
+
+FAMILIAS = list(gondola_sintetica.COLORES_ETIQUETA)
+
+
+def iluminar(img, factor):
+    """La misma foto con el brillo multiplicado por `factor` (gondola en sombra o bajo luz fuerte)."""
+    return np.clip(img.astype(np.float32) * factor, 0, 255).astype(np.uint8)
+
+
+def muestras_sinteticas(semillas, factores, resolucion, densidad):
+    """[(img_rgb, cajas, familia de cada caja)] de gondolas sinteticas con cada iluminacion."""
+    ancho, alto = resolucion
+    muestras = []
+    for semilla, factor in zip(semillas, factores):
+        img, cajas, marcas = gondola_sintetica.generar_gondola(ancho, alto, densidad, semilla)
+        muestras.append((iluminar(img, factor), cajas, marcas))
+    return muestras
+
+
+def muestras_dataset(raiz, split):
+    """[(img_rgb, cajas, familia de cada caja)] del split de un dataset YOLO (la clase bottle cuenta como Otros)."""
+    from validar_dataset import nombres_clases
+
+    nombres = nombres_clases(raiz)
+    return [(img, cajas, [deteccion.familia_clase(nombres[c])[0] for c in clases])
+            for img, cajas, clases in firma_color.cajas_dataset(raiz, split)]
+
+
+def entrenar_sintetico(cantidad, resolucion, densidad, semilla, factores):
+    """Firmas entrenadas con gondolas sinteticas (otras semillas que las de prueba) y brillo al azar."""
+    rng = np.random.default_rng(semilla)
+    muestras = muestras_sinteticas(range(semilla, semilla + cantidad),
+                                   rng.uniform(min(factores), max(factores), cantidad), resolucion, densidad)
+    firmas = np.concatenate([firma_color.histogramas(img, cajas) for img, cajas, _ in muestras])
+    clases = [FAMILIAS.index(m) for _, _, marcas in muestras for m in marcas]
+    return firma_color.ClasificadorColor.entrenar(firmas, clases, FAMILIAS)
+
+
+def evaluar(muestras, clasificar):
+    """(acierto por familia, ms por imagen) de una funcion clasificar(img, cajas) -> [(familia, color)]."""
+    aciertos, total, tiempos = 0, 0, []
+    for img, cajas, familias in muestras:
+        inicio = time.perf_counter()
+        predichas = clasificar(img, cajas.astype(int))
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+        aciertos += sum(p[0] == f for p, f in zip(predichas, familias))
+        total += len(familias)
+    return round(aciertos / max(total, 1), 4), round(float(np.median(tiempos)), 2)
+
+
+def con_marcas(clasificador, cantidad, rng):
+    """Copia del clasificador con prototipos de marcas ficticias hasta `cantidad` clases."""
+    extra = max(0, cantidad - len(clasificador.nombres))
+    nuevos = rng.dirichlet(np.ones(firma_color.DIMENSION), extra * firma_color.PROTOTIPOS_POR_CLASE)
+    prototipos = np.concatenate([clasificador.prototipos, np.sqrt(nuevos)])
+    clases = np.concatenate([clasificador.clase_prototipo,
+                             len(clasificador.nombres) + np.repeat(np.arange(extra), firma_color.PROTOTIPOS_POR_CLASE)])
+    nombres = clasificador.nombres + [f"marca_{i}" for i in range(extra)]
+    return firma_color.ClasificadorColor(nombres, clases, prototipos, clasificador.umbral)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Acierto y latencia: firmas de color vs rangos HSV fijos")
+    parser.add_argument('--dataset', help="Dataset YOLO real (se usa --split); por defecto gondolas sinteticas")
+    parser.add_argument('--split', default='val')
+    parser.add_argument('--firmas', default=firma_color.ARCHIVO_FIRMAS, help="Firmas entrenadas (con --dataset)")
+    parser.add_argument('--entrenamiento', type=int, default=12, help="Gondolas sinteticas para entrenar")
+    parser.add_argument('--prueba', type=int, default=6, help="Gondolas sinteticas de prueba por iluminacion")
+    parser.add_argument('--iluminacion', type=float, nargs='+', default=[0.3, 0.6, 1.0, 1.6],
+                        help="Factores de brillo de las gondolas sinteticas")
+    parser.add_argument('--resolucion', default='1920x1080', help="ANCHOxALTO de las gondolas sinteticas")
+    parser.add_argument('--densidad', type=int, default=14, help="Botellas por estante")
+    parser.add_argument('--marcas', type=int, nargs='+', default=[3, 10, 30, 100],
+                        help="Clases del clasificador para medir el costo de sumar marcas")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--salida', help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("BENCHMARK - FIRMAS DE COLOR VS RANGOS HSV")
+    print("="*60)
+
+    resolucion = gondola_sintetica.parsear_resolucion(args.resolucion)
+    if args.dataset:
+        clasificador = firma_color.ClasificadorColor.cargar(args.firmas)
+        conjuntos = {args.split: muestras_dataset(args.dataset, args.split)}
+    else:
+        clasificador = entrenar_sintetico(args.entrenamiento, resolucion, args.densidad, args.semilla,
+                                          args.iluminacion)
+        semillas = range(10_000 + args.semilla, 10_000 + args.semilla + args.prueba)
+        conjuntos = {f"brillo x{f}": muestras_sinteticas(semillas, [f] * args.prueba, resolucion, args.densidad)
+                     for f in args.iluminacion}
+    print(f"[OK] Clasificador: {len(clasificador.nombres)} clases, {len(clasificador.prototipos)} prototipos")
+
+    def por_firmas(img, cajas):
+        return deteccion.clasificar_colores(img, cajas, clasificador)
+
+    resultados = {"conjuntos": {}, "marcas": []}
+    for nombre, muestras in conjuntos.items():
+        hsv_acierto, hsv_ms = evaluar(muestras, deteccion.detect_brand_colors)
+        firmas_acierto, firmas_ms = evaluar(muestras, por_firmas)
+        resultados["conjuntos"][nombre] = {
+            "imagenes": len(muestras), "cajas": int(sum(len(c) for _, c, _ in muestras)),
+            "hsv_acierto": hsv_acierto, "hsv_ms": hsv_ms,
+            "firmas_acierto": firmas_acierto, "firmas_ms": firmas_ms,
+        }
+        print(f"[OK] {nombre}")
+
+    img, cajas, _ = next(iter(conjuntos.values()))[0]
+    firmas = firma_color.histogramas(img, cajas)
+    rng = np.random.default_rng(args.semilla)
+    for cantidad in args.marcas:
+        ampliado = con_marcas(clasificador, cantidad, rng)
+        tiempos = []
+        for _ in range(20):
+            inicio = time.perf_counter()
+            ampliado.clasificar(firma_color.histogramas(img, cajas))
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        resultados["marcas"].append({"clases": len(ampliado.nombres), "prototipos": len(ampliado.prototipos),
+                                     "cajas": len(firmas), "ms_por_imagen": round(float(np.median(tiempos)), 3)})
+
+    print(f"\n{'Conjunto':<18}{'Cajas':>7}{'HSV acierto':>13}{'HSV ms':>9}{'Firmas acierto':>16}{'Firmas ms':>11}")
+    for nombre, r in resultados["conjuntos"].items():
+        print(f"{nombre:<18}{r['cajas']:>7}{r['hsv_acierto']:>13.1%}{r['hsv_ms']:>9}"
+              f"{r['firmas_acierto']:>16.1%}{r['firmas_ms']:>11}")
+    print(f"\n{'Clases':>8}{'Prototipos':>12}{'Cajas':>7}{'ms por imagen':>15}")
+    for r in resultados["marcas"]:
+        print(f"{r['clases']:>8}{r['prototipos']:>12}{r['cajas']:>7}{r['ms_por_imagen']:>15}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Memoria del Camino de Imagenes de la App
+Proyecto Integrador - IFTS24
+
+Compara, para una foto de gondola sintetica, el camino anterior de app.py
+(PIL + np.array en resolucion completa, copia para dibujar y la imagen
+procesada en session_state) con el camino liviano de imagen_liviana.py
+(decodificacion reducida, dibujo sobre la vista y miniaturas JPEG en la
+sesion). Por formato (JPEG y PNG) informa tiempo, RSS pico que agrega el
+procesamiento (Linux), bytes que quedan en la sesion y pixeles que se mandan al
+navegador. Las cajas reales de la gondola hacen de detecciones para aislar
+el camino de la imagen de YOLO. Cada medicion corre en un proceso aparte.
+
+Uso:
+    python benchmarks/bench_memoria_imagen.py
+    python benchmarks/bench_memoria_imagen.py --resolucion 8000x6000 --repeticiones 5 --salida memoria.json
+"""
+
+import argparse
+import io
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import deteccion  # noqa: E402
+import gondola_sintetica  # noqa: E402
+import imagen_liviana  # noqa: E402
+
+CAMINOS = ['anterior', 'liviano']
+FORMATOS = ['JPEG', 'PNG']
+
+
+def camino_anterior(contenido, detecciones):
+    """Lo que hacia app.py: devuelve (sesion, imagenes mandadas al navegador)."""
+    image_pil = Image.open(io.BytesIO(contenido))
+    img_array = np.array(image_pil)
+    data, img_final, _ = deteccion.analizar_detecciones(img_array, detecciones)
+    return {"img_final": img_final, "data_marketing": data}, [image_pil, img_final]
+
+
+def camino_liviano(contenido, detecciones):
+    """Lo que hace app.py con imagen_liviana: devuelve (sesion, imagenes mandadas al navegador)."""
+    imagen, escala = imagen_liviana.abrir_imagen(io.BytesIO(contenido))
+    data, _, indices = deteccion.analizar_detecciones(np.asarray(imagen), detecciones, dibujar=False,
+                                                      escala=escala)
+    vista = imagen_liviana.vista(imagen)
+    img_final = deteccion.dibujar_detecciones(np.array(vista), detecciones[indices], data,
+                                              escala * vista.width / imagen.width)
+    sesion = {"img_original": imagen_liviana.a_jpeg(vista), "img_final": imagen_liviana.a_jpeg(img_final),
+              "data_marketing": data}
+    return sesion, [sesion["img_original"], sesion["img_final"]]
+
+
+def memoria_proceso():
+    """(RSS actual, RSS pico) en MB del proceso (Linux: /proc/self/status)."""
+    valores = {}
+    with open('/proc/self/status') as f:
+        for linea in f:
+            clave, _, valor = linea.partition(':')
+            if clave in ('VmRSS', 'VmHWM'):
+                valores[clave] = int(valor.split()[0]) / 1024
+    return valores['VmRSS'], valores['VmHWM']
+
+
+def medir(camino, archivo):
+    """Corre en el proceso hijo: un procesamiento de la foto por el camino pedido."""
+    # La gondola se genera en el proceso padre para no inflar el RSS pico de la base
+    detecciones = np.load(Path(archivo).with_name('detecciones.npy'))
+    contenido = Path(archivo).read_bytes()
+
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')  # Reinicia el pico (VmHWM): los imports no cuentan
+    base = memoria_proceso()[0]
+    inicio = time.perf_counter()
+    sesion, enviadas = (camino_anterior if camino == 'anterior' else camino_liviano)(contenido, detecciones)
+    duracion = time.perf_counter() - inicio
+    pico = memoria_proceso()[1]
+
+    pixeles = 0
+    for imagen in enviadas:
+        if isinstance(imagen, bytes):
+            imagen = Image.open(io.BytesIO(imagen))
+        ancho, alto = imagen.size if isinstance(imagen, Image.Image) else imagen.shape[1::-1]
+        pixeles += ancho * alto
+    return {
+        "ms": round(duracion * 1000, 1),
+        "rss_pico_mb": round(pico - base, 1),
+        "sesion_mb": round(imagen_liviana.tamanio_bytes(sesion) / 1024**2, 2),
+        "navegador_mpx": round(pixeles / 1e6, 2),
+    }
+
+
+def mediana(valores):
+    valores = sorted(valores)
+    return valores[len(valores) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoria del camino de imagenes de la app (anterior vs liviano)")
+    parser.add_argument('--resolucion', default='4032x3024', help="ANCHOxALTO de la foto (12 MP por defecto)")
+    parser.add_argument('--densidad', type=int, default=14, help="Botellas por estante")
+    parser.add_argument('--repeticiones', type=int, default=3, help="Procesos por medicion (se informa la mediana)")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--salida', help="Guardar resultados en JSON")
+    parser.add_argument('--camino', choices=CAMINOS, help=argparse.SUPPRESS)  # Uso interno: proceso hijo
+    parser.add_argument('--archivo', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.camino:
+        print(json.dumps(medir(args.camino, args.archivo)))
+        return
+
+    print("="*60)
+    print("BENCHMARK - MEMORIA DEL CAMINO DE IMAGENES")
+    print("="*60)
+
+    ancho, alto = gondola_sintetica.parsear_resolucion(args.resolucion)
+    img, cajas, _ = gondola_sintetica.generar_gondola(ancho, alto, args.densidad, args.semilla)
+    detecciones = np.column_stack([cajas, np.full(len(cajas), 0.9), np.full(len(cajas), deteccion.CLASE_BOTELLA)])
+    resultados = {}
+    with tempfile.TemporaryDirectory() as carpeta:
+        np.save(Path(carpeta) / 'detecciones.npy', detecciones.astype(np.float32))
+        for formato in FORMATOS:
+            archivo = Path(carpeta) / f"gondola.{formato.lower()}"
+            Image.fromarray(img).save(archivo, format=formato)
+            for camino in CAMINOS:
+                comando = [sys.executable, __file__, '--camino', camino, '--archivo', str(archivo)]
+                corridas = [json.loads(subprocess.run(comando, capture_output=True, text=True, check=True)
+                                       .stdout.strip().splitlines()[-1]) for _ in range(args.repeticiones)]
+                resultados.setdefault(formato, {})[camino] = {k: mediana([c[k] for c in corridas])
+                                                              for k in corridas[0]}
+            print(f"[OK] {formato} {args.resolucion} ({archivo.stat().st_size / 1024**2:.1f} MB)")
+
+    print(f"\n{'Formato':<9}{'Camino':<11}{'ms':>9}{'RSS pico MB':>13}{'Sesion MB':>11}{'Navegador MPx':>15}")
+    for formato, caminos in resultados.items():
+        for camino, r in caminos.items():
+            print(f"{formato:<9}{camino:<11}{r['ms']:>9}{r['rss_pico_mb']:>13}{r['sesion_mb']:>11}"
+                  f"{r['navegador_mpx']:>15}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump({"resolucion": args.resolucion, "resultados": resultados}, f, indent=2)
+        print(f"\nResultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Modo Hibrido vs Modo Marcas
+Proyecto Integrador - IFTS24
+
+Corre los dos modos de deteccion de app.py sobre las mismas gondolas
+sinteticas: hibrido (YOLO generico + clasificacion por color de cada caja)
+y marcas (best.pt de seis clases, la familia sale de la clase detectada y
+solo la clase bottle pasa por color). Informa throughput, latencia p50/p95,
+ms por etapa (yolo y color), recall y acierto de familia sobre las cajas
+reales emparejadas por IoU. Cada modo corre en un proceso aparte.
+
+El acierto del modo marcas solo es representativo con un best.pt entrenado
+sobre fotos parecidas a las sinteticas; el de color no depende del modelo.
+
+Uso:
+    python benchmarks/bench_modos.py
+    python benchmarks/bench_modos.py --modelo-marcas runs/train/stockvision/weights/best.pt --imagenes 30
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import deteccion  # noqa: E402
+import gondola_sintetica  # noqa: E402
+import perfilado  # noqa: E402
+from bench_tiles import UMBRAL_IOU_RECALL, recall  # noqa: E402
+
+MODOS = ['hibrido', 'marcas']
+
+
+def acierto_familias(detecciones, data, indices, cajas, marcas):
+    """Aciertos de familia sobre las cajas reales con una deteccion a IoU >= umbral (la de mayor IoU)."""
+    if len(cajas) == 0 or len(indices) == 0:
+        return []
+    iou = deteccion.solapamiento(cajas, detecciones[indices, :4])
+    mejor = iou.argmax(axis=1)
+    return [data[mejor[i]]["Marca"] == marcas[i] for i in range(len(cajas)) if iou[i, mejor[i]] >= UMBRAL_IOU_RECALL]
+
+
+def medir(modo, ruta, resolucion, densidad, cantidad, conf, semilla):
+    """Corre en el proceso hijo: pipeline del modo sobre `cantidad` gondolas."""
+    ancho, alto = gondola_sintetica.parsear_resolucion(resolucion)
+    gondolas = [gondola_sintetica.generar_gondola(ancho, alto, densidad, semilla + i) for i in range(cantidad)]
+
+    model = deteccion.load_generic_model(ruta=ruta)
+    familias = deteccion.familias_modelo(model)
+    if modo == 'marcas' and familias is None:
+        raise SystemExit(f"[ERROR] {ruta} no tiene clases de marca (names: {dict(model.names)})")
+    perfilado.ACTIVO = True
+
+    def analizar(img):
+        detecciones = deteccion.detectar_botellas(model, cv2.cvtColor(img, cv2.COLOR_RGB2BGR), conf=conf)[0]
+        data, _, indices = deteccion.analizar_detecciones(img, detecciones, dibujar=False, familias=familias)
+        with perfilado.etapa('share'):
+            deteccion.calcular_share(data)
+        return detecciones, data, indices
+
+    analizar(gondolas[0][0])  # Calentamiento
+
+    latencias, recalls, aciertos, cantidades, trazas = [], [], [], [], []
+    inicio_total = time.perf_counter()
+    for img, cajas, marcas in gondolas:
+        with perfilado.traza('imagen') as traza:
+            inicio = time.perf_counter()
+            detecciones, data, indices = analizar(img)
+            latencias.append(time.perf_counter() - inicio)
+        trazas.append(traza)
+        cantidades.append(len(detecciones))
+        valor = recall(detecciones, cajas)
+        if valor is not None:
+            recalls.append(valor)
+        aciertos.extend(acierto_familias(detecciones, data, indices, cajas, marcas))
+    duracion = time.perf_counter() - inicio_total
+
+    etapas = {}
+    for traza in trazas:
+        for nombre, ms in traza.etapas().items():
+            etapas[nombre] = etapas.get(nombre, 0.0) + ms / len(trazas)
+
+    latencias = np.array(latencias) * 1000
+    return {
+        "modo": modo,
+        "modelo": ruta or 'por defecto',
+        "imagenes_por_segundo": round(cantidad / duracion, 2),
+        "latencia_p50_ms": round(float(np.percentile(latencias, 50)), 1),
+        "latencia_p95_ms": round(float(np.percentile(latencias, 95)), 1),
+        "detecciones_media": round(float(np.mean(cantidades)), 1),
+        "recall": round(float(np.mean(recalls)), 3) if recalls else None,
+        "acierto_familia": round(float(np.mean(aciertos)), 3) if aciertos else None,
+        "etapas_ms": {nombre: round(ms, 1) for nombre, ms in etapas.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara el modo hibrido (YOLO + color) con el modo marcas (best.pt)")
+    parser.add_argument('--modelo-generico',
+                        help="Pesos del modo hibrido (por defecto STOCKVISION_MODELO o yolov8n.pt)")
+    parser.add_argument('--modelo-marcas', default=deteccion.MODELO_MARCAS, help="Pesos de seis clases")
+    parser.add_argument('--resolucion', default='1920x1080', help="ANCHOxALTO de las gondolas")
+    parser.add_argument('--densidad', type=int, default=12, help="Botellas por estante")
+    parser.add_argument('--imagenes', type=int, default=20)
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--salida', help="Guardar resultados en JSON")
+    parser.add_argument('--modo', choices=MODOS, help=argparse.SUPPRESS)  # Uso interno: proceso hijo
+    parser.add_argument('--ruta', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.modo:
+        print(json.dumps(medir(args.modo, args.ruta, args.resolucion, args.densidad, args.imagenes, args.conf,
+                               args.semilla)))
+        return
+
+    print("="*60)
+    print("BENCHMARK - MODO HIBRIDO VS MODO MARCAS")
+    print("="*60)
+
+    rutas = {'hibrido': args.modelo_generico, 'marcas': args.modelo_marcas}
+    resultados = []
+    for modo in MODOS:
+        if modo == 'marcas' and not os.path.exists(rutas[modo]):
+            print(f"[ERROR] No existe {rutas[modo]}: se omite el modo marcas (entrenar con train_yolo_model.py)")
+            continue
+        comando = [sys.executable, __file__, '--modo', modo, '--resolucion', args.resolucion,
+                   '--densidad', str(args.densidad), '--imagenes', str(args.imagenes), '--conf', str(args.conf),
+                   '--semilla', str(args.semilla)]
+        if rutas[modo]:
+            comando += ['--ruta', rutas[modo]]
+        salida = subprocess.run(comando, capture_output=True, text=True, check=True).stdout
+        resultados.append(json.loads(salida.strip().splitlines()[-1]))
+        print(f"[OK] {modo} ({rutas[modo] or 'modelo por defecto'})")
+
+    print(f"\n{'Modo':<10}{'img/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'YOLO ms':>9}{'Color ms':>10}"
+          f"{'Det/img':>9}{'Recall':>8}{'Familia':>9}")
+    for r in resultados:
+        recall_txt = f"{r['recall']:.3f}" if r['recall'] is not None else '-'
+        familia_txt = f"{r['acierto_familia']:.3f}" if r['acierto_familia'] is not None else '-'
+        print(f"{r['modo']:<10}{r['imagenes_por_segundo']:>8}{r['latencia_p50_ms']:>9}{r['latencia_p95_ms']:>9}"
+              f"{r['etapas_ms'].get('yolo', 0):>9}{r['etapas_ms'].get('color', 0):>10}"
+              f"{r['detecciones_media']:>9}{recall_txt:>8}{familia_txt:>9}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
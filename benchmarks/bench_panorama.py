@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Panorama de Gondola con Varias Fotos
+Proyecto Integrador - IFTS24
+
+Genera una gondola sintetica ancha y la "fotografia" en N tomas solapadas
+(cada una con un corrimiento, una rotacion y una escala chicas, ruido y otro
+brillo). Sobre esas tomas mide:
+  - Registro: tiempo y error de alineacion (px medios en las esquinas de
+    cada toma contra la homografia real).
+  - Conteo: productos contados auditando cada foto por separado vs el
+    panorama (detecciones = cajas reales, para no depender del modelo),
+    contra las botellas reales visibles.
+  - Costo: tiempo de registro vs deteccion con el modelo, y pixeles que
+    pasan por YOLO en el panorama vs auditar todas las fotos completas.
+
+Uso:
+    python benchmarks/bench_panorama.py
+    python benchmarks/bench_panorama.py --tomas 6 --solape 0.4 --modelo best.pt --salida panorama.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import deteccion  # noqa: E402
+import gondola_sintetica  # noqa: E402
+import panorama_gondola  # noqa: E402
+
+
+def fotografiar(gondola, cajas, tomas, ancho_toma, alto_toma, semilla):
+    """
+    Devuelve [(toma_rgb, H_real, cajas_en_la_toma)]: H_real lleva la toma a la
+    gondola y las cajas son las botellas que entran completas en la toma.
+    """
+    rng = np.random.default_rng(semilla)
+    alto, ancho = gondola.shape[:2]
+    paso = (ancho - ancho_toma) / max(1, tomas - 1)
+    resultado = []
+    for t in range(tomas):
+        angulo = np.deg2rad(rng.uniform(-1.5, 1.5))
+        escala = rng.uniform(0.95, 1.05)
+        cx, cy = ancho_toma / 2, alto_toma / 2
+        giro = np.array([[escala * np.cos(angulo), -escala * np.sin(angulo), 0],
+                         [escala * np.sin(angulo), escala * np.cos(angulo), 0], [0, 0, 1]])
+        centrar = np.array([[1, 0, -cx], [0, 1, -cy], [0, 0, 1]])
+        ubicar = np.array([[1, 0, t * paso + cx], [0, 1, (alto - alto_toma) / 2 + cy + rng.uniform(-20, 20)],
+                           [0, 0, 1]])
+        H = ubicar @ giro @ centrar
+        toma = cv2.warpPerspective(gondola, np.linalg.inv(H), (ancho_toma, alto_toma), borderValue=(40, 40, 40))
+        ruido = rng.normal(0, 4, toma.shape) + rng.uniform(-15, 15)
+        toma = np.clip(toma + ruido, 0, 255).astype(np.uint8)
+        en_toma = panorama_gondola.proyectar_cajas(cajas, np.linalg.inv(H))
+        adentro = ((en_toma[:, 0] >= 0) & (en_toma[:, 1] >= 0) & (en_toma[:, 2] <= ancho_toma)
+                   & (en_toma[:, 3] <= alto_toma))
+        resultado.append((toma, H, en_toma[adentro], np.flatnonzero(adentro)))
+    return resultado
+
+
+def error_registro(tomas, homografias, alineadas):
+    """Error medio (px) de las esquinas de cada toma llevadas a la toma 0, estimado vs real."""
+    errores = []
+    a_referencia = np.linalg.inv(homografias[0])
+    for (toma, H_real, _, _), H, ok in zip(tomas, homografias, alineadas):
+        if not ok:
+            continue
+        vertices = panorama_gondola.esquinas(toma.shape[1], toma.shape[0])
+        real = panorama_gondola.proyectar(vertices, np.linalg.inv(tomas[0][1]) @ H_real)
+        estimado = panorama_gondola.proyectar(vertices, a_referencia @ H)
+        errores.append(np.linalg.norm(real - estimado, axis=1).mean())
+    return float(np.mean(errores)) if errores else None
+
+
+def conteo_panorama(tomas, homografias, regiones):
+    """Productos del panorama usando las cajas reales de cada region nueva como detecciones."""
+    proyectadas = []
+    for (_, _, cajas, _), H, region in zip(tomas, homografias, regiones):
+        if region is None:
+            continue
+        x1, y1, x2, y2 = region
+        dentro = cajas[(cajas[:, 0] >= x1) & (cajas[:, 1] >= y1) & (cajas[:, 2] <= x2) & (cajas[:, 3] <= y2)]
+        marco = panorama_gondola.proyectar_cajas(dentro, H)
+        proyectadas.append(np.column_stack([marco, np.full(len(marco), 0.9), np.zeros(len(marco))]))
+    detecciones = np.concatenate(proyectadas)
+    return len(panorama_gondola.fusionar(detecciones))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Registro, conteo y costo del modo panorama")
+    parser.add_argument('--tomas', type=int, default=4, help="Fotos de la gondola")
+    parser.add_argument('--solape', type=float, default=0.35, help="Fraccion de cada toma que se repite en la vecina")
+    parser.add_argument('--toma', default='1600x1200', help="ANCHOxALTO de cada foto")
+    parser.add_argument('--densidad', type=int, default=9, help="Botellas por estante en cada toma")
+    parser.add_argument('--modelo', help="Pesos para medir la deteccion (por defecto STOCKVISION_MODELO o yolov8n.pt)")
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--salida', help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("BENCHMARK - PANORAMA DE GONDOLA")
+    print("="*60)
+
+    ancho_toma, alto_toma = gondola_sintetica.parsear_resolucion(args.toma)
+    ancho = int(ancho_toma * (1 + (args.tomas - 1) * (1 - args.solape)))
+    densidad = round(args.densidad * ancho / ancho_toma)
+    gondola, cajas, _ = gondola_sintetica.generar_gondola(ancho, int(alto_toma * 1.1), densidad, args.semilla)
+    tomas = fotografiar(gondola, cajas, args.tomas, ancho_toma, alto_toma, args.semilla)
+    imagenes = [toma for toma, _, _, _ in tomas]
+    print(f"[OK] Gondola de {ancho}x{gondola.shape[0]} en {args.tomas} tomas de {args.toma} "
+          f"(solape {args.solape:.0%})")
+
+    inicio = time.perf_counter()
+    homografias, tamanio_marco, alineadas = panorama_gondola.registrar_fotos(imagenes)
+    regiones = panorama_gondola.regiones_nuevas([(t.shape[1], t.shape[0]) for t in imagenes], homografias)
+    registro_s = time.perf_counter() - inicio
+    visibles = len(np.unique(np.concatenate([indices for _, _, _, indices in tomas])))
+    conteo = {
+        "reales_visibles": visibles,
+        "fotos_por_separado": int(sum(len(c) for _, _, c, _ in tomas)),
+        "panorama": conteo_panorama(tomas, homografias, regiones),
+    }
+    print(f"[OK] Registro: {sum(alineadas)}/{args.tomas} tomas alineadas en {registro_s * 1000:.0f} ms")
+
+    model = deteccion.load_generic_model(ruta=args.modelo)
+    deteccion.calentar_modelo(model)
+    panorama_gondola.auditar_panorama(model, imagenes[:2], args.conf)  # Calentamiento
+    _, _, metricas, _ = panorama_gondola.auditar_panorama(model, imagenes, args.conf)
+    inicio = time.perf_counter()
+    por_separado = deteccion.detectar_botellas(model, [cv2.cvtColor(t, cv2.COLOR_RGB2BGR) for t in imagenes],
+                                               conf=args.conf)
+    for toma, detecciones in zip(imagenes, por_separado):
+        deteccion.analizar_detecciones(toma, detecciones, dibujar=False)
+    separado_s = time.perf_counter() - inicio
+    print("[OK] Deteccion")
+
+    resultados = {
+        "tomas": args.tomas, "solape": args.solape, "marco": list(tamanio_marco),
+        "alineadas": int(sum(alineadas)),
+        "error_registro_px": round(error_registro(tomas, homografias, alineadas), 2),
+        "conteo": conteo,
+        "metricas_panorama": metricas,
+        "fotos_por_separado_s": round(separado_s, 3),
+    }
+
+    print(f"\nAlineacion: {resultados['alineadas']}/{args.tomas} tomas, error medio "
+          f"{resultados['error_registro_px']} px, marco {tamanio_marco[0]}x{tamanio_marco[1]}")
+    print(f"\n{'Conteo':<28}{'Productos':>10}{'Error':>9}")
+    for nombre, valor in conteo.items():
+        error = f"{(valor - visibles) / visibles:+.0%}" if nombre != "reales_visibles" else "-"
+        print(f"{nombre:<28}{valor:>10}{error:>9}")
+    print(f"\n{'Costo':<28}{'Segundos':>10}{'Pixeles':>9}")
+    print(f"{'Panorama: registro':<28}{metricas['segundos_registro']:>10}{'-':>9}")
+    print(f"{'Panorama: deteccion':<28}{metricas['segundos_deteccion']:>10}{metricas['fraccion_inferida']:>9.0%}")
+    print(f"{'Panorama: fusion':<28}{metricas['segundos_fusion']:>10}{'-':>9}")
+    print(f"{'Fotos por separado':<28}{resultados['fotos_por_separado_s']:>10}{1:>9.0%}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+        print(f"\nResultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Pipeline Completo sobre Gondolas Sinteticas
+Proyecto Integrador - IFTS24
+
+Corre el mismo camino que app.py (YOLO + color + dibujo + Share of Shelf)
+sobre gondolas generadas con gondola_sintetica.py, sin descargar nada. Por
+escenario (resolucion y densidad) informa throughput, latencia p50/p95/p99,
+memoria pico (RSS), tiempo medio por etapa, recall de YOLO y acierto del
+clasificador de color sobre las cajas reales. Si YOLO no encuentra ninguna
+botella en una gondola (el yolov8n generico no reconoce las sinteticas),
+color y Share of Shelf corren sobre las cajas reales para que esas etapas
+se midan igual, y el resumen lo avisa. Cada escenario corre en un proceso
+aparte y los resultados se guardan en JSON con el commit actual para
+comparar corridas.
+
+Uso:
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --escenarios 1280x720:8 4032x3024:20 --imagenes 30
+    python benchmarks/bench_pipeline.py --comparar resultados_bench/pipeline_abc1234.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import deteccion  # noqa: E402
+import gondola_sintetica  # noqa: E402
+import perfilado  # noqa: E402
+from bench_tiles import recall  # noqa: E402
+
+ESCENARIOS = ['1280x720:8', '1920x1080:12', '4032x3024:20']  # ANCHOxALTO:botellas por estante
+DIRECTORIO_RESULTADOS = 'resultados_bench'
+# Metricas comparadas con --comparar (True: mayor es mejor)
+METRICAS_COMPARADAS = {
+    "imagenes_por_segundo": True,
+    "latencia_p50_ms": False,
+    "latencia_p95_ms": False,
+    "rss_pico_mb": False,
+    "recall": True,
+    "acierto_color": True,
+}
+
+
+def commit_actual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=Path(__file__).resolve().parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconocido'
+
+
+def medir_escenario(escenario, cantidad, conf, semilla, ruta):
+    """Corre en el proceso hijo: pipeline completo sobre `cantidad` gondolas."""
+    texto_resolucion, densidad = escenario.split(':')
+    ancho, alto = gondola_sintetica.parsear_resolucion(texto_resolucion)
+    gondolas = [gondola_sintetica.generar_gondola(ancho, alto, int(densidad), semilla + i) for i in range(cantidad)]
+
+    model = deteccion.load_generic_model(ruta=ruta)
+    familias = deteccion.familias_modelo(model)
+    perfilado.ACTIVO = True
+
+    def analizar(img, reales):
+        detecciones = deteccion.detectar_botellas(model, cv2.cvtColor(img, cv2.COLOR_RGB2BGR), conf=conf)[0]
+        # Sin detecciones, color y share sobre las cajas reales (clasificadas por color, como el modo hibrido)
+        cajas, familias_cajas = (detecciones, familias) if len(detecciones) else (reales, None)
+        data, _, _ = deteccion.analizar_detecciones(img, cajas, familias=familias_cajas)
+        with perfilado.etapa('share'):
+            deteccion.calcular_share(data)
+        return detecciones
+
+    def con_confianza(cajas):
+        return np.column_stack([cajas, np.ones((len(cajas), 2), dtype=np.float32)])
+
+    analizar(gondolas[0][0], con_confianza(gondolas[0][1]))  # Calentamiento
+
+    latencias, recalls, aciertos, cantidades, trazas = [], [], [], [], []
+    inicio_total = time.perf_counter()
+    for img, cajas, marcas in gondolas:
+        reales = con_confianza(cajas)
+        with perfilado.traza('imagen') as traza:
+            inicio = time.perf_counter()
+            detecciones = analizar(img, reales)
+            latencias.append(time.perf_counter() - inicio)
+        trazas.append(traza)
+        cantidades.append(len(detecciones))
+        valor = recall(detecciones, cajas)
+        if valor is not None:
+            recalls.append(valor)
+
+        # Clasificador de color aislado de YOLO: cajas reales
+        data, _, indices = deteccion.analizar_detecciones(img, reales, dibujar=False)
+        aciertos.extend(d["Marca"] == marcas[i] for d, i in zip(data, indices))
+    duracion = time.perf_counter() - inicio_total
+
+    etapas = {}
+    for traza in trazas:
+        for nombre, ms in traza.etapas().items():
+            etapas[nombre] = etapas.get(nombre, 0.0) + ms / len(trazas)
+
+    latencias = np.array(latencias) * 1000
+    return {
+        "escenario": escenario,
+        "imagenes": cantidad,
+        "botellas_por_imagen": round(float(np.mean([len(g[1]) for g in gondolas])), 1),
+        "imagenes_por_segundo": round(cantidad / duracion, 2),
+        "latencia_media_ms": round(float(latencias.mean()), 1),
+        "latencia_p50_ms": round(float(np.percentile(latencias, 50)), 1),
+        "latencia_p95_ms": round(float(np.percentile(latencias, 95)), 1),
+        "latencia_p99_ms": round(float(np.percentile(latencias, 99)), 1),
+        "rss_pico_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "detecciones_media": round(float(np.mean(cantidades)), 1),
+        "imagenes_con_cajas_reales": int(sum(c == 0 for c in cantidades)),
+        "recall": round(float(np.mean(recalls)), 3) if recalls else None,
+        "acierto_color": round(float(np.mean(aciertos)), 3) if aciertos else None,
+        "etapas_ms": {nombre: round(ms, 1) for nombre, ms in etapas.items()},
+    }
+
+
+def comparar(actuales, ruta_base):
+    """Imprime la variacion (%) de cada metrica contra una corrida anterior."""
+    with open(ruta_base, 'r', encoding='utf-8') as f:
+        base = json.load(f)
+    previos = {r["escenario"]: r for r in base["resultados"]}
+    print(f"\nComparacion contra {base['meta']['commit']} ({ruta_base}):")
+    for r in actuales:
+        anterior = previos.get(r["escenario"])
+        if not anterior:
+            continue
+        cambios = []
+        for metrica, mayor_mejor in METRICAS_COMPARADAS.items():
+            if r.get(metrica) is None or not anterior.get(metrica):
+                continue
+            variacion = (r[metrica] - anterior[metrica]) / anterior[metrica] * 100
+            marca = '+' if (variacion >= 0) == mayor_mejor else '-'
+            cambios.append(f"{metrica} {variacion:+.1f}% ({marca})")
+        print(f"  {r['escenario']:<14} " + " | ".join(cambios))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark reproducible del pipeline con gondolas sinteticas")
+    parser.add_argument('--escenarios', nargs='+', default=ESCENARIOS, help="ANCHOxALTO:botellas_por_estante")
+    parser.add_argument('--imagenes', type=int, default=20, help="Gondolas por escenario")
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--modelo', help="Pesos a usar (por defecto STOCKVISION_MODELO o yolov8n.pt)")
+    parser.add_argument('--salida', help="JSON de resultados (por defecto resultados_bench/pipeline_<commit>.json)")
+    parser.add_argument('--comparar', help="JSON de una corrida anterior")
+    parser.add_argument('--escenario', help=argparse.SUPPRESS)  # Uso interno: proceso hijo
+    args = parser.parse_args()
+
+    if args.escenario:
+        print(json.dumps(medir_escenario(args.escenario, args.imagenes, args.conf, args.semilla, args.modelo)))
+        return
+
+    print("="*60)
+    print("BENCHMARK - PIPELINE COMPLETO (GONDOLAS SINTETICAS)")
+    print("="*60)
+
+    resultados = []
+    for escenario in args.escenarios:
+        comando = [sys.executable, __file__, '--escenario', escenario, '--imagenes', str(args.imagenes),
+                   '--conf', str(args.conf), '--semilla', str(args.semilla)]
+        if args.modelo:
+            comando += ['--modelo', args.modelo]
+        salida = subprocess.run(comando, capture_output=True, text=True, check=True).stdout
+        resultados.append(json.loads(salida.strip().splitlines()[-1]))
+        print(f"[OK] {escenario}")
+
+    print(f"\n{'Escenario':<14}{'img/s':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'RSS MB':>9}"
+          f"{'Recall':>8}{'Color':>7}")
+    for r in resultados:
+        recall_txt = f"{r['recall']:.3f}" if r['recall'] is not None else '-'
+        print(f"{r['escenario']:<14}{r['imagenes_por_segundo']:>8}{r['latencia_p50_ms']:>10}"
+              f"{r['latencia_p95_ms']:>10}{r['latencia_p99_ms']:>10}{r['rss_pico_mb']:>9}"
+              f"{recall_txt:>8}{r['acierto_color']:>7}")
+    for r in resultados:
+        if not r['recall'] or r['imagenes_con_cajas_reales']:
+            print(f"[AVISO] {r['escenario']}: YOLO no detecto botellas en {r['imagenes_con_cajas_reales']} de "
+                  f"{r['imagenes']} gondolas (recall {r['recall']}). Color y share se midieron sobre las cajas "
+                  "reales y la etapa de YOLO sobre salida vacia: no es una medicion del pipeline con este modelo")
+
+    commit = commit_actual()
+    documento = {
+        "meta": {
+            "commit": commit,
+            "fecha": time.strftime('%Y-%m-%d %H:%M:%S'),
+            "modelo": args.modelo or 'por defecto',
+            "python": platform.python_version(),
+            "cpu": platform.processor() or platform.machine(),
+            "nucleos": len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count(),
+            "imagenes": args.imagenes,
+            "conf": args.conf,
+            "semilla": args.semilla,
+        },
+        "resultados": resultados,
+    }
+    salida = Path(args.salida or Path(DIRECTORIO_RESULTADOS) / f"pipeline_{commit}.json")
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    with open(salida, 'w', encoding='utf-8') as f:
+        json.dump(documento, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados guardados en {salida}")
+
+    if args.comparar:
+        comparar(resultados, args.comparar)
+
+
+if __name__ == "__main__":
+    main()
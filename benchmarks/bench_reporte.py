@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Reporte Gerencial por Rerun
+Proyecto Integrador - IFTS24
+
+Mide lo que paga cada rerun de Streamlit (cambiar el precio unitario o de
+pestaña) para mostrar el reporte y la exportacion de un analisis con N
+detecciones:
+  - anterior: DataFrame de las detecciones, groupby del share, grafico de
+    plotly y un segundo DataFrame + CSV, en cada rerun.
+  - memoizado: reporte_gerencial.ReporteAnalisis; se informa el primer
+    armado (al guardar el analisis) y un rerun, que solo lee lo calculado.
+En los dos casos se cuenta la serializacion del grafico que hace
+st.plotly_chart. El CSV y el Excel del camino memoizado se miden aparte:
+se generan al hacer clic en la descarga, una vez por analisis.
+
+Uso:
+    python benchmarks/bench_reporte.py
+    python benchmarks/bench_reporte.py --detecciones 1000 100000 1000000 --repeticiones 10
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import deteccion  # noqa: E402
+import reporte_gerencial  # noqa: E402
+
+MARCAS = list(reporte_gerencial.COLORES_GRAFICO)
+
+
+def generar_data(cantidad, semilla=0):
+    """data_marketing sintetico: una fila {Marca, Area} por deteccion."""
+    rng = np.random.default_rng(semilla)
+    marcas = rng.choice(len(MARCAS), cantidad, p=(0.4, 0.35, 0.25))
+    areas = rng.integers(2_000, 60_000, cantidad)
+    return [{"Marca": MARCAS[m], "Area": int(a)} for m, a in zip(marcas, areas)]
+
+
+def rerun_anterior(data):
+    """Lo que hacia app.py en cada rerun (pestañas Reporte y Exportar)."""
+    df = pd.DataFrame(data)
+    df_res = deteccion.calcular_share(data)
+    fig = px.pie(df_res, values='Area', names='Marca', hole=0.5, color='Marca',
+                 color_discrete_map=reporte_gerencial.COLORES_GRAFICO)
+    fig.update_layout(paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)", font_color="white",
+                      margin=dict(t=30, b=0, l=0, r=0))
+    pio.to_json(fig)
+    csv = pd.DataFrame(data).to_csv(index=False).encode('utf-8')
+    return len(df), df_res.iloc[0], csv
+
+
+def rerun_memoizado(reporte):
+    """Lo que hace app.py en cada rerun con el reporte guardado en la sesion."""
+    pio.to_json(reporte.figura)
+    return reporte.productos, reporte.lider, reporte.share
+
+
+def cronometrar(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return round(float(np.median(tiempos)), 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Costo por rerun del reporte: anterior vs memoizado")
+    parser.add_argument('--detecciones', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--salida', help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("BENCHMARK - REPORTE GERENCIAL POR RERUN")
+    print("="*60)
+
+    rerun_memoizado(reporte_gerencial.ReporteAnalisis(0, generar_data(10)))  # Calentamiento de pandas/plotly
+    resultados = []
+    for cantidad in args.detecciones:
+        data = generar_data(cantidad)
+
+        def armar():
+            reporte = reporte_gerencial.ReporteAnalisis(1, data)
+            rerun_memoizado(reporte)
+            return reporte
+
+        reporte = armar()
+        anterior = rerun_anterior(data)
+        iguales = (anterior[0] == reporte.productos and anterior[1]['Marca'] == reporte.lider['Marca']
+                   and anterior[1]['Share (%)'] == reporte.lider['Share (%)'] and anterior[2] == reporte.csv)
+        fila = {
+            "detecciones": cantidad,
+            "anterior_ms": cronometrar(lambda: rerun_anterior(data), args.repeticiones),
+            "primer_armado_ms": cronometrar(armar, args.repeticiones),
+            "rerun_ms": cronometrar(lambda: rerun_memoizado(reporte), args.repeticiones),
+            "csv_ms": cronometrar(lambda: reporte_gerencial.ReporteAnalisis(1, data).csv, args.repeticiones),
+            "excel_ms": (cronometrar(lambda: reporte_gerencial.ReporteAnalisis(1, data).excel, args.repeticiones)
+                         if reporte_gerencial.EXCEL_DISPONIBLE else None),
+            "mismo_resultado": bool(iguales),
+        }
+        resultados.append(fila)
+        print(f"[OK] {cantidad} detecciones" + ("" if iguales else " [ERROR] el reporte no coincide"))
+
+    print(f"\n{'Detecciones':>12}{'Anterior ms':>13}{'Armado ms':>11}{'Rerun ms':>10}{'CSV ms':>9}{'Excel ms':>10}")
+    for r in resultados:
+        excel_txt = r['excel_ms'] if r['excel_ms'] is not None else '-'
+        print(f"{r['detecciones']:>12}{r['anterior_ms']:>13}{r['primer_armado_ms']:>11}{r['rerun_ms']:>10}"
+              f"{r['csv_ms']:>9}{excel_txt:>10}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+        print(f"\nResultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
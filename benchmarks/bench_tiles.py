@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Inferencia por Tiles vs Pasada Unica
+Proyecto Integrador - IFTS24
+
+Compara latencia por imagen, memoria pico (RSS) y recall entre el camino
+actual de app.py (imagen completa reducida a 640) y la inferencia por tiles.
+Cada modo corre en un proceso aparte para que la memoria pico no se mezcle.
+
+Uso:
+    python benchmarks/bench_tiles.py fotos/ --labels datasets/labels/val
+    python benchmarks/bench_tiles.py fotos/ --tiles 640:0.2 960:0.25
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import deteccion  # noqa: E402
+import inferencia_tiles  # noqa: E402
+from auditoria_batch import listar_imagenes  # noqa: E402
+
+UMBRAL_IOU_RECALL = 0.5
+
+
+def leer_etiquetas(ruta_label, alto, ancho):
+    """Lee un .txt YOLO (clase xc yc w h normalizados) y devuelve cajas xyxy en pixeles."""
+    if not ruta_label.exists():
+        return None
+    datos = np.loadtxt(ruta_label, ndmin=2, comments='#')
+    if datos.size == 0:
+        return np.zeros((0, 4))
+    xc, yc, w, h = datos[:, 1] * ancho, datos[:, 2] * alto, datos[:, 3] * ancho, datos[:, 4] * alto
+    return np.stack([xc - w / 2, yc - h / 2, xc + w / 2, yc + h / 2], axis=1)
+
+
+def recall(detecciones, reales, umbral=UMBRAL_IOU_RECALL):
+    """Fraccion de cajas reales cubiertas por alguna deteccion con IoU >= umbral."""
+    if len(reales) == 0:
+        return None
+    if len(detecciones) == 0:
+        return 0.0
+    iou = deteccion.solapamiento(reales, detecciones)
+    return float((iou.max(axis=1) >= umbral).mean())
+
+
+def medir_modo(modo, rutas, dir_labels, conf):
+    """Corre un modo sobre todas las imagenes (dentro del proceso hijo)."""
+    model = deteccion.load_generic_model()
+    tiles = None if modo == 'unica' else tuple(float(v) for v in modo.split(':'))
+
+    def detectar(img):
+        if tiles:
+            return inferencia_tiles.detectar_tiles(model, img, conf=conf, tamanio=int(tiles[0]), solape=tiles[1])
+        # Como en detectar_tiles: ultralytics lee los arrays como BGR
+        return deteccion.detectar_botellas(model, cv2.cvtColor(img, cv2.COLOR_RGB2BGR), conf=conf)[0]
+
+    detectar(deteccion.cargar_imagen(rutas[0]))  # Calentamiento
+
+    latencias, recalls, cantidades = [], [], []
+    for ruta in rutas:
+        img = deteccion.cargar_imagen(ruta)
+        inicio = time.perf_counter()
+        detecciones = detectar(img)
+        latencias.append(time.perf_counter() - inicio)
+        cantidades.append(len(detecciones))
+
+        if dir_labels:
+            reales = leer_etiquetas(Path(dir_labels) / f"{Path(ruta).stem}.txt", *img.shape[:2])
+            if reales is not None:
+                valor = recall(detecciones, reales)
+                if valor is not None:
+                    recalls.append(valor)
+
+    latencias = np.array(latencias) * 1000
+    return {
+        "modo": modo,
+        "imagenes": len(rutas),
+        "latencia_media_ms": round(float(latencias.mean()), 1),
+        "latencia_p95_ms": round(float(np.percentile(latencias, 95)), 1),
+        "rss_pico_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "detecciones_media": round(float(np.mean(cantidades)), 1),
+        "recall": round(float(np.mean(recalls)), 3) if recalls else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de inferencia por tiles")
+    parser.add_argument('entrada', help="Carpeta con fotos o manifiesto")
+    parser.add_argument('--labels', help="Carpeta con etiquetas YOLO (.txt) para medir recall")
+    parser.add_argument('--tiles', nargs='+', default=['640:0.2'], help="Configuraciones tamanio:solape")
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--limite', type=int, default=50, help="Maximo de imagenes a usar")
+    parser.add_argument('--salida', help="Guardar resultados en JSON")
+    parser.add_argument('--modo', help=argparse.SUPPRESS)  # Uso interno: proceso hijo
+    args = parser.parse_args()
+
+    rutas = listar_imagenes(args.entrada)[:args.limite]
+    if not rutas:
+        print(f"[ERROR] No se encontraron imagenes en {args.entrada}")
+        return
+
+    if args.modo:
+        print(json.dumps(medir_modo(args.modo, rutas, args.labels, args.conf)))
+        return
+
+    print("="*60)
+    print("BENCHMARK - TILES VS PASADA UNICA")
+    print("="*60)
+
+    resultados = []
+    for modo in ['unica'] + args.tiles:
+        comando = [sys.executable, __file__, args.entrada, '--modo', modo, '--conf', str(args.conf),
+                   '--limite', str(args.limite)]
+        if args.labels:
+            comando += ['--labels', args.labels]
+        salida = subprocess.run(comando, capture_output=True, text=True, check=True).stdout
+        resultados.append(json.loads(salida.strip().splitlines()[-1]))
+
+    print(f"\n{'Modo':<12}{'Media ms':>10}{'p95 ms':>10}{'RSS MB':>10}{'Cajas':>8}{'Recall':>8}")
+    for r in resultados:
+        recall_txt = f"{r['recall']:.3f}" if r['recall'] is not None else '-'
+        print(f"{r['modo']:<12}{r['latencia_media_ms']:>10}{r['latencia_p95_ms']:>10}"
+              f"{r['rss_pico_mb']:>10}{r['detecciones_media']:>8}{recall_txt:>8}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+        print(f"\nResultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Generador de Gondolas Sinteticas
+Proyecto Integrador - IFTS24
+
+Dibuja fotos de gondola reproducibles (misma semilla, misma imagen) sin
+descargar nada: estantes con botellas de etiqueta roja, azul u otros colores,
+con la resolucion y densidad pedidas. Devuelve tambien las cajas y la marca
+de cada botella para medir recall y acierto de color.
+
+Uso:
+    python benchmarks/gondola_sintetica.py sinteticas/ --cantidad 20 --resolucion 1920x1080 --densidad 12
+    (guarda JPEG + etiquetas YOLO, listas para bench_tiles.py --labels)
+"""
+
+import argparse
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Colores de etiqueta (RGB) por familia
+COLORES_ETIQUETA = {
+    "Familia Coca-Cola": [(200, 16, 30), (225, 35, 35), (180, 10, 20)],
+    "Familia PepsiCo": [(20, 60, 190), (30, 90, 220), (15, 40, 150)],
+    "Otros / Genérico": [(240, 200, 40), (40, 160, 60), (235, 235, 230), (240, 130, 20)],
+}
+PROPORCION_MARCAS = (0.4, 0.35, 0.25)
+# Liquido oscuro (V < 50 en HSV, no cuenta como rojo) o botella transparente
+COLORES_LIQUIDO = [(30, 18, 12), (190, 200, 205), (170, 190, 160)]
+ALTO_ESTANTE = 360  # Alto aproximado de cada estante en pixeles a 1080p
+
+
+def parsear_resolucion(texto):
+    ancho, alto = (int(v) for v in texto.lower().split('x'))
+    return ancho, alto
+
+
+def generar_gondola(ancho=1920, alto=1080, densidad=12, semilla=0):
+    """
+    Devuelve (img_rgb, cajas (N, 4) xyxy, marcas). `densidad` es la cantidad
+    de botellas por estante; los estantes se reparten segun el alto.
+    """
+    rng = np.random.default_rng(semilla)
+    escala = alto / 1080
+    img = np.full((alto, ancho, 3), 205, dtype=np.uint8)
+    img[:] = np.array([205, 200, 190]) + rng.integers(-8, 8, 3)
+
+    estantes = max(1, round(alto / (ALTO_ESTANTE * escala)))
+    alto_estante = alto / estantes
+    grosor_tabla = max(4, int(alto_estante * 0.06))
+    familias = list(COLORES_ETIQUETA)
+    cajas, marcas = [], []
+
+    for e in range(estantes):
+        piso = int((e + 1) * alto_estante) - grosor_tabla
+        cv2.rectangle(img, (0, piso), (ancho, piso + grosor_tabla), (90, 85, 80), -1)
+
+        hueco = ancho / densidad
+        for b in range(densidad):
+            ancho_botella = int(hueco * rng.uniform(0.55, 0.8))
+            alto_botella = int(alto_estante * rng.uniform(0.62, 0.82))
+            x1 = int(b * hueco + (hueco - ancho_botella) * rng.uniform(0.2, 0.8))
+            x2, y2 = x1 + ancho_botella, piso - 1
+            y1 = y2 - alto_botella
+
+            familia = familias[rng.choice(len(familias), p=PROPORCION_MARCAS)]
+            etiqueta = COLORES_ETIQUETA[familia][rng.integers(len(COLORES_ETIQUETA[familia]))]
+            liquido = COLORES_LIQUIDO[rng.integers(len(COLORES_LIQUIDO))]
+
+            # Cuello y tapa
+            cuello = max(2, ancho_botella // 4)
+            centro = (x1 + x2) // 2
+            alto_cuello = int(alto_botella * 0.22)
+            cv2.rectangle(img, (centro - cuello, y1 + alto_botella // 14), (centro + cuello, y1 + alto_cuello),
+                          liquido, -1)
+            cv2.rectangle(img, (centro - cuello - 1, y1), (centro + cuello + 1, y1 + alto_botella // 14),
+                          etiqueta, -1)
+            # Cuerpo y etiqueta
+            cv2.rectangle(img, (x1, y1 + alto_cuello), (x2, y2), liquido, -1)
+            alto_etiqueta = int(alto_botella * rng.uniform(0.25, 0.35))
+            y_etiqueta = y1 + alto_cuello + int((alto_botella - alto_cuello - alto_etiqueta) * 0.45)
+            cv2.rectangle(img, (x1, y_etiqueta), (x2, y_etiqueta + alto_etiqueta), etiqueta, -1)
+            # Brillo vertical
+            brillo = max(1, ancho_botella // 10)
+            cv2.rectangle(img, (x1 + brillo, y1 + alto_cuello), (x1 + 2 * brillo, y2),
+                          tuple(min(255, c + 50) for c in liquido), -1)
+
+            cajas.append((x1, y1, x2, y2))
+            marcas.append(familia)
+
+    ruido = rng.normal(0, 4, img.shape)
+    img = np.clip(img + ruido, 0, 255).astype(np.uint8)
+    img = cv2.GaussianBlur(img, (3, 3), 0)
+    return img, np.array(cajas, dtype=np.float32).reshape(-1, 4), marcas
+
+
+def guardar_dataset(carpeta, cantidad, ancho, alto, densidad, semilla=0, clase=39):
+    """Escribe JPEG + etiquetas YOLO (por defecto clase 39 = bottle de COCO) en carpeta/images y carpeta/labels."""
+    carpeta = Path(carpeta)
+    (carpeta / 'images').mkdir(parents=True, exist_ok=True)
+    (carpeta / 'labels').mkdir(parents=True, exist_ok=True)
+    for i in range(cantidad):
+        img, cajas, _ = generar_gondola(ancho, alto, densidad, semilla + i)
+        nombre = f"gondola_{ancho}x{alto}_{densidad}_{semilla + i:04d}"
+        cv2.imwrite(str(carpeta / 'images' / f"{nombre}.jpg"), cv2.cvtColor(img, cv2.COLOR_RGB2BGR),
+                    [cv2.IMWRITE_JPEG_QUALITY, 92])
+        with open(carpeta / 'labels' / f"{nombre}.txt", 'w', encoding='utf-8') as f:
+            for x1, y1, x2, y2 in cajas:
+                f.write(f"{clase} {(x1 + x2) / 2 / ancho:.6f} {(y1 + y2) / 2 / alto:.6f} "
+                        f"{(x2 - x1) / ancho:.6f} {(y2 - y1) / alto:.6f}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera gondolas sinteticas con etiquetas YOLO")
+    parser.add_argument('salida', help="Carpeta destino (se crean images/ y labels/)")
+    parser.add_argument('--cantidad', type=int, default=20)
+    parser.add_argument('--resolucion', default='1920x1080', help="ANCHOxALTO")
+    parser.add_argument('--densidad', type=int, default=12, help="Botellas por estante")
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args()
+
+    ancho, alto = parsear_resolucion(args.resolucion)
+    guardar_dataset(args.salida, args.cantidad, ancho, alto, args.densidad, args.semilla)
+    print(f"[OK] {args.cantidad} gondolas de {ancho}x{alto} en {args.salida}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache Persistente de Detecciones
+Proyecto Integrador - IFTS24
+
+Guarda en disco las cajas crudas de YOLO (con su confianza) calculadas con la
+sensibilidad minima, indexadas por hash de la imagen + hash de los pesos.
+Subir la sensibilidad solo filtra las cajas guardadas y volver a subir la
+misma foto no vuelve a correr el modelo.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+import backends_inferencia
+import deteccion
+import inferencia_tiles
+import perfilado
+
+CONF_MINIMA = 0.1  # Minimo del slider "Sensibilidad IA"
+DIRECTORIO_CACHE = '.cache_detecciones'
+MAX_BYTES_CACHE = 256 * 1024**2
+
+_hashes_pesos = {}
+
+
+def hash_archivo(ruta, bloque=1024**2):
+    """SHA-256 de un archivo leido por bloques."""
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for chunk in iter(lambda: f.read(bloque), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def hash_modelo(model):
+    """Hash de los pesos del modelo (se calcula una vez por archivo y fecha de modificacion)."""
+    ruta = getattr(model, 'ckpt_path', None) or getattr(model, 'model_name', None) or 'yolov8n.pt'
+    if not os.path.exists(ruta):
+        return str(ruta)
+    firma = (str(ruta), os.path.getmtime(ruta))
+    if firma not in _hashes_pesos:
+        _hashes_pesos[firma] = hash_archivo(ruta)
+    return _hashes_pesos[firma]
+
+
+class CacheDetecciones:
+    """Cache LRU en disco de detecciones, acotada por tamanio total en bytes."""
+
+    def __init__(self, directorio=DIRECTORIO_CACHE, max_bytes=MAX_BYTES_CACHE):
+        self.directorio = Path(directorio)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # clave -> bytes, de la menos a la mas usada
+
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        archivos = sorted(self.directorio.glob('*.npy'), key=lambda p: p.stat().st_mtime)
+        for archivo in archivos:
+            self._entradas[archivo.stem] = archivo.stat().st_size
+        self._desalojar()
+
+    @staticmethod
+    def clave(contenido_imagen, hash_pesos):
+        """Clave de cache: hash del contenido de la imagen + hash de los pesos."""
+        h = hashlib.sha256(contenido_imagen)
+        h.update(hash_pesos.encode('utf-8'))
+        return h.hexdigest()
+
+    def _ruta(self, clave):
+        return self.directorio / f"{clave}.npy"
+
+    def obtener(self, clave, conf=CONF_MINIMA):
+        """Devuelve las detecciones con confianza >= conf, o None si no estan en cache."""
+        if conf < CONF_MINIMA:
+            return None
+        with self._lock:
+            if clave not in self._entradas:
+                self.misses += 1
+                return None
+            ruta = self._ruta(clave)
+            try:
+                detecciones = np.load(ruta)
+                os.utime(ruta)  # Marca de uso para el LRU entre reinicios
+            except OSError:
+                del self._entradas[clave]
+                self.misses += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.hits += 1
+        return detecciones[detecciones[:, 4] >= conf]
+
+    def guardar(self, clave, detecciones):
+        """Guarda las detecciones crudas (calculadas con CONF_MINIMA)."""
+        ruta = self._ruta(clave)
+        temporal = ruta.with_suffix('.tmp')
+        with open(temporal, 'wb') as f:
+            np.save(f, np.asarray(detecciones, dtype=np.float32))
+        os.replace(temporal, ruta)
+        with self._lock:
+            self._entradas[clave] = ruta.stat().st_size
+            self._entradas.move_to_end(clave)
+            self._desalojar()
+
+    def _desalojar(self):
+        """Borra las entradas menos usadas hasta respetar max_bytes."""
+        total = sum(self._entradas.values())
+        while total > self.max_bytes and self._entradas:
+            clave, tamanio = self._entradas.popitem(last=False)
+            total -= tamanio
+            try:
+                os.remove(self._ruta(clave))
+            except OSError:
+                pass
+
+    def estadisticas(self):
+        """Contadores de uso de la cache."""
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / consultas, 3) if consultas else 0.0,
+                "entradas": len(self._entradas),
+                "bytes": sum(self._entradas.values()),
+            }
+
+
+def detectar_botellas_cache(model, cache, imagen, contenido_imagen, conf=0.25, tiles=None, escala=1.0):
+    """
+    Como deteccion.detectar_botellas para una imagen, pero consultando la cache.
+    En un miss corre YOLO con CONF_MINIMA y guarda todas las cajas.
+    Con tiles=(tamanio, solape) usa la inferencia por tiles (entrada aparte en la cache).
+    Si `imagen` es la foto reducida (lado / lado original = escala), las cajas
+    se devuelven y se guardan en coordenadas de la original.
+    Devuelve (detecciones, clave) para poder refiltrar luego con cache.obtener.
+    """
+    def detectar(umbral):
+        if tiles:
+            detecciones = inferencia_tiles.detectar_tiles(model, imagen, conf=umbral, tamanio=tiles[0],
+                                                          solape=tiles[1])
+        else:
+            detecciones = deteccion.detectar_botellas(model, imagen, conf=umbral)[0]
+        if escala != 1.0:
+            detecciones = detecciones.copy()
+            detecciones[:, :4] /= escala
+        return detecciones
+
+    with perfilado.etapa('cache'):
+        # El imgsz efectivo entra en la clave: autoajuste.py puede cambiarlo sin tocar los pesos.
+        # Tambien la escala: con los mismos bytes fija el lado de trabajo (LADO_TRABAJO, o completa con tiles)
+        variante = (hash_modelo(model) + f"|imgsz:{backends_inferencia.imgsz_modelo(model)}|escala:{escala:.6g}"
+                    + (f"|tiles:{tiles[0]}:{tiles[1]}" if tiles else ''))
+        clave = CacheDetecciones.clave(contenido_imagen, variante)
+        detecciones = cache.obtener(clave, conf)
+    if detecciones is not None:
+        return detecciones, clave
+
+    if conf < CONF_MINIMA:
+        return detectar(conf), clave
+
+    crudas = detectar(CONF_MINIMA)
+    with perfilado.etapa('cache'):
+        cache.guardar(clave, crudas)
+    return crudas[crudas[:, 4] >= conf], clave
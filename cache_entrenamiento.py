@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache de Imagenes de Entrenamiento en Disco (memoria mapeada)
+Proyecto Integrador - IFTS24
+
+Decodifica y redimensiona una sola vez cada imagen de train/val al imgsz
+de entrenamiento y las guarda juntas en un archivo binario con un indice
+(offset y forma de cada imagen). Durante el entrenamiento el dataset lee
+cada imagen con un slice del archivo mapeado en memoria, sin decodificar
+JPEG: las paginas viven en la cache del sistema operativo, compartidas
+entre los workers del DataLoader y liberables bajo presion de memoria (a
+diferencia de cache='ram' de ultralytics, que fija todo en RAM).
+
+Las imagenes se guardan como las deja ultralytics antes de aumentar (lado
+mayor = imgsz, BGR), asi las etiquetas normalizadas siguen valiendo y el
+letterbox final lo hace el pipeline de aumentaciones.
+
+Uso:
+    python cache_entrenamiento.py datasets/data.yaml --imgsz 640
+    (train_yolo_model.py la arma sola si no existe; solo procesa lo nuevo o modificado)
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+from ultralytics.data import YOLODataset
+from ultralytics.models.yolo.detect import DetectionTrainer
+
+DIRECTORIO_CACHE = '.cache_entrenamiento'
+VERSION_CACHE = 1
+EN_VUELO = 64  # Imagenes decodificadas esperando a escribirse
+
+
+def redimensionar(ruta, imgsz):
+    """Lee en BGR y lleva el lado mayor a imgsz, con la misma cuenta que BaseDataset.load_image."""
+    im = cv2.imread(str(ruta), cv2.IMREAD_COLOR)
+    if im is None:
+        raise ValueError(f"No se pudo leer {ruta}")
+    h0, w0 = im.shape[:2]
+    r = imgsz / max(h0, w0)
+    if r != 1:
+        w, h = min(math.ceil(w0 * r), imgsz), min(math.ceil(h0 * r), imgsz)
+        im = cv2.resize(im, (w, h), interpolation=cv2.INTER_LINEAR)
+    return np.ascontiguousarray(im), (h0, w0)
+
+
+def ruta_cache(carpeta_imagenes, imgsz):
+    """datasets/images/train -> datasets/.cache_entrenamiento/images_train_640 (.bin + .json)."""
+    carpeta = Path(carpeta_imagenes).resolve()
+    return carpeta.parent.parent / DIRECTORIO_CACHE / f"{carpeta.parent.name}_{carpeta.name}_{imgsz}"
+
+
+class CacheImagenes:
+    """Indice columnar (rutas, firmas, offsets, formas) y archivo .bin mapeado de forma perezosa."""
+
+    def __init__(self, base, rutas, firmas, offsets, formas, imgsz):
+        self.base = Path(base)
+        self.rutas = rutas
+        self.firmas = firmas
+        self.offsets = np.asarray(offsets, dtype=np.int64).reshape(-1)
+        self.formas = np.asarray(formas, dtype=np.int32).reshape(-1, 4)  # h0, w0, h, w
+        self.imgsz = imgsz
+        self._datos = None
+
+    @classmethod
+    def cargar(cls, base, imgsz):
+        """Cache guardada para este imgsz, o None."""
+        base = Path(base)
+        try:
+            with open(Path(f"{base}.json"), 'r', encoding='utf-8') as f:
+                indice = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if indice.get("version") != VERSION_CACHE or indice.get("imgsz") != imgsz \
+                or not Path(f"{base}.bin").exists():
+            return None
+        return cls(base, indice["rutas"], [tuple(f) for f in indice["firmas"]], indice["offsets"],
+                   indice["formas"], imgsz)
+
+    @property
+    def datos(self):
+        # Se abre en cada proceso la primera vez que se usa (los workers no heredan el mapeo por pickle)
+        if self._datos is None:
+            self._datos = np.memmap(f"{self.base}.bin", dtype=np.uint8, mode='r')
+        return self._datos
+
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        estado['_datos'] = None
+        return estado
+
+    def bytes_totales(self):
+        return int((self.formas[:, 2].astype(np.int64) * self.formas[:, 3] * 3).sum())
+
+    def leer(self, fila):
+        """Copia de la imagen (las aumentaciones pueden escribir sobre ella), hw original y hw guardado."""
+        h0, w0, h, w = self.formas[fila]
+        inicio = self.offsets[fila]
+        im = np.array(self.datos[inicio:inicio + h * w * 3]).reshape(h, w, 3)
+        return im, (int(h0), int(w0)), (int(h), int(w))
+
+
+def firma_archivo(ruta):
+    stat = os.stat(ruta)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def preparar_cache(rutas, base, imgsz, workers=8):
+    """
+    Arma (o actualiza) la cache para estas imagenes. Las que ya estaban con la
+    misma firma se copian del archivo anterior; el resto se decodifica en un
+    pool de hilos. Devuelve el CacheImagenes listo para leer.
+    """
+    base = Path(base)
+    rutas = [os.path.abspath(r) for r in rutas]
+    firmas = [firma_archivo(r) for r in rutas]
+    anterior = CacheImagenes.cargar(base, imgsz)
+    if anterior is not None and anterior.rutas == rutas and anterior.firmas == firmas:
+        return anterior
+
+    previas = {}  # Ruta -> fila en la cache anterior, si la imagen no cambio
+    if anterior is not None:
+        actuales = dict(zip(rutas, firmas))
+        previas = {r: i for i, r in enumerate(anterior.rutas) if actuales.get(r) == anterior.firmas[i]}
+
+    base.parent.mkdir(parents=True, exist_ok=True)
+    temporal = Path(f"{base}.bin.tmp")
+    offsets, formas, validas, firmas_validas = [], [], [], []
+    reutilizadas, errores, posicion = 0, 0, 0
+    inicio = time.perf_counter()
+
+    def cargar(i):
+        ruta = rutas[i]
+        if ruta in previas:
+            return anterior.leer(previas[ruta])[:2]
+        try:
+            return redimensionar(ruta, imgsz)
+        except Exception as e:
+            return None, str(e)
+
+    with open(temporal, 'wb') as f, ThreadPoolExecutor(max_workers=workers) as pool:
+        pendientes = deque()
+        siguiente = 0
+        while pendientes or siguiente < len(rutas):
+            while siguiente < len(rutas) and len(pendientes) < EN_VUELO:
+                pendientes.append((siguiente, pool.submit(cargar, siguiente)))
+                siguiente += 1
+            i, futuro = pendientes.popleft()
+            im, hw0 = futuro.result()
+            if im is None:
+                errores += 1
+                print(f"  [ERROR] {rutas[i]}: {hw0}")
+                continue
+            reutilizadas += rutas[i] in previas
+            f.write(im.tobytes())
+            offsets.append(posicion)
+            formas.append((hw0[0], hw0[1], im.shape[0], im.shape[1]))
+            validas.append(rutas[i])
+            firmas_validas.append(firmas[i])
+            posicion += im.nbytes
+
+    os.replace(temporal, f"{base}.bin")
+    with open(Path(f"{base}.json"), 'w', encoding='utf-8') as f:
+        json.dump({"version": VERSION_CACHE, "imgsz": imgsz, "rutas": validas, "firmas": firmas_validas,
+                   "offsets": offsets, "formas": formas}, f)
+
+    print(f"  [OK] Cache {base.name}: {len(validas)} imagenes ({reutilizadas} reutilizadas, {errores} con error), "
+          f"{posicion / 1024**2:.0f} MB en {time.perf_counter() - inicio:.1f}s")
+    return CacheImagenes(base, validas, firmas_validas, offsets, formas, imgsz)
+
+
+class DatasetMemmap(YOLODataset):
+    """YOLODataset que lee las imagenes de la CacheImagenes en lugar de decodificar JPEG."""
+
+    def conectar_cache(self, cache):
+        self.cache_memmap = cache
+        posicion = {r: i for i, r in enumerate(cache.rutas)}
+        # Fila en la cache de cada imagen del dataset (-1: no esta, se lee del disco)
+        self.filas_cache = np.array([posicion.get(os.path.abspath(f), -1) for f in self.im_files], dtype=np.int64)
+
+    def load_image(self, i, rect_mode=True, resize_short=False):
+        fila = self.filas_cache[i]
+        if fila < 0 or not rect_mode or resize_short:
+            return super().load_image(i, rect_mode, resize_short)
+        im, hw0, hw = self.cache_memmap.leer(fila)
+        # Mosaic elige imagenes del buffer: se guardan solo los indices, la imagen ya esta en la cache
+        if self.augment:
+            self.buffer.append(i)
+            if 1 < len(self.buffer) >= self.max_buffer_length:
+                self.buffer.pop(0)
+        return im, hw0, hw
+
+
+class EntrenadorMemmap(DetectionTrainer):
+    """DetectionTrainer cuyos datasets de train y val leen de la cache mapeada (la arma si falta)."""
+
+    def build_dataset(self, img_path, mode='train', batch=None):
+        dataset = super().build_dataset(img_path, mode, batch)
+        if type(dataset) is not YOLODataset or not isinstance(img_path, str) or not Path(img_path).is_dir() \
+                or getattr(dataset, 'channels', 3) != 3:
+            return dataset  # Listas de archivos, datasets multimodales o no RGB: sin cache
+        cache = preparar_cache(dataset.im_files, ruta_cache(img_path, self.args.imgsz), self.args.imgsz)
+        dataset.__class__ = DatasetMemmap
+        dataset.conectar_cache(cache)
+        return dataset
+
+
+def carpetas_dataset(ruta_yaml):
+    """Carpetas de train/val declaradas en data.yaml (rutas relativas a `path`)."""
+    import yaml
+
+    with open(ruta_yaml, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    raiz = Path(config.get('path') or Path(ruta_yaml).parent)
+    if not raiz.is_absolute():
+        raiz = (Path(ruta_yaml).parent / raiz).resolve() if not raiz.exists() else raiz.resolve()
+    carpetas = []
+    for split in ('train', 'val'):
+        for valor in ([config[split]] if isinstance(config.get(split), str) else config.get(split) or []):
+            carpeta = Path(valor) if Path(valor).is_absolute() else raiz / valor
+            if carpeta.is_dir():
+                carpetas.append(carpeta)
+    return carpetas
+
+
+def main():
+    from prepare_dataset import EXTENSIONES_IMAGEN
+
+    parser = argparse.ArgumentParser(description="Pre-decodifica las imagenes de entrenamiento en una cache mapeada")
+    parser.add_argument('data', nargs='?', default='datasets/data.yaml')
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--workers', type=int, default=8, help="Hilos de decodificacion")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("CACHE DE ENTRENAMIENTO (MEMORIA MAPEADA)")
+    print("="*60)
+    for carpeta in carpetas_dataset(args.data):
+        rutas = sorted(str(p) for p in carpeta.rglob('*') if p.suffix.lower() in EXTENSIONES_IMAGEN)
+        preparar_cache(rutas, ruta_cache(carpeta, args.imgsz), args.imgsz, args.workers)
+
+
+if __name__ == "__main__":
+    main()
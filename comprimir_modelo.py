@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compresion del Modelo de Marcas: Poda de Canales + Destilacion
+Proyecto Integrador - IFTS24
+
+Achica el best.pt entrenado con train_yolo_model.py (las seis clases de
+datasets/data.yaml) en dos pasos:
+
+1. Poda estructurada: arma un alumno con la misma arquitectura y una fraccion
+   de los canales de cada capa (--ancho). De cada capa conserva los canales
+   cuya escala de BatchNorm (|gamma|) es mayor y copia sus pesos, siguiendo
+   los indices a traves de los C2f, SPPF, Concat y la cabeza Detect.
+2. Destilacion: reentrena el alumno a un imgsz menor con las etiquetas y con
+   el maestro (best.pt) como guia (distill_model de ultralytics: las
+   caracteristicas del cuello del alumno imitan las del maestro, pesadas por
+   las detecciones del maestro).
+
+El resultado se compara contra el maestro con evaluar_modelos.py.
+
+Uso:
+    python comprimir_modelo.py --maestro runs/train/stock_counter/weights/best.pt
+    python comprimir_modelo.py --ancho 0.5 --imgsz 480 --epocas 60
+    python comprimir_modelo.py --solo-podar      (solo arma el alumno podado, sin reentrenar)
+"""
+
+import argparse
+import os
+import time
+from copy import deepcopy
+from pathlib import Path
+
+import torch
+from torch import nn
+from ultralytics import YOLO, __version__
+from ultralytics.nn.modules import C2f, SPPF, Concat, Conv, Detect
+from ultralytics.nn.tasks import DetectionModel, load_checkpoint
+
+import train_yolo_model
+
+ANCHO_ALUMNO = 0.5     # Fraccion de canales que conserva cada capa
+IMGSZ_ALUMNO = 480
+PESO_DESTILACION = 6.0  # Mismo valor por defecto que ultralytics (dis)
+
+
+def canales_mayores(bn, cantidad):
+    """Indices (ordenados) de los `cantidad` canales con mayor |gamma| en el BatchNorm."""
+    return torch.argsort(bn.weight.detach().abs(), descending=True)[:cantidad].sort().values
+
+
+def copiar_conv(origen, destino, salida=None, entrada=None):
+    """Copia un Conv (conv + bn) del maestro al alumno quedandose con esos canales (None: todos)."""
+    peso = origen.conv.weight.detach()
+    if salida is not None:
+        peso = peso[salida]
+    if entrada is not None:
+        peso = peso[:, entrada]
+    destino.conv.weight.data.copy_(peso)
+    for nombre in ('weight', 'bias', 'running_mean', 'running_var'):
+        valor = getattr(origen.bn, nombre).detach()
+        getattr(destino.bn, nombre).data.copy_(valor if salida is None else valor[salida])
+
+
+def podar_conv(origen, destino, entrada):
+    salida = canales_mayores(origen.bn, destino.conv.out_channels)
+    copiar_conv(origen, destino, salida, entrada)
+    return salida
+
+
+def podar_c2f(origen, destino, entrada):
+    """
+    cv1 se parte en dos mitades: la primera va directo a cv2 y la segunda
+    alimenta la cadena de Bottlenecks. Con residual, la cadena entera comparte
+    los mismos canales (se eligen sumando |gamma| de todas sus capas).
+    """
+    c, c_alumno = origen.c, destino.c
+    gamma = origen.cv1.bn.weight.detach().abs()
+    directa = torch.argsort(gamma[:c], descending=True)[:c_alumno].sort().values
+    if origen.m and origen.m[0].add:
+        importancia = gamma[c:] + sum(b.cv2.bn.weight.detach().abs() for b in origen.m)
+    else:
+        importancia = gamma[c:]
+    cadena = torch.argsort(importancia, descending=True)[:c_alumno].sort().values
+    copiar_conv(origen.cv1, destino.cv1, torch.cat([directa, cadena + c]), entrada)
+
+    partes = [directa, cadena]
+    actual = cadena
+    for b_origen, b_destino in zip(origen.m, destino.m):
+        oculta = podar_conv(b_origen.cv1, b_destino.cv1, actual)
+        if b_origen.add:
+            copiar_conv(b_origen.cv2, b_destino.cv2, actual, oculta)
+        else:
+            actual = podar_conv(b_origen.cv2, b_destino.cv2, oculta)
+        partes.append(actual)
+
+    concatenados = torch.cat([p + i * c for i, p in enumerate(partes)])
+    return podar_conv(origen.cv2, destino.cv2, concatenados)
+
+
+def podar_sppf(origen, destino, entrada):
+    oculta = podar_conv(origen.cv1, destino.cv1, entrada)
+    c = origen.cv1.conv.out_channels
+    repeticiones = getattr(origen, 'n', 3) + 1
+    return podar_conv(origen.cv2, destino.cv2, torch.cat([oculta + i * c for i in range(repeticiones)]))
+
+
+def podar_detect(origen, destino, entradas):
+    """Ramas de caja (cv2) y clase (cv3) de cada nivel; las salidas finales se copian completas."""
+    for ramas_origen, ramas_destino in ((origen.cv2, destino.cv2), (origen.cv3, destino.cv3)):
+        for rama_origen, rama_destino, entrada in zip(ramas_origen, ramas_destino, entradas):
+            actual = entrada
+            for capa_origen, capa_destino in zip(rama_origen[:-1], rama_destino[:-1]):
+                actual = podar_conv(capa_origen, capa_destino, actual)
+            rama_destino[-1].weight.data.copy_(rama_origen[-1].weight.detach()[:, actual])
+            rama_destino[-1].bias.data.copy_(rama_origen[-1].bias.detach())
+    destino.dfl.load_state_dict(origen.dfl.state_dict())
+
+
+def yaml_alumno(maestro, ancho):
+    """Arquitectura del maestro con el multiplicador de ancho reducido."""
+    yaml = deepcopy(maestro.yaml)
+    if yaml.get('scales'):
+        escala = yaml.get('scale') or next(iter(yaml['scales']))
+        profundidad, multiplicador, max_canales = yaml['scales'][escala]
+        yaml['scales'] = {escala: [profundidad, multiplicador * ancho, max_canales]}
+        yaml['scale'] = escala
+    else:
+        yaml['width_multiple'] = yaml.get('width_multiple', 1.0) * ancho
+    return yaml
+
+
+def podar_modelo(maestro, ancho=ANCHO_ALUMNO):
+    """
+    Devuelve un DetectionModel con `ancho` de los canales del maestro en cada
+    capa, inicializado con los pesos de los canales mas importantes.
+    """
+    maestro = maestro.float().eval()
+    alumno = DetectionModel(yaml_alumno(maestro, ancho), ch=maestro.yaml.get('channels', 3),
+                            nc=maestro.yaml['nc'], verbose=False)
+    canales = []  # Indices del maestro que conserva la salida de cada capa
+    anchos = []   # Canales de salida de cada capa del maestro
+
+    for i, (capa_origen, capa_destino) in enumerate(zip(maestro.model, alumno.model)):
+        desde = capa_origen.f
+        anterior = [canales[j] for j in (desde if isinstance(desde, list) else [desde])] if i else [None]
+        entrada = anterior[0]
+
+        if isinstance(capa_origen, Conv):
+            salida, ancho_capa = podar_conv(capa_origen, capa_destino, entrada), capa_origen.conv.out_channels
+        elif isinstance(capa_origen, C2f):
+            salida, ancho_capa = podar_c2f(capa_origen, capa_destino, entrada), capa_origen.cv2.conv.out_channels
+        elif isinstance(capa_origen, SPPF):
+            salida, ancho_capa = podar_sppf(capa_origen, capa_destino, entrada), capa_origen.cv2.conv.out_channels
+        elif isinstance(capa_origen, nn.Upsample):
+            salida, ancho_capa = entrada, anchos[desde]
+        elif isinstance(capa_origen, Concat):
+            desplazamientos = torch.cumsum(torch.tensor([0] + [anchos[j] for j in desde[:-1]]), 0)
+            salida = torch.cat([c + d for c, d in zip(anterior, desplazamientos)])
+            ancho_capa = sum(anchos[j] for j in desde)
+        elif isinstance(capa_origen, Detect) and getattr(capa_origen, 'legacy', True) \
+                and getattr(capa_origen, 'one2one_cv2', None) is None:
+            podar_detect(capa_origen, capa_destino, anterior)
+            break
+        else:
+            raise ValueError(f"Capa {i} ({type(capa_origen).__name__}) no soportada por la poda: "
+                             f"se admiten modelos YOLOv8 de deteccion")
+        canales.append(salida)
+        anchos.append(ancho_capa)
+
+    alumno.names = maestro.names
+    alumno.args = getattr(maestro, 'args', {})
+    return alumno
+
+
+def contar_parametros(modelo):
+    return sum(p.numel() for p in modelo.parameters())
+
+
+def guardar_checkpoint(modelo, ruta):
+    """Checkpoint con el formato de ultralytics (se carga con YOLO(ruta) y se puede reentrenar)."""
+    Path(ruta).parent.mkdir(parents=True, exist_ok=True)
+    args = modelo.args if isinstance(modelo.args, dict) else vars(modelo.args)
+    torch.save({'model': deepcopy(modelo).half(), 'train_args': args, 'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'version': __version__}, ruta)
+
+
+def destilar(ruta_alumno, maestro, data, epocas, imgsz, batch, workers, device, threads, peso, proyecto, nombre,
+             cache_memmap=True, paciencia=100):
+    """Reentrena el alumno podado con el maestro como guia. Devuelve la ruta a su best.pt."""
+    model = YOLO(ruta_alumno)
+    tiempos = train_yolo_model.agregar_cronometro(model, threads)
+    trainer = None
+    if cache_memmap:
+        from cache_entrenamiento import EntrenadorMemmap
+        trainer = EntrenadorMemmap
+
+    model.train(trainer=trainer, data=data, epochs=epocas, imgsz=imgsz, batch=batch, workers=workers,
+                device=device, distill_model=str(maestro), dis=peso, patience=paciencia, cache=False,
+                project=os.path.abspath(proyecto), name=nombre, exist_ok=True, seed=42)
+
+    directorio = Path(model.trainer.save_dir)
+    if tiempos:
+        por_epoca = sum(t['segundos_total'] for t in tiempos) / len(tiempos)
+        print(f"[OK] {len(tiempos)} epocas, {por_epoca:.1f}s por epoca (detalle en {directorio}/tiempos_epocas.csv)")
+    return directorio / 'weights' / 'best.pt'
+
+
+def main():
+    config = train_yolo_model.CONFIG_DEFECTO
+    maestro_defecto = f"{config['proyecto']}/{config['nombre']}/weights/best.pt"
+
+    parser = argparse.ArgumentParser(description="Poda de canales y destilacion del modelo de marcas")
+    parser.add_argument('--maestro', default=maestro_defecto, help="Modelo entrenado (best.pt)")
+    parser.add_argument('--data', default=config['data'])
+    parser.add_argument('--ancho', type=float, default=ANCHO_ALUMNO, help="Fraccion de canales que se conserva")
+    parser.add_argument('--imgsz', type=int, default=IMGSZ_ALUMNO, help="Tamanio de entrada del alumno")
+    parser.add_argument('--epocas', type=int, default=config['epocas'])
+    parser.add_argument('--batch', type=int, help="Por defecto segun la memoria disponible")
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--device')
+    parser.add_argument('--peso-destilacion', type=float, default=PESO_DESTILACION)
+    parser.add_argument('--paciencia', type=int, default=config['paciencia'])
+    parser.add_argument('--proyecto', default=config['proyecto'])
+    parser.add_argument('--nombre', default='alumno')
+    parser.add_argument('--sin-cache-memmap', action='store_true')
+    parser.add_argument('--solo-podar', action='store_true', help="Guardar el alumno podado sin reentrenar")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("COMPRESION DEL MODELO: PODA + DESTILACION")
+    print("="*60)
+
+    if not os.path.exists(args.maestro):
+        print(f"[ERROR] No existe el modelo maestro: {args.maestro} (entrenarlo con train_yolo_model.py)")
+        raise SystemExit(1)
+    if not 0 < args.ancho <= 1:
+        print("[ERROR] --ancho debe estar entre 0 y 1")
+        raise SystemExit(1)
+
+    maestro = load_checkpoint(args.maestro)[0]
+    try:
+        alumno = podar_modelo(maestro, args.ancho)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        raise SystemExit(1)
+
+    ruta_podado = Path(args.proyecto) / f"{args.nombre}_podado.pt"
+    guardar_checkpoint(alumno, ruta_podado)
+    print(f"[OK] Maestro: {contar_parametros(maestro) / 1e6:.2f}M parametros")
+    print(f"[OK] Alumno podado ({args.ancho:.0%} de los canales): {contar_parametros(alumno) / 1e6:.2f}M "
+          f"parametros -> {ruta_podado}")
+    if args.solo_podar:
+        return
+
+    recursos = train_yolo_model.detectar_recursos()
+    auto = train_yolo_model.configuracion_automatica(recursos, args.imgsz, Path(args.maestro).name)
+    print(f"Destilando {args.epocas} epocas a imgsz {args.imgsz} (dispositivo {args.device or auto['device']}, "
+          f"batch {args.batch or auto['batch']})")
+    best = destilar(ruta_podado, args.maestro, args.data, args.epocas, args.imgsz, args.batch or auto['batch'],
+                    args.workers if args.workers is not None else auto['workers'], args.device or auto['device'],
+                    auto['threads'], args.peso_destilacion, args.proyecto, args.nombre,
+                    not args.sin_cache_memmap, args.paciencia)
+
+    print(f"\n[OK] Alumno destilado: {best}")
+    print(f"Comparar con: python evaluar_modelos.py {args.maestro} {best} --data {args.data}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cuantizacion del Modelo: Variantes FP16 / INT8 y Tabla Precision-Latencia
+Proyecto Integrador - IFTS24
+
+La app y los scripts corren el modelo en FP32. A partir de los pesos
+entrenados (best.pt) este script arma las variantes ONNX que
+backends_inferencia carga con STOCKVISION_PRECISION, una al lado de la otra:
+  - fp32: el export ONNX de train_yolo_model.exportar_modelo() (referencia).
+  - fp16: pesos y operaciones en FP16; la entrada y la salida siguen en FP32.
+  - int8-dinamico: pesos INT8, las activaciones se cuantizan en cada llamada.
+  - int8-estatico: pesos y activaciones INT8 (QDQ, escalas por canal) con
+    rangos calibrados sobre una muestra de las imagenes de validacion. La
+    decodificacion de la cabeza Detect (DFL, sigmoide y cajas) queda en FP32.
+Cada variante pasa por la validacion de train_yolo_model.validar_modelo()
+(mAP50 y mAP50-95 del split val, solo si las clases coinciden con las del
+dataset) y se cronometra con el mismo DetectorONNX que usa la app. La tabla
+marca la variante mas rapida que no pierde mas de --perdida-maxima de
+mAP50-95 frente a FP32.
+
+Uso:
+    python cuantizar_modelo.py --modelo best.pt --data datasets/data.yaml
+    python cuantizar_modelo.py --modelo best.pt --calibracion 200 --metodo entropia --perdida-maxima 0.02
+    python cuantizar_modelo.py --modelo yolov8n.pt --sin-validar      (modelo generico del modo hibrido)
+    STOCKVISION_PRECISION=int8-estatico streamlit run app.py
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import tempfile
+import time
+
+import cv2
+import numpy as np
+import onnx
+from onnxruntime.quantization import (CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType,
+                                      quantize_dynamic, quantize_static)
+
+import backends_inferencia
+import train_yolo_model
+from evaluar_modelos import CALENTAMIENTO, IMAGENES_LATENCIA, imagenes_validacion
+
+IMAGENES_CALIBRACION = 100  # Imagenes de val con las que se calibran las activaciones INT8
+METODOS_CALIBRACION = {
+    'minmax': CalibrationMethod.MinMax,
+    'entropia': CalibrationMethod.Entropy,
+    'percentil': CalibrationMethod.Percentile,
+}
+PERDIDA_MAXIMA = 0.01  # mAP50-95 que se acepta perder frente a FP32 para recomendar una variante
+
+
+class LectorCalibracion(CalibrationDataReader):
+    """Entrega a ONNX Runtime las imagenes de calibracion con el mismo preproceso que DetectorONNX."""
+
+    def __init__(self, rutas, imgsz, nombre_entrada):
+        self.rutas = iter(rutas)
+        self.imgsz = imgsz
+        self.nombre_entrada = nombre_entrada
+
+    def get_next(self):
+        for ruta in self.rutas:
+            img = cv2.imread(ruta)
+            if img is not None:
+                tensor, _ = backends_inferencia.preparar_lote([img], self.imgsz)
+                return {self.nombre_entrada: tensor}
+        return None
+
+
+def nodos_cabeza(ruta_onnx):
+    """Nodos de la decodificacion de la cabeza Detect (la ultima capa del export): fuera de cv2/cv3 no se cuantiza."""
+    nodos = onnx.load(ruta_onnx, load_external_data=False).graph.node
+    capas = [int(m.group(1)) for m in (re.match(r'/model\.(\d+)/', n.name) for n in nodos) if m]
+    if not capas:
+        return []
+    prefijo = f"/model.{max(capas)}/"
+    return [n.name for n in nodos
+            if n.name.startswith(prefijo) and not re.match(re.escape(prefijo) + r'cv[23]\.', n.name)]
+
+
+def convertir_fp16(ruta_onnx, destino):
+    from onnxruntime.transformers.float16 import convert_float_to_float16
+
+    modelo = convert_float_to_float16(onnx.load(ruta_onnx), keep_io_types=True)
+    onnx.save(modelo, destino)
+    return destino
+
+
+def cuantizar_dinamico(ruta_onnx, destino):
+    # Mismos parametros que train_yolo_model.exportar_modelo()
+    quantize_dynamic(ruta_onnx, destino, weight_type=QuantType.QUInt8)
+    return destino
+
+
+def cuantizar_estatico(ruta_onnx, destino, rutas_calibracion, imgsz, metodo='minmax'):
+    """INT8 QDQ por canal, con los rangos de activacion medidos sobre `rutas_calibracion`."""
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    nombre_entrada = onnx.load(ruta_onnx, load_external_data=False).graph.input[0].name
+    with tempfile.TemporaryDirectory() as carpeta:
+        # Las formas simbolicas del export dinamico no se pueden inferir: solo la optimizacion de ORT
+        preparado = os.path.join(carpeta, 'preparado.onnx')
+        quant_pre_process(ruta_onnx, preparado, skip_symbolic_shape=True)
+        quantize_static(preparado, destino, LectorCalibracion(rutas_calibracion, imgsz, nombre_entrada),
+                        quant_format=QuantFormat.QDQ, per_channel=True,
+                        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                        calibrate_method=METODOS_CALIBRACION[metodo], nodes_to_exclude=nodos_cabeza(ruta_onnx))
+    return destino
+
+
+def medir_latencia(detector, imagenes, imgsz):
+    """ms por imagen (una por llamada, como la app) con el detector exportado."""
+    for img in imagenes[:CALENTAMIENTO]:
+        detector.detectar(img, imgsz=imgsz)
+    latencias = []
+    for img in imagenes:
+        inicio = time.perf_counter()
+        detector.detectar(img, imgsz=imgsz)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    return float(np.percentile(latencias, 50)), float(np.percentile(latencias, 95))
+
+
+def evaluar_variante(precision, ruta, imagenes, imgsz, data=None, nombres=None, threads=None):
+    """Tamanio, latencia y (si las clases coinciden con las del dataset) mAP de una variante .onnx."""
+    detector = backends_inferencia.DetectorONNX(ruta, threads)
+    resultado = {
+        "precision": precision,
+        "modelo": ruta,
+        "tamanio_mb": round(os.path.getsize(ruta) / 1024**2, 2),
+        "map50": None,
+        "map50_95": None,
+    }
+    if data and nombres is not None and dict(detector.names or {}) == dict(nombres):
+        metricas = train_yolo_model.validar_modelo(ruta, data=data, imgsz=imgsz, batch=1, device='cpu',
+                                                   plots=False, verbose=False)
+        if metricas is not None:
+            resultado["map50"] = round(float(metricas.box.map50), 4)
+            resultado["map50_95"] = round(float(metricas.box.map), 4)
+    resultado["latencia_p50_ms"], resultado["latencia_p95_ms"] = (
+        round(v, 1) for v in medir_latencia(detector, imagenes, imgsz))
+    return resultado
+
+
+def recomendar(resultados, perdida_maxima):
+    """La variante mas rapida cuya perdida de mAP50-95 frente a FP32 no supera `perdida_maxima`."""
+    referencia = next((r for r in resultados if r["precision"] == 'fp32'), None)
+    if referencia is None or referencia["map50_95"] is None:
+        return None
+    aceptadas = [r for r in resultados
+                 if r["map50_95"] is not None and referencia["map50_95"] - r["map50_95"] <= perdida_maxima]
+    return min(aceptadas, key=lambda r: r["latencia_p50_ms"])["precision"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Variantes FP16/INT8 del modelo y tabla precision-latencia")
+    parser.add_argument('--modelo', default='best.pt', help="Pesos entrenados (.pt) o su export ONNX FP32")
+    parser.add_argument('--data', default='datasets/data.yaml', help="Dataset para calibrar y validar (split val)")
+    parser.add_argument('--precisiones', nargs='+', choices=backends_inferencia.PRECISIONES,
+                        default=list(backends_inferencia.PRECISIONES))
+    parser.add_argument('--imgsz', type=int, help="Por defecto el de entrenamiento del modelo")
+    parser.add_argument('--calibracion', type=int, default=IMAGENES_CALIBRACION,
+                        help="Imagenes de val para calibrar INT8 estatico")
+    parser.add_argument('--metodo', choices=list(METODOS_CALIBRACION), default='minmax',
+                        help="Calibracion de los rangos de activacion")
+    parser.add_argument('--imagenes', type=int, default=IMAGENES_LATENCIA, help="Imagenes para medir latencia")
+    parser.add_argument('--threads', type=int, help="Hilos de ONNX Runtime (por defecto todos los nucleos)")
+    parser.add_argument('--perdida-maxima', type=float, default=PERDIDA_MAXIMA, dest='perdida_maxima',
+                        help="mAP50-95 que se acepta perder frente a FP32")
+    parser.add_argument('--sin-validar', action='store_true', help="Solo tamanio y latencia, sin mAP")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--salida', help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("CUANTIZACION DEL MODELO")
+    print("="*60)
+
+    if not os.path.exists(args.modelo):
+        print(f"[ERROR] No existe {args.modelo}")
+        raise SystemExit(1)
+    rutas, nombres = imagenes_validacion(args.data) if os.path.exists(args.data) else ([], None)
+    if 'int8-estatico' in args.precisiones and not rutas:
+        print(f"[ERROR] Sin imagenes de validacion en {args.data} no se puede calibrar INT8 estatico")
+        raise SystemExit(1)
+
+    if args.modelo.endswith('.onnx'):
+        ruta_fp32 = args.modelo
+        imgsz = args.imgsz or backends_inferencia.IMGSZ
+    else:
+        from ultralytics import YOLO
+
+        imgsz = args.imgsz or YOLO(args.modelo).overrides.get('imgsz') or backends_inferencia.IMGSZ
+        artefactos = train_yolo_model.exportar_modelo(args.modelo, imgsz=imgsz, int8=False)
+        if not artefactos:
+            raise SystemExit(1)
+        ruta_fp32 = str(artefactos['onnx'])
+
+    rng = random.Random(args.semilla)
+    calibracion = sorted(rng.sample(rutas, min(args.calibracion, len(rutas))))
+    convertir = {
+        'fp16': lambda destino: convertir_fp16(ruta_fp32, destino),
+        'int8-dinamico': lambda destino: cuantizar_dinamico(ruta_fp32, destino),
+        'int8-estatico': lambda destino: cuantizar_estatico(ruta_fp32, destino, calibracion, imgsz, args.metodo),
+    }
+    variantes = {}
+    for precision in backends_inferencia.PRECISIONES:
+        if precision not in args.precisiones and precision != 'fp32':
+            continue
+        destino = backends_inferencia.ruta_precision(ruta_fp32, precision)
+        inicio = time.perf_counter()
+        if precision != 'fp32':
+            convertir[precision](destino)
+        variantes[precision] = destino
+        print(f"[OK] {precision}: {destino} ({time.perf_counter() - inicio:.1f}s)")
+    if 'int8-estatico' in variantes:
+        print(f"  Calibracion: {len(calibracion)} imagenes de val, metodo {args.metodo}")
+
+    # Latencia sobre imagenes ya decodificadas; sin dataset, las de calibracion no existen y se usa ruido
+    imagenes = [img for img in (cv2.imread(r) for r in rutas[:args.imagenes]) if img is not None]
+    if not imagenes:
+        imagenes = [np.random.default_rng(args.semilla).integers(0, 256, (imgsz, imgsz, 3), dtype=np.uint8)]
+    data = None if args.sin_validar or not rutas else args.data
+    resultados = []
+    for precision, ruta in variantes.items():
+        resultados.append(evaluar_variante(precision, ruta, imagenes, imgsz, data, nombres, args.threads))
+        print(f"[OK] Evaluado {precision}")
+
+    referencia = resultados[0]
+    elegida = recomendar(resultados, args.perdida_maxima)
+    print(f"\n{'Precision':<16}{'MB':>7}{'mAP50':>8}{'mAP50-95':>10}{'Perdida':>9}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'vs fp32':>9}")
+    for r in resultados:
+        map50 = f"{r['map50']:.3f}" if r['map50'] is not None else '-'
+        map50_95 = f"{r['map50_95']:.3f}" if r['map50_95'] is not None else '-'
+        perdida = (f"{referencia['map50_95'] - r['map50_95']:.3f}"
+                   if r['map50_95'] is not None and referencia['map50_95'] is not None else '-')
+        velocidad = f"{referencia['latencia_p50_ms'] / r['latencia_p50_ms']:.2f}x"
+        marca = ' *' if r['precision'] == elegida else ''
+        print(f"{r['precision']:<16}{r['tamanio_mb']:>7}{map50:>8}{map50_95:>10}{perdida:>9}"
+              f"{r['latencia_p50_ms']:>9}{r['latencia_p95_ms']:>9}{velocidad:>9}{marca}")
+    if elegida:
+        print(f"\n* Mas rapida con perdida de mAP50-95 <= {args.perdida_maxima}: {elegida}")
+        print(f"  STOCKVISION_PRECISION={elegida} streamlit run app.py")
+    else:
+        print("\nSin mAP (clases distintas a las del dataset o --sin-validar): elegir por latencia")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump({"imgsz": imgsz, "calibracion": len(calibracion), "metodo": args.metodo,
+                       "recomendada": elegida, "variantes": resultados}, f, indent=2)
+        print(f"\nResultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
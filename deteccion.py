@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pipeline de Deteccion Hibrida: YOLOv8 (Forma) + OpenCV (Color)
+Proyecto Integrador - IFTS24
+
+Funciones compartidas por la app Streamlit y los scripts de linea de comandos.
+"""
+
+import os
+import time
+from functools import lru_cache
+
+import cv2
+import numpy as np
+from PIL import Image
+
+import backends_inferencia
+import firma_color
+import perfilado
+
+CLASE_BOTELLA = 39  # Indice COCO de 'bottle'
+LADO_MINIMO = 10    # Cajas con ancho o alto menor se descartan
+BLOQUE_NMS = 256    # Cajas por bloque en nms: la memoria queda en BLOQUE_NMS x BLOQUE_NMS solapamientos
+
+
+def load_generic_model(backend=None, ruta=None, threads=None, uso=None, precision=None):
+    """
+    Carga el modelo YOLOv8 generico (COCO). Por defecto PyTorch con yolov8n.pt;
+    backend, pesos, hilos y precision se pueden cambiar por argumento o con las
+    variables STOCKVISION_BACKEND / STOCKVISION_MODELO / STOCKVISION_THREADS /
+    STOCKVISION_PRECISION. Con `uso` ('app' o 'lote') se completa con el perfil
+    de autoajuste.py.
+    """
+    return backends_inferencia.cargar_modelo(backend, ruta, threads, uso, precision)
+
+
+# Rangos de color HSV (OpenCV: H en 0-180)
+LOWER_RED1, UPPER_RED1 = np.array([0, 70, 50]), np.array([10, 255, 255])
+LOWER_RED2, UPPER_RED2 = np.array([170, 70, 50]), np.array([180, 255, 255])
+LOWER_BLUE, UPPER_BLUE = np.array([100, 70, 50]), np.array([130, 255, 255])
+UMBRAL_COLOR = 0.05  # Fraccion minima de pixeles del color dominante
+
+MARCA_COCA = ("Familia Coca-Cola", (255, 0, 0))
+MARCA_PEPSI = ("Familia PepsiCo", (0, 0, 255))
+MARCA_OTROS = ("Otros / Genérico", (128, 128, 128))
+COLORES_MARCA = dict((MARCA_COCA, MARCA_PEPSI, MARCA_OTROS))  # Color del recuadro por familia
+
+MODELO_MARCAS = 'best.pt'  # Modelo de seis clases de train_yolo_model.py, copiado a la raiz
+# Familia del reporte para cada clase de datasets/data.yaml; 'bottle' no tiene y se clasifica por color
+FAMILIAS_CLASE = {
+    'coca-cola': MARCA_COCA,
+    'sprite': MARCA_COCA,
+    'fanta': MARCA_COCA,
+    'pepsi': MARCA_PEPSI,
+    'seven-up': MARCA_PEPSI,
+}
+FIRMAS_COLOR = firma_color.ARCHIVO_FIRMAS  # Firmas de color entrenadas; sin el archivo se usan los rangos HSV
+
+
+def detect_brand_color(image_crop):
+    """Detecta rojo (Coca) o azul (Pepsi) en el recorte."""
+    hsv = cv2.cvtColor(image_crop, cv2.COLOR_RGB2HSV)
+
+    mask_red = cv2.inRange(hsv, LOWER_RED1, UPPER_RED1) + cv2.inRange(hsv, LOWER_RED2, UPPER_RED2)
+    mask_blue = cv2.inRange(hsv, LOWER_BLUE, UPPER_BLUE)
+
+    pixels_red = cv2.countNonZero(mask_red)
+    pixels_blue = cv2.countNonZero(mask_blue)
+    total_pixels = image_crop.shape[0] * image_crop.shape[1]
+
+    if pixels_red > pixels_blue and pixels_red > (total_pixels * UMBRAL_COLOR):
+        return MARCA_COCA
+    elif pixels_blue > pixels_red and pixels_blue > (total_pixels * UMBRAL_COLOR):
+        return MARCA_PEPSI
+    else:
+        return MARCA_OTROS
+
+
+def _sumar_en_cajas(integral, cajas):
+    """Suma de la mascara dentro de cada caja usando la imagen integral."""
+    x1, y1, x2, y2 = cajas.T
+    return integral[y2, x2] - integral[y1, x2] - integral[y2, x1] + integral[y1, x1]
+
+
+def detect_brand_colors(img_array, cajas):
+    """
+    Version en lote de detect_brand_color para todas las cajas de una imagen.
+    Con gondolas densas (los recortes suman al menos el area de la region que
+    los contiene) convierte a HSV y arma las mascaras una sola vez y cuenta
+    pixeles por caja con tablas de area sumada; si las cajas estan dispersas,
+    convertir la region entera costaria mas que los recortes y se procesa
+    recorte por recorte. Devuelve la misma lista de (marca, color) en ambos casos.
+    """
+    if len(cajas) == 0:
+        return []
+
+    alto, ancho = img_array.shape[:2]
+    cajas = np.asarray(cajas, dtype=np.int64)[:, :4]
+    cajas = np.clip(cajas, 0, [ancho, alto, ancho, alto])
+    total_pixels = (cajas[:, 2] - cajas[:, 0]) * (cajas[:, 3] - cajas[:, 1])
+
+    # Solo la region que contiene alguna caja
+    x0, y0 = cajas[:, 0].min(), cajas[:, 1].min()
+    xf, yf = cajas[:, 2].max(), cajas[:, 3].max()
+
+    if total_pixels.sum() < (xf - x0) * (yf - y0):
+        return [detect_brand_color(img_array[y1:y2, x1:x2]) for x1, y1, x2, y2 in cajas]
+
+    cajas = cajas - [x0, y0, x0, y0]
+    hsv = cv2.cvtColor(np.ascontiguousarray(img_array[y0:yf, x0:xf]), cv2.COLOR_RGB2HSV)
+    mask_red = cv2.inRange(hsv, LOWER_RED1, UPPER_RED1) | cv2.inRange(hsv, LOWER_RED2, UPPER_RED2)
+    mask_blue = cv2.inRange(hsv, LOWER_BLUE, UPPER_BLUE)
+
+    pixels_red = _sumar_en_cajas(cv2.integral(mask_red // 255), cajas)
+    pixels_blue = _sumar_en_cajas(cv2.integral(mask_blue // 255), cajas)
+
+    umbral = total_pixels * UMBRAL_COLOR
+    es_coca = (pixels_red > pixels_blue) & (pixels_red > umbral)
+    es_pepsi = (pixels_blue > pixels_red) & (pixels_blue > umbral)
+
+    return [MARCA_COCA if c else MARCA_PEPSI if p else MARCA_OTROS for c, p in zip(es_coca, es_pepsi)]
+
+
+def familia_clase(nombre):
+    """(familia, color) de una clase del dataset; las marcas sin familia conocida van con su nombre."""
+    if nombre is None or nombre.lower() == 'bottle':
+        return MARCA_OTROS
+    return FAMILIAS_CLASE.get(nombre.lower(), (nombre, MARCA_OTROS[1]))
+
+
+@lru_cache(maxsize=None)
+def cargar_firmas_color(ruta=FIRMAS_COLOR):
+    """ClasificadorColor de firma_color.py si existe el archivo de firmas, o None."""
+    return firma_color.ClasificadorColor.cargar(ruta) if os.path.exists(ruta) else None
+
+
+def clasificar_colores(img_array, cajas, firmas=None):
+    """
+    (familia, color) de cada caja por color: con las firmas entrenadas de
+    firma_color.py si se pasan (todas las cajas en un paso), o con los rangos
+    HSV fijos de detect_brand_colors.
+    """
+    if firmas is None:
+        return detect_brand_colors(img_array, cajas)
+    return [familia_clase(nombre) for nombre in firmas.clasificar_cajas(img_array, cajas)]
+
+
+def familias_modelo(model):
+    """
+    {id de clase: familia} si el modelo detecta marcas (best.pt de seis clases),
+    o None si es el YOLO generico de COCO. Las clases sin familia (bottle)
+    quedan en None y se clasifican por color.
+    """
+    nombres = dict(getattr(model, 'names', None) or {})
+    familias = {int(i): FAMILIAS_CLASE.get(str(nombre).lower()) for i, nombre in nombres.items()}
+    return familias if any(familias.values()) else None
+
+
+def cargar_imagen(ruta):
+    """Decodifica una imagen (ruta o archivo en memoria) como array RGB."""
+    with Image.open(ruta) as img:
+        return np.array(img.convert('RGB'))
+
+
+def detectar_botellas(model, imagenes, conf=0.25, **kwargs):
+    """
+    Corre YOLO sobre una o varias imagenes en una sola llamada.
+    Devuelve, por imagen, un array (N, 6): x1, y1, x2, y2, confianza, clase.
+    Con el YOLO generico se filtra la clase botella; el modelo de marcas devuelve todas.
+    Los kwargs extra (imgsz, max_det, ...) se pasan tal cual al modelo.
+    """
+    inicio = time.perf_counter()
+    clases = None if familias_modelo(model) else [CLASE_BOTELLA]
+    with perfilado.etapa('yolo'):
+        if hasattr(model, 'detectar'):  # Detectores exportados y servidor_modelos.ServidorModelos
+            return model.detectar(imagenes, conf=conf, classes=clases, **kwargs)
+
+        results = model(imagenes, conf=conf, classes=clases, verbose=False, **kwargs)
+        perfilado.registrar_ultralytics(inicio, results)
+        return [r.boxes.data.cpu().numpy() for r in results]
+
+
+def calentar_modelo(model, lado=backends_inferencia.IMGSZ):
+    """
+    Inferencia sobre una imagen gris lisa para que la primera foto real no
+    pague la inicializacion del runtime (predictor de ultralytics, kernels,
+    reserva de memoria).
+    """
+    imagen = np.full((lado, lado, 3), backends_inferencia.COLOR_RELLENO, dtype=np.uint8)
+    detectar_botellas(model, imagen)
+
+
+def solapamiento(cajas_a, cajas_b, metrica='iou'):
+    """
+    Matriz (N, M) de solapamiento entre cajas xyxy.
+    'iou': interseccion / union. 'ios': interseccion / area de la caja menor
+    (detecta una caja cortada dentro de otra completa).
+    """
+    cajas_a = np.asarray(cajas_a, dtype=np.float64)[:, None, :4]
+    cajas_b = np.asarray(cajas_b, dtype=np.float64)[None, :, :4]
+    ancho = np.clip(np.minimum(cajas_a[..., 2], cajas_b[..., 2]) - np.maximum(cajas_a[..., 0], cajas_b[..., 0]), 0, None)
+    alto = np.clip(np.minimum(cajas_a[..., 3], cajas_b[..., 3]) - np.maximum(cajas_a[..., 1], cajas_b[..., 1]), 0, None)
+    inter = ancho * alto
+    area_a = (cajas_a[..., 2] - cajas_a[..., 0]) * (cajas_a[..., 3] - cajas_a[..., 1])
+    area_b = (cajas_b[..., 2] - cajas_b[..., 0]) * (cajas_b[..., 3] - cajas_b[..., 1])
+    if metrica == 'ios':
+        base = np.minimum(area_a, area_b)
+    else:
+        base = area_a + area_b - inter
+    return inter / np.maximum(base, 1e-9)
+
+
+def nms(detecciones, umbral=0.5, metrica='iou'):
+    """
+    NMS voraz sobre un array (N, 6); conserva la de mayor confianza de cada grupo.
+    Recorre las cajas por confianza en bloques de BLOQUE_NMS: cada bloque se
+    compara solo con las ya conservadas y despues entre si, sin armar la matriz
+    N x N (los tiles de una foto de 12 MP pueden juntar mas de 10.000 cajas).
+    """
+    if len(detecciones) == 0:
+        return detecciones
+    orden = np.argsort(-detecciones[:, 4], kind='stable')
+    detecciones = detecciones[orden]
+    conservadas = detecciones[:0]
+    for inicio in range(0, len(detecciones), BLOQUE_NMS):
+        bloque = detecciones[inicio:inicio + BLOQUE_NMS]
+        for desde in range(0, len(conservadas), BLOQUE_NMS):
+            previas = conservadas[desde:desde + BLOQUE_NMS]
+            bloque = bloque[(solapamiento(previas, bloque, metrica) <= umbral).all(axis=0)]
+            if len(bloque) == 0:
+                break
+        matriz = solapamiento(bloque, bloque, metrica)
+        conservar = np.ones(len(bloque), dtype=bool)
+        for i in range(len(bloque)):
+            if conservar[i]:
+                conservar[i+1:] &= matriz[i, i+1:] <= umbral
+        conservadas = np.concatenate([conservadas, bloque[conservar]])
+    return conservadas
+
+
+def analizar_detecciones(img_array, detecciones, dibujar=True, familias=None, escala=1.0):
+    """
+    Asigna una familia a cada deteccion de una imagen RGB: por la clase si se
+    pasan las `familias` del modelo de marcas (familias_modelo), y por color
+    para el YOLO generico o la clase bottle (firmas entrenadas si existe
+    FIRMAS_COLOR, si no rangos HSV).
+    Si img_array es una version reducida de la foto original, `escala` es su
+    lado sobre el original: las cajas, el filtro de tamanio y el area siguen
+    en coordenadas originales y solo el color y el dibujo usan la reducida.
+    Devuelve (data_marketing, img_final, indices) donde indices son las filas
+    de `detecciones` que pasaron el filtro de tamanio.
+    """
+    img_final = img_array.copy() if dibujar else None
+    data_temp = []
+
+    cajas = detecciones[:, :4].astype(int)
+    indices = np.flatnonzero(((cajas[:, 2] - cajas[:, 0]) >= LADO_MINIMO) & ((cajas[:, 3] - cajas[:, 1]) >= LADO_MINIMO))
+    cajas_imagen = cajas if escala == 1.0 else (detecciones[:, :4] * escala).astype(int)
+    if familias is None:
+        por_color = np.arange(len(indices))
+        marcas = [None] * len(indices)
+    else:
+        marcas = [familias.get(int(c)) for c in detecciones[indices, 5]]
+        por_color = np.array([j for j, marca in enumerate(marcas) if marca is None], dtype=int)
+    with perfilado.etapa('color', cajas=len(por_color)):
+        if len(por_color):
+            for j, marca in zip(por_color, clasificar_colores(img_array, cajas_imagen[indices[por_color]],
+                                                              cargar_firmas_color())):
+                marcas[j] = marca
+
+    with perfilado.etapa('dibujo' if dibujar else 'datos'):
+        for (x1, y1, x2, y2), (brand, color_rgb) in zip(cajas[indices], marcas):
+            area = int((x2-x1) * (y2-y1))
+            data_temp.append({"Marca": brand, "Area": area})
+        if dibujar:
+            dibujar_detecciones(img_final, detecciones[indices], data_temp, escala)
+
+    return data_temp, img_final, indices
+
+
+def dibujar_detecciones(img_array, detecciones, data_marketing, escala=1.0):
+    """
+    Dibuja en img_array (en el lugar) la caja y la familia de cada producto de
+    data_marketing, con `detecciones` alineadas fila a fila. `escala` lleva
+    las cajas a una imagen reducida (por ejemplo, la vista de la app).
+    """
+    cajas = (detecciones[:, :4] * escala).astype(int)
+    for (x1, y1, x2, y2), fila in zip(cajas, data_marketing):
+        color_rgb = COLORES_MARCA.get(fila["Marca"], MARCA_OTROS[1])
+        # Dibujo (Grosor 2 para que se vea bien)
+        cv2.rectangle(img_array, (int(x1), int(y1)), (int(x2), int(y2)), color_rgb, 2)
+        cv2.putText(img_array, fila["Marca"], (int(x1), int(y1)-5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color_rgb, 1)
+    return img_array
+
+
+def filas_detecciones(data, detecciones, indices, imagen):
+    """Una fila por producto con su imagen, marca, area, confianza y caja (CSV de batch y almacen)."""
+    filas = []
+    for fila, i in zip(data, indices):
+        x1, y1, x2, y2, score = detecciones[i, :5]
+        filas.append({
+            "imagen": str(imagen), "Marca": fila["Marca"], "Area": fila["Area"],
+            "confianza": round(float(score), 4),
+            "x1": int(x1), "y1": int(y1), "x2": int(x2), "y2": int(y2),
+        })
+    return filas
+
+
+def calcular_share(data_marketing):
+    """Agrupa el area por marca y calcula el Share of Shelf (%)."""
+    import pandas as pd  # Diferido: la app arranca sin pandas hasta el primer reporte
+
+    df = pd.DataFrame(data_marketing, columns=["Marca", "Area"])
+    df_res = df.groupby("Marca")["Area"].sum().reset_index()
+    df_res["Share (%)"] = ((df_res["Area"] / df_res["Area"].sum()) * 100).round(1)
+    return df_res.sort_values("Share (%)", ascending=False)
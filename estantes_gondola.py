@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Estantes, Frentes y Huecos de la Gondola
+Proyecto Integrador - IFTS24
+
+El pipeline entrega una lista plana de cajas con marca y area. Para saber
+que marca domina cada estante o donde faltan productos, aca se ordenan esas
+cajas como un planograma, todo con NumPy sobre el array de cajas (sin un
+bucle por caja):
+  - Estantes: las botellas se apoyan en la tabla, asi que se agrupan por la
+    base de la caja; un salto entre bases ordenadas mayor que media botella
+    abre un estante nuevo (0 = el de arriba).
+  - Frentes: cada caja es un frente; dentro del estante se numeran de
+    izquierda a derecha contando tambien los frentes vacios.
+  - Huecos: frentes que faltan entre cajas vecinas (y hasta los bordes de la
+    gondola), medidos con el paso entre centros tipico del estante.
+  - Indice de grilla: las cajas repartidas en celdas del tamanio de una
+    botella para consultar una region sin recorrer todas las cajas.
+
+Uso:
+    estantes = EstantesGondola(detecciones[indices], [fila["Marca"] for fila in data])
+    estantes.share, estantes.huecos, estantes.planograma(), estantes.indice.consultar(0, 0, 500, 300)
+"""
+
+from functools import cached_property
+
+import numpy as np
+
+FRACCION_ESTANTE = 0.5  # Salto entre bases (en altos medianos de botella) que separa dos estantes
+FRACCION_HUECO = 0.5    # Fraccion de un frente (paso entre centros) que tiene que quedar libre para contarlo vacio
+
+
+def agrupar_estantes(cajas):
+    """Estante de cada caja xyxy (N, 4+), numerados de arriba hacia abajo por la base de la caja."""
+    cajas = np.asarray(cajas, dtype=np.float64)
+    if len(cajas) == 0:
+        return np.zeros(0, dtype=int)
+    base = cajas[:, 3]
+    orden = np.argsort(base, kind='stable')
+    alto = np.median(cajas[:, 3] - cajas[:, 1])
+    saltos = np.diff(base[orden]) > FRACCION_ESTANTE * alto
+    estante = np.empty(len(cajas), dtype=int)
+    estante[orden] = np.concatenate([[0], np.cumsum(saltos)])
+    return estante
+
+
+def ubicar_frentes(cajas, estante, x_min=None, x_max=None):
+    """
+    Posicion de cada caja dentro de su estante y los huecos. El paso de un
+    frente es la mediana de la distancia entre centros vecinos del estante;
+    los frentes se cuentan de izquierda a derecha desde `x_min` (por defecto,
+    el borde izquierdo de la gondola) e incluyen los vacios. Devuelve (frente,
+    huecos, largo): huecos = array (H, 4) de estante, x1, x2 y frentes vacios,
+    y largo = frentes de cada estante, ocupados y vacios.
+    """
+    cajas = np.asarray(cajas, dtype=np.float64)
+    if len(cajas) == 0:
+        return np.zeros(0, dtype=int), np.zeros((0, 4)), np.zeros(0, dtype=int)
+    x_min = cajas[:, 0].min() if x_min is None else x_min
+    x_max = cajas[:, 2].max() if x_max is None else x_max
+    orden = np.lexsort((cajas[:, 0], estante))
+    x1, x2, fila = cajas[orden, 0], cajas[orden, 2], estante[orden]
+    estantes = fila.max() + 1
+    primera = np.r_[True, fila[1:] != fila[:-1]]
+    ultima = np.r_[fila[1:] != fila[:-1], True]
+
+    # Paso por estante: mediana de las distancias entre centros vecinos (el elemento del medio de cada grupo)
+    centro = (x1 + x2) / 2
+    distancia, de_fila = np.diff(centro)[~primera[1:]], fila[1:][~primera[1:]]
+    paso = np.full(estantes, np.median(distancia) if len(distancia) else np.median(x2 - x1))
+    if len(distancia):
+        ordenadas = np.lexsort((distancia, de_fila))
+        cuenta = np.bincount(de_fila, minlength=estantes)
+        con_pares = np.flatnonzero(cuenta)
+        medio = (np.cumsum(cuenta) - cuenta)[con_pares] + (cuenta[con_pares] - 1) // 2
+        paso[con_pares] = distancia[ordenadas][medio]
+    # Cajas que se pisan (detecciones dudosas) acortan la distancia entre centros: el paso no baja del ancho medio
+    ancho = np.bincount(fila, x2 - x1, estantes) / np.maximum(np.bincount(fila, minlength=estantes), 1)
+    paso = np.maximum(paso, np.maximum(ancho, 1))
+
+    def vacios(pasos_libres):
+        return np.maximum(np.floor(pasos_libres + 1 - FRACCION_HUECO), 0).astype(int)
+
+    # Borde derecho alcanzado hasta cada caja en su estante (cajas que se pisan no dejan hueco)
+    desplazamiento = fila * (x_max - x_min + 1)
+    alcanzado = np.maximum.accumulate(x2 - x_min + desplazamiento) - desplazamiento + x_min
+    previo = np.where(primera, x_min, np.r_[x_min, alcanzado[:-1]])
+    # Frentes que faltan antes de cada caja: hasta la anterior del estante por centros, o hasta el borde
+    vacios_antes = np.where(primera, vacios((x1 - x_min) / paso[fila]),
+                            vacios(np.r_[0, np.diff(centro)] / paso[fila] - 1))
+    vacios_final = vacios((x_max - alcanzado[ultima]) / paso[fila[ultima]])
+
+    # Frente = cajas y vacios anteriores del mismo estante
+    avance = np.cumsum(1 + vacios_antes)
+    inicio = np.maximum.accumulate(np.where(primera, avance - 1 - vacios_antes, 0))
+    frente = np.empty(len(cajas), dtype=int)
+    frente[orden] = avance - 1 - inicio
+
+    fin = np.full(ultima.sum(), x_max)
+    huecos = np.concatenate([
+        np.column_stack([fila, previo, x1, vacios_antes])[vacios_antes > 0],
+        np.column_stack([fila[ultima], alcanzado[ultima], fin, vacios_final])[vacios_final > 0],
+    ])
+    largo = np.bincount(fila, 1 + vacios_antes, estantes) + np.bincount(fila[ultima], vacios_final, estantes)
+    return frente, huecos[np.lexsort((huecos[:, 1], huecos[:, 0]))], largo.astype(int)
+
+
+class IndiceGrilla:
+    """
+    Indice espacial de cajas xyxy en una grilla uniforme: cada caja se anota
+    en las celdas que toca y las celdas quedan ordenadas para buscarlas con
+    searchsorted. Consultar una region solo mira las cajas de sus celdas.
+    """
+
+    def __init__(self, cajas, celda=None):
+        self.cajas = np.asarray(cajas, dtype=np.float64)[:, :4] if len(cajas) else np.zeros((0, 4))
+        lados = np.maximum(self.cajas[:, 2:] - self.cajas[:, :2], 1)
+        self.celda = float(celda or (np.median(lados.max(axis=1)) if len(self.cajas) else 1.0))
+        self.origen = self.cajas[:, :2].min(axis=0) if len(self.cajas) else np.zeros(2)
+
+        c1, c2 = self._celdas(self.cajas[:, :2]), self._celdas(self.cajas[:, 2:])
+        self.columnas = int(c2[:, 0].max()) + 1 if len(self.cajas) else 1
+        ancho, alto = (c2 - c1 + 1).T
+        cuenta = ancho * alto
+        caja = np.repeat(np.arange(len(self.cajas)), cuenta)
+        k = np.arange(cuenta.sum()) - np.repeat(np.cumsum(cuenta) - cuenta, cuenta)
+        claves = (c1[caja, 1] + k // ancho[caja]) * self.columnas + c1[caja, 0] + k % ancho[caja]
+        orden = np.argsort(claves, kind='stable')
+        self.claves, self.cajas_celda = claves[orden], caja[orden]
+
+    def _celdas(self, puntos):
+        return np.floor((puntos - self.origen) / self.celda).astype(np.int64)
+
+    def consultar(self, x1, y1, x2, y2):
+        """Indices (ordenados) de las cajas que se solapan con el rectangulo x1, y1, x2, y2."""
+        ox, oy = self.origen
+        cx1, cx2 = max(int((x1 - ox) // self.celda), 0), min(int((x2 - ox) // self.celda), self.columnas - 1)
+        cy1, cy2 = max(int((y1 - oy) // self.celda), 0), int((y2 - oy) // self.celda)
+        if cx1 > cx2 or cy1 > cy2 or len(self.claves) == 0:
+            return np.zeros(0, dtype=int)
+        filas = np.arange(cy1, cy2 + 1) * self.columnas
+        desde = np.searchsorted(self.claves, filas + cx1, 'left')
+        hasta = np.searchsorted(self.claves, filas + cx2, 'right')
+        largos = hasta - desde
+        posiciones = np.repeat(desde - np.cumsum(largos) + largos, largos) + np.arange(largos.sum())
+        candidatas = np.unique(self.cajas_celda[posiciones])
+        c = self.cajas[candidatas]
+        return candidatas[(c[:, 0] < x2) & (c[:, 2] > x1) & (c[:, 1] < y2) & (c[:, 3] > y1)]
+
+
+class EstantesGondola:
+    """Estantes, frentes, huecos y share por estante de las cajas de una foto (o del marco de un panorama)."""
+
+    def __init__(self, cajas, marcas):
+        self.cajas = np.asarray(cajas, dtype=np.float64)[:, :4] if len(cajas) else np.zeros((0, 4))
+        self.marcas = list(marcas)
+        self.estante = agrupar_estantes(self.cajas)
+        self.frente, self._huecos, self.largo = ubicar_frentes(self.cajas, self.estante)
+        self.cantidad = int(self.estante.max()) + 1 if len(self.estante) else 0
+
+    @cached_property
+    def share(self):
+        """Una fila por estante y marca: Estante, Marca, Frentes, Area y Share (%) dentro del estante."""
+        if not self.cantidad:
+            return []
+        nombres, codigo = np.unique(np.array(self.marcas), return_inverse=True)
+        grupo = self.estante * len(nombres) + codigo
+        grupos = self.cantidad * len(nombres)
+        frentes = np.bincount(grupo, minlength=grupos)
+        area = np.bincount(grupo, (self.cajas[:, 2] - self.cajas[:, 0]) * (self.cajas[:, 3] - self.cajas[:, 1]),
+                           grupos)
+        share = 100 * area / np.maximum(np.repeat(area.reshape(self.cantidad, -1).sum(axis=1), len(nombres)), 1)
+        filas = [{"Estante": int(g) // len(nombres) + 1, "Marca": str(nombres[g % len(nombres)]),
+                  "Frentes": int(frentes[g]), "Area": int(area[g]), "Share (%)": round(float(share[g]), 1)}
+                 for g in np.flatnonzero(frentes)]
+        return sorted(filas, key=lambda f: (f["Estante"], -f["Share (%)"]))
+
+    @cached_property
+    def huecos(self):
+        """Un hueco por fila: Estante, x1, x2 y Frentes vacios (en pixeles de la foto)."""
+        return [{"Estante": int(e) + 1, "x1": int(x1), "x2": int(x2), "Frentes vacios": int(n)}
+                for e, x1, x2, n in self._huecos]
+
+    @cached_property
+    def resumen(self):
+        """Una fila por estante: Estante, Productos, Frentes vacios y marca Lider."""
+        productos = np.bincount(self.estante, minlength=self.cantidad)
+        vacios = np.bincount(self._huecos[:, 0].astype(int), self._huecos[:, 3], self.cantidad)
+        lideres = {}
+        for fila in self.share:
+            lideres.setdefault(fila["Estante"], fila["Marca"])  # share viene ordenado por estante y share
+        return [{"Estante": e + 1, "Productos": int(productos[e]), "Frentes vacios": int(vacios[e]),
+                 "Lider": lideres.get(e + 1)} for e in range(self.cantidad)]
+
+    @cached_property
+    def indice(self):
+        """IndiceGrilla de las cajas (los indices que devuelve son filas de `cajas`)."""
+        return IndiceGrilla(self.cajas)
+
+    def planograma(self):
+        """Lista por estante (de arriba hacia abajo) con la marca de cada frente; None en los frentes vacios."""
+        grilla = [[None] * int(largo) for largo in self.largo]
+        for e, f, marca in zip(self.estante, self.frente, self.marcas):
+            grilla[e][f] = marca
+        return grilla
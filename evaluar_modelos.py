@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Evaluacion de Modelos: Precision, Latencia en CPU y Tamanio
+Proyecto Integrador - IFTS24
+
+Compara varios modelos (por ejemplo el maestro best.pt contra el alumno de
+comprimir_modelo.py, o contra el yolov8n.pt generico) sobre el split de
+validacion de data.yaml. Por modelo informa mAP50 y mAP50-95 (solo si sus
+clases coinciden con las del dataset), latencia por imagen en CPU (p50/p95,
+con pre y post-proceso), parametros, GFLOPs y peso del archivo. El primer
+modelo es la referencia de la columna "vs ref".
+
+Cada modelo se evalua a su imgsz de entrenamiento salvo que se pase --imgsz.
+
+Uso:
+    python evaluar_modelos.py best.pt runs/train/alumno/weights/best.pt
+    python evaluar_modelos.py best.pt alumno.pt yolov8n.pt --data datasets/data.yaml --threads 4 --salida eval.json
+"""
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+from ultralytics import YOLO
+from ultralytics.data.utils import check_det_dataset
+from ultralytics.utils.torch_utils import get_flops
+
+from prepare_dataset import EXTENSIONES_IMAGEN
+
+IMAGENES_LATENCIA = 30  # Imagenes de validacion cronometradas por modelo
+CALENTAMIENTO = 3
+
+
+def imagenes_validacion(data):
+    """Rutas de las imagenes del split val (o test si no hay val) de data.yaml."""
+    config = check_det_dataset(data)
+    carpetas = config.get('val') or config.get('test')
+    carpetas = carpetas if isinstance(carpetas, list) else [carpetas]
+    rutas = []
+    for carpeta in carpetas:
+        rutas.extend(sorted(str(p) for p in Path(carpeta).rglob('*') if p.suffix.lower() in EXTENSIONES_IMAGEN))
+    return rutas, config['names']
+
+
+def medir_latencia(model, rutas, imgsz):
+    """ms por imagen (una por llamada, como la app) sobre imagenes ya decodificadas."""
+    import cv2
+
+    imagenes = [cv2.imread(r) for r in rutas]
+    for img in imagenes[:CALENTAMIENTO]:
+        model.predict(img, imgsz=imgsz, verbose=False)
+    latencias = []
+    for img in imagenes:
+        inicio = time.perf_counter()
+        model.predict(img, imgsz=imgsz, verbose=False)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    return float(np.percentile(latencias, 50)), float(np.percentile(latencias, 95))
+
+
+def evaluar(ruta, data, rutas_latencia, nombres, imgsz=None, batch=8):
+    model = YOLO(ruta)
+    imgsz = imgsz or model.overrides.get('imgsz') or 640
+    red = model.model
+    resultado = {
+        "modelo": str(ruta),
+        "imgsz": imgsz,
+        "parametros_m": round(sum(p.numel() for p in red.parameters()) / 1e6, 2),
+        "gflops": round(get_flops(red, imgsz), 2),
+        "tamanio_mb": round(os.path.getsize(ruta) / 1024**2, 2),
+        "map50": None,
+        "map50_95": None,
+    }
+
+    # mAP solo contra las mismas clases (el yolov8n generico de COCO no se puede comparar)
+    if dict(model.names) == dict(nombres):
+        metricas = model.val(data=data, imgsz=imgsz, batch=batch, device='cpu', plots=False, verbose=False)
+        resultado["map50"] = round(float(metricas.box.map50), 4)
+        resultado["map50_95"] = round(float(metricas.box.map), 4)
+
+    resultado["latencia_p50_ms"], resultado["latencia_p95_ms"] = (
+        round(v, 1) for v in medir_latencia(model, rutas_latencia, imgsz))
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara mAP, latencia en CPU y tamanio de varios modelos")
+    parser.add_argument('modelos', nargs='+', help="Pesos .pt (el primero es la referencia)")
+    parser.add_argument('--data', default='datasets/data.yaml')
+    parser.add_argument('--imgsz', type=int,
+                        help="Mismo imgsz para todos (por defecto el de entrenamiento de cada uno)")
+    parser.add_argument('--imagenes', type=int, default=IMAGENES_LATENCIA, help="Imagenes para medir latencia")
+    parser.add_argument('--threads', type=int, help="Hilos de inferencia (por defecto todos los nucleos)")
+    parser.add_argument('--salida', help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("EVALUACION DE MODELOS")
+    print("="*60)
+
+    faltantes = [m for m in args.modelos if not os.path.exists(m)]
+    if faltantes:
+        print(f"[ERROR] No existen: {', '.join(faltantes)}")
+        raise SystemExit(1)
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    rutas, nombres = imagenes_validacion(args.data)
+    if not rutas:
+        print(f"[ERROR] No hay imagenes de validacion en {args.data}")
+        raise SystemExit(1)
+    rutas_latencia = rutas[:args.imagenes]
+    print(f"Validacion: {len(rutas)} imagenes | Latencia sobre {len(rutas_latencia)} | "
+          f"Hilos: {torch.get_num_threads()}")
+
+    resultados = []
+    for ruta in args.modelos:
+        resultados.append(evaluar(ruta, args.data, rutas_latencia, nombres, args.imgsz))
+        print(f"[OK] {ruta}")
+
+    referencia = resultados[0]
+    print(f"\n{'Modelo':<40}{'imgsz':>6}{'mAP50':>8}{'mAP50-95':>10}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'vs ref':>8}{'Param M':>9}{'GFLOPs':>8}{'MB':>7}")
+    for r in resultados:
+        nombre = r['modelo'] if len(r['modelo']) <= 38 else '...' + r['modelo'][-35:]
+        map50 = f"{r['map50']:.3f}" if r['map50'] is not None else '-'
+        map50_95 = f"{r['map50_95']:.3f}" if r['map50_95'] is not None else '-'
+        velocidad = f"{referencia['latencia_p50_ms'] / r['latencia_p50_ms']:.2f}x"
+        print(f"{nombre:<40}{r['imgsz']:>6}{map50:>8}{map50_95:>10}{r['latencia_p50_ms']:>9}{r['latencia_p95_ms']:>9}"
+              f"{velocidad:>8}{r['parametros_m']:>9}{r['gflops']:>8}{r['tamanio_mb']:>7}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+        print(f"\nResultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Firma de Color por Marca (Clasificador Entrenable)
+Proyecto Integrador - IFTS24
+
+Reemplaza los rangos HSV fijos de deteccion.detect_brand_color (dos rojos,
+un azul y un 5% de pixeles, tres familias) por firmas aprendidas de los
+recortes etiquetados de datasets/:
+  - Firma de una caja: histograma de tono x saturacion (mas dos casilleros
+    para oscuro y para blanco/gris) sobre una grilla fija de muestras dentro
+    de la caja. Las muestras de todas las cajas se leen y se pasan a HSV en
+    un solo paso, sin convertir la imagen entera ni recorrer las cajas.
+  - Prototipos: por clase del dataset, unos pocos centros (k-means) de las
+    firmas de entrenamiento; cubren variantes de etiqueta y de iluminacion.
+  - Clasificar: similitud de Bhattacharyya entre firmas y prototipos, una
+    sola multiplicacion de matrices. Sumar marcas agrega columnas a esa
+    multiplicacion, no pasadas por caja.
+Las firmas entrenadas se guardan en firmas_color.npz; si el archivo esta en
+la raiz, deteccion.py las usa en lugar de los umbrales HSV.
+
+Uso:
+    python firma_color.py --dataset datasets --salida firmas_color.npz
+    python firma_color.py --dataset datasets --prototipos 4 --umbral 0.55
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+BINS_TONO = 18            # Casilleros de tono (H de OpenCV: 0-180)
+BINS_SATURACION = 3       # Casilleros de saturacion por encima de SATURACION_MINIMA
+SATURACION_MINIMA = 60    # Por debajo, el pixel cuenta como blanco/gris
+VALOR_MINIMO = 50         # Por debajo, el pixel cuenta como oscuro (liquido, sombra)
+DIMENSION = BINS_TONO * BINS_SATURACION + 2
+MUESTRAS_LADO = 16        # Grilla de 16x16 muestras por caja
+MARGEN_CAJA = 0.1         # Fraccion de cada borde de la caja que no se muestrea (fondo)
+PROTOTIPOS_POR_CLASE = 3
+UMBRAL_SIMILITUD = 0.6    # Similitud minima con el mejor prototipo; por debajo, la caja queda sin clase
+ARCHIVO_FIRMAS = 'firmas_color.npz'
+
+
+def histogramas(img_array, cajas):
+    """(N, DIMENSION) histograma normalizado de cada caja xyxy de una imagen RGB, todas en un paso."""
+    if len(cajas) == 0:
+        return np.zeros((0, DIMENSION))
+    cajas = np.asarray(cajas, dtype=np.float64)[:, :4]
+    alto, ancho = img_array.shape[:2]
+    relativas = MARGEN_CAJA + (np.arange(MUESTRAS_LADO) + 0.5) / MUESTRAS_LADO * (1 - 2 * MARGEN_CAJA)
+    xs = cajas[:, [0]] + relativas * (cajas[:, [2]] - cajas[:, [0]])
+    ys = cajas[:, [1]] + relativas * (cajas[:, [3]] - cajas[:, [1]])
+    xs = np.clip(xs.astype(int), 0, ancho - 1)
+    ys = np.clip(ys.astype(int), 0, alto - 1)
+
+    # (N, S*S, 3): las muestras de todas las cajas como una imagen chica
+    muestras = img_array[ys[:, :, None], xs[:, None, :]].reshape(len(cajas), -1, 3)
+    hsv = cv2.cvtColor(np.ascontiguousarray(muestras, dtype=np.uint8), cv2.COLOR_RGB2HSV).astype(np.int32)
+    tono, saturacion, valor = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+    casillero = (tono * BINS_TONO // 180) * BINS_SATURACION + np.minimum(
+        (saturacion - SATURACION_MINIMA) * BINS_SATURACION // (256 - SATURACION_MINIMA), BINS_SATURACION - 1)
+    casillero = np.where(valor < VALOR_MINIMO, DIMENSION - 2,
+                         np.where(saturacion < SATURACION_MINIMA, DIMENSION - 1, casillero))
+
+    caja = np.arange(len(cajas))[:, None] * DIMENSION
+    conteo = np.bincount((caja + casillero).ravel(), minlength=len(cajas) * DIMENSION)
+    return conteo.reshape(len(cajas), DIMENSION) / casillero.shape[1]
+
+
+class ClasificadorColor:
+    """Prototipos de firma de color por clase; clasifica todas las cajas de una imagen con una multiplicacion."""
+
+    def __init__(self, nombres, clase_prototipo, prototipos, umbral=UMBRAL_SIMILITUD):
+        self.nombres = list(nombres)                       # Nombre de cada clase
+        self.clase_prototipo = np.asarray(clase_prototipo)  # Clase de cada fila de prototipos
+        self.prototipos = np.asarray(prototipos, dtype=np.float64)  # (K, DIMENSION), raiz del histograma
+        self.umbral = float(umbral)
+
+    @classmethod
+    def entrenar(cls, firmas, clases, nombres, prototipos=PROTOTIPOS_POR_CLASE, umbral=UMBRAL_SIMILITUD):
+        """
+        Aprende hasta `prototipos` centros por clase con k-means sobre la raiz
+        de las firmas (ahi la distancia euclidea sigue a Bhattacharyya).
+        """
+        raices = np.sqrt(np.asarray(firmas, dtype=np.float32))
+        clases = np.asarray(clases, dtype=int)
+        centros, clase_centro = [], []
+        for c in np.unique(clases):
+            grupo = raices[clases == c]
+            k = min(prototipos, len(grupo))
+            if k > 1:
+                criterio = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 50, 1e-4)
+                _, _, grupo = cv2.kmeans(grupo, k, None, criterio, 3, cv2.KMEANS_PP_CENTERS)
+            else:
+                grupo = grupo.mean(axis=0, keepdims=True)
+            centros.append(grupo)
+            clase_centro.extend([c] * len(grupo))
+        centros = np.concatenate(centros).astype(np.float64)
+        centros /= np.maximum(np.linalg.norm(centros, axis=1, keepdims=True), 1e-9)
+        return cls(nombres, clase_centro, centros, umbral)
+
+    @classmethod
+    def cargar(cls, ruta=ARCHIVO_FIRMAS):
+        with np.load(ruta) as datos:
+            if int(datos["dimension"]) != DIMENSION:
+                raise ValueError(f"{ruta} es de otra version de la firma ({int(datos['dimension'])} casilleros)")
+            return cls(datos["nombres"].tolist(), datos["clase_prototipo"], datos["prototipos"],
+                       float(datos["umbral"]))
+
+    def guardar(self, ruta=ARCHIVO_FIRMAS):
+        np.savez(ruta, nombres=np.array(self.nombres, dtype=str), clase_prototipo=self.clase_prototipo,
+                 prototipos=self.prototipos, umbral=self.umbral, dimension=DIMENSION)
+
+    def clasificar(self, firmas):
+        """Clase de cada firma (N, DIMENSION) y su similitud; clase -1 si no llega al umbral."""
+        if len(firmas) == 0:
+            return np.zeros(0, dtype=int), np.zeros(0)
+        similitud = np.sqrt(firmas) @ self.prototipos.T
+        mejor = similitud.argmax(axis=1)
+        puntaje = similitud[np.arange(len(firmas)), mejor]
+        return np.where(puntaje >= self.umbral, self.clase_prototipo[mejor], -1), puntaje
+
+    def clasificar_cajas(self, img_array, cajas):
+        """Nombre de clase (o None) de cada caja xyxy de una imagen RGB."""
+        clases, _ = self.clasificar(histogramas(img_array, cajas))
+        return [self.nombres[c] if c >= 0 else None for c in clases]
+
+
+def cajas_dataset(raiz, split, workers=None):
+    """Recorre datasets/images/<split>: (img_rgb, cajas xyxy en px, clase de cada caja) por imagen etiquetada."""
+    import validar_dataset
+
+    entradas = {c: e for c, e in validar_dataset.escanear(raiz).items() if c.startswith(f"{split}/")}
+    indice, _ = validar_dataset.construir_indice(entradas, workers=workers)
+    # Cajas agrupadas por imagen: cada imagen se lee una vez
+    orden = np.argsort(indice.fila_imagen, kind='stable')
+    limites = np.searchsorted(indice.fila_imagen[orden], np.arange(len(indice.claves) + 1))
+    for fila, clave in enumerate(indice.claves):
+        ruta, propias = entradas[clave][0], orden[limites[fila]:limites[fila + 1]]
+        img = cv2.imread(ruta) if ruta is not None and len(propias) else None
+        if img is None:
+            continue
+        alto, ancho = img.shape[:2]
+        xc, yc, w, h = indice.cajas[propias].T
+        cajas = np.column_stack([(xc - w / 2) * ancho, (yc - h / 2) * alto, (xc + w / 2) * ancho, (yc + h / 2) * alto])
+        yield cv2.cvtColor(img, cv2.COLOR_BGR2RGB), cajas, indice.clase[propias].astype(int)
+
+
+def firmas_dataset(raiz, split, workers=None):
+    """(firmas, clases, nombres) de todas las cajas etiquetadas de datasets/images/<split>."""
+    from validar_dataset import nombres_clases
+
+    firmas, clases = [np.zeros((0, DIMENSION))], [np.zeros(0, dtype=int)]
+    for img, cajas, clase in cajas_dataset(raiz, split, workers):
+        firmas.append(histogramas(img, cajas))
+        clases.append(clase)
+    return np.concatenate(firmas), np.concatenate(clases), nombres_clases(raiz)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entrena las firmas de color por marca con los recortes etiquetados")
+    parser.add_argument('--dataset', default='datasets', help="Raiz del dataset YOLO (images/ y labels/)")
+    parser.add_argument('--split', default='train', help="Split de entrenamiento")
+    parser.add_argument('--validacion', default='val', help="Split para medir el acierto (si existe)")
+    parser.add_argument('--prototipos', type=int, default=PROTOTIPOS_POR_CLASE, help="Prototipos por clase")
+    parser.add_argument('--umbral', type=float, default=UMBRAL_SIMILITUD, help="Similitud minima para asignar clase")
+    parser.add_argument('--salida', default=ARCHIVO_FIRMAS, help="Archivo de firmas (.npz)")
+    parser.add_argument('--workers', type=int, help="Hilos de lectura de etiquetas")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("ENTRENAMIENTO DE FIRMAS DE COLOR")
+    print("="*60)
+
+    inicio = time.perf_counter()
+    firmas, clases, nombres = firmas_dataset(args.dataset, args.split, args.workers)
+    if len(firmas) == 0:
+        print(f"[ERROR] No hay cajas etiquetadas en {Path(args.dataset) / 'images' / args.split}")
+        return
+    clasificador = ClasificadorColor.entrenar(firmas, clases, nombres, args.prototipos, args.umbral)
+    clasificador.guardar(args.salida)
+    print(f"[OK] {len(firmas)} recortes, {len(clasificador.prototipos)} prototipos en "
+          f"{time.perf_counter() - inicio:.1f}s -> {args.salida}")
+    for c in np.unique(clases):
+        prototipos = (clasificador.clase_prototipo == c).sum()
+        print(f"  - {nombres[c]}: {(clases == c).sum()} recortes, {prototipos} prototipos")
+
+    firmas_val, clases_val, _ = firmas_dataset(args.dataset, args.validacion, args.workers)
+    if len(firmas_val):
+        predichas, _ = clasificador.clasificar(firmas_val)
+        print(f"\nAcierto por clase en {args.validacion}: {(predichas == clases_val).mean():.1%} "
+              f"({len(firmas_val)} recortes, {(predichas < 0).mean():.1%} sin clase)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Camino Liviano de Imagenes para la App
+Proyecto Integrador - IFTS24
+
+Una foto de 12 MP ocupa 36 MB como array RGB. La app guardaba varias copias
+por subida (PIL, np.array, la copia para dibujar y la imagen procesada en
+session_state) y mandaba las dos al navegador en resolucion completa. Aca:
+  - La foto se decodifica una sola vez y ya reducida por un factor entero:
+    los JPEG con draft (el decodificador escala 1/2, 1/4 o 1/8 sin armar la
+    imagen completa), el resto con reduce (promedio por bloques, mucho mas
+    barato que un resize). PNG con alfa o paleta se normalizan a RGB.
+  - YOLO detecta sobre esa imagen de trabajo (igual la reduce a 640) y las
+    cajas vuelven a coordenadas de la original.
+  - El dibujo se hace sobre una copia del tamanio de pantalla y en la sesion
+    quedan solo las cajas y miniaturas JPEG.
+  - memoria_sesion() estima lo que retiene cada clave de session_state.
+
+Uso:
+    import imagen_liviana
+    imagen, escala = imagen_liviana.abrir_imagen(archivo)
+    miniatura = imagen_liviana.a_jpeg(imagen_liviana.vista(imagen))
+"""
+
+import io
+import math
+import sys
+from collections import deque
+
+import numpy as np
+from PIL import Image
+
+LADO_TRABAJO = 1920    # Lado mayor minimo para detectar y clasificar color (YOLO reduce a 640 igual)
+LADO_VISTA = 1280      # Lado mayor maximo de las imagenes que se muestran en el navegador
+CALIDAD_JPEG = 85      # Calidad de las miniaturas guardadas en la sesion
+FONDO_TRANSPARENTE = (255, 255, 255)  # Fondo para componer PNG con transparencia
+
+
+def a_rgb(imagen):
+    """Normaliza a RGB; lo transparente (alfa o paleta con transparencia) se compone sobre fondo blanco."""
+    if imagen.mode == 'RGB':
+        return imagen
+    if imagen.mode in ('LA', 'PA') or (imagen.mode == 'P' and 'transparency' in imagen.info):
+        imagen = imagen.convert('RGBA')
+    if imagen.mode == 'RGBA':
+        fondo = Image.new('RGB', imagen.size, FONDO_TRANSPARENTE)
+        fondo.paste(imagen, mask=imagen.getchannel('A'))
+        return fondo
+    return imagen.convert('RGB')
+
+
+def abrir_imagen(archivo, lado=LADO_TRABAJO):
+    """
+    Decodifica `archivo` (ruta o archivo en memoria) como imagen PIL RGB
+    reducida por el mayor factor entero que deja el lado mayor en al menos
+    `lado` (queda por debajo del doble; None: resolucion completa).
+    Devuelve (imagen, escala) con escala = lado de la imagen / lado original,
+    para llevar las cajas detectadas a coordenadas de la foto original.
+    """
+    imagen = Image.open(archivo)
+    original = max(imagen.size)
+    if lado and original >= 2 * lado:
+        # Solo JPEG: el decodificador entrega la escala mas chica que no baje de lo pedido
+        factor = lado / original
+        imagen.draft('RGB', (int(imagen.width * factor), int(imagen.height * factor)))
+    imagen = a_rgb(imagen)
+    if lado and max(imagen.size) >= 2 * lado:
+        imagen = imagen.reduce(max(imagen.size) // lado)
+    imagen.load()
+    return imagen, max(imagen.size) / original
+
+
+def vista(imagen, lado=LADO_VISTA):
+    """Copia reducida por un factor entero para mostrar (la misma imagen si ya entra en `lado`)."""
+    return imagen.reduce(math.ceil(max(imagen.size) / lado)) if max(imagen.size) > lado else imagen
+
+
+def a_jpeg(imagen, calidad=CALIDAD_JPEG):
+    """Codifica una imagen PIL o un array RGB como bytes JPEG (lo que se guarda en la sesion)."""
+    if isinstance(imagen, np.ndarray):
+        imagen = Image.fromarray(imagen)
+    buffer = io.BytesIO()
+    imagen.save(buffer, format='JPEG', quality=calidad)
+    return buffer.getvalue()
+
+
+def tamanio_bytes(valor, _vistos=None):
+    """
+    Bytes aproximados que retiene `valor`: el buffer de arrays, imagenes PIL,
+    bytes y DataFrames, y el contenido de listas, tuplas, dicts y objetos.
+    Cada objeto se cuenta una sola vez.
+    """
+    _vistos = set() if _vistos is None else _vistos
+    if id(valor) in _vistos:
+        return 0
+    _vistos.add(id(valor))
+
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if isinstance(valor, Image.Image):
+        return valor.width * valor.height * len(valor.getbands())
+    if isinstance(valor, (bytes, bytearray, str)):
+        return sys.getsizeof(valor)
+    if hasattr(valor, 'memory_usage') and hasattr(valor, 'columns'):  # DataFrame (sin importar pandas)
+        return int(valor.memory_usage(deep=True).sum())
+    total = sys.getsizeof(valor)
+    if isinstance(valor, dict):
+        total += sum(tamanio_bytes(k, _vistos) + tamanio_bytes(v, _vistos) for k, v in valor.items())
+    elif isinstance(valor, (list, tuple, set, frozenset, deque)):
+        total += sum(tamanio_bytes(v, _vistos) for v in valor)
+    elif hasattr(valor, '__dict__') and not isinstance(valor, type):
+        total += tamanio_bytes(vars(valor), _vistos)
+    return total
+
+
+def memoria_sesion(estado):
+    """Lista de (clave, bytes) de un session_state (o dict), de mayor a menor."""
+    vistos = set()
+    tamanios = [(str(clave), tamanio_bytes(valor, vistos)) for clave, valor in estado.items()]
+    return sorted(tamanios, key=lambda par: par[1], reverse=True)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Inferencia por Tiles para Fotos de Alta Resolucion
+Proyecto Integrador - IFTS24
+
+Una foto de 4000x3000 reducida a 640 pierde las botellas chicas de los
+estantes superiores. Aca la imagen se corta en tiles solapados del tamanio
+de entrada del modelo, se procesan en lotes con YOLO y las detecciones se
+unen con un NMS entre tiles.
+"""
+
+import cv2
+import numpy as np
+from PIL import Image
+
+import deteccion
+import perfilado
+
+TAMANIO_TILE = 640
+SOLAPE_TILE = 0.2
+LOTE_TILES = 16       # Tiles por llamada al modelo (acota la memoria)
+UMBRAL_FUSION = 0.6   # Interseccion sobre la caja menor para fusionar entre tiles
+
+
+def _inicios(largo, tamanio, paso):
+    """Posiciones de inicio de tiles que cubren todo el largo."""
+    if largo <= tamanio:
+        return np.array([0])
+    inicios = np.arange(0, largo - tamanio + 1, paso)
+    if inicios[-1] != largo - tamanio:
+        inicios = np.append(inicios, largo - tamanio)
+    return inicios
+
+
+def generar_tiles(alto, ancho, tamanio=TAMANIO_TILE, solape=SOLAPE_TILE):
+    """Devuelve un array (T, 4) con las ventanas x1, y1, x2, y2 de cada tile."""
+    paso = max(1, int(tamanio * (1 - solape)))
+    xs = _inicios(ancho, tamanio, paso)
+    ys = _inicios(alto, tamanio, paso)
+    x1, y1 = np.meshgrid(xs, ys)
+    x1, y1 = x1.ravel(), y1.ravel()
+    return np.stack([x1, y1, np.minimum(x1 + tamanio, ancho), np.minimum(y1 + tamanio, alto)], axis=1)
+
+
+def detectar_tiles(model, imagen, conf=0.25, tamanio=TAMANIO_TILE, solape=SOLAPE_TILE,
+                   lote=LOTE_TILES, incluir_global=True, umbral_fusion=UMBRAL_FUSION):
+    """
+    Detecta botellas recorriendo la imagen en tiles solapados.
+    `imagen` puede ser PIL o un array RGB. Con incluir_global se agrega la
+    imagen completa al lote para no partir las botellas mas grandes que un tile.
+    Devuelve un array (N, 6) en coordenadas de la imagen original.
+    """
+    if isinstance(imagen, Image.Image):
+        imagen = np.asarray(imagen.convert('RGB'))
+    img_bgr = cv2.cvtColor(imagen, cv2.COLOR_RGB2BGR)
+    alto, ancho = img_bgr.shape[:2]
+
+    tiles = generar_tiles(alto, ancho, tamanio, solape)
+    recortes = [img_bgr[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles]
+    desplazamientos = [np.array([x1, y1, x1, y1]) for x1, y1, _, _ in tiles]
+    if incluir_global and len(tiles) > 1:
+        recortes.append(img_bgr)
+        desplazamientos.append(np.zeros(4, dtype=int))
+
+    todas = []
+    for i in range(0, len(recortes), lote):
+        resultados = deteccion.detectar_botellas(model, recortes[i:i+lote], conf=conf, imgsz=tamanio)
+        for detecciones, offset in zip(resultados, desplazamientos[i:i+lote]):
+            detecciones[:, :4] += offset
+            todas.append(detecciones)
+
+    with perfilado.etapa('fusion_tiles', tiles=len(recortes)):
+        todas = np.concatenate(todas) if todas else np.zeros((0, 6), dtype=np.float32)
+        return deteccion.nms(todas, umbral_fusion, metrica='ios')
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Panorama de Gondola (Varias Fotos Solapadas)
+Proyecto Integrador - IFTS24
+
+Una gondola completa se fotografia en 3 a 6 tomas solapadas. Auditarlas por
+separado cuenta dos veces las botellas de los solapes y paga YOLO sobre esos
+pixeles en cada foto. Aca:
+  - Las fotos se alinean con puntos ORB contra cualquier foto ya alineada,
+    las vecinas primero; el marco comun es el de la primera foto. Como la
+    gondola se fotografia de frente, entre tomas alcanza una similitud
+    (traslacion, giro y escala) estimada por RANSAC: es mucho mas estable
+    que una homografia completa ajustada solo sobre la franja de solape.
+  - Cada foto se detecta una sola vez y solo en la parte que no cubren las
+    anteriores (mas un margen para las botellas cortadas por la costura).
+  - Las cajas se proyectan al marco comun y las repetidas se fusionan antes
+    del Share of Shelf; el area de cada producto se mide en ese marco.
+Las fotos que no se pudieron alinear se ubican a la derecha del marco, sin
+solaparse con nada: se auditan completas y se informan en las metricas.
+
+Uso:
+    python panorama_gondola.py toma1.jpg toma2.jpg toma3.jpg --salida gondola.csv --imagen panorama.jpg
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+import deteccion
+import imagen_liviana
+from backends_inferencia import imgsz_modelo
+
+LADO_REGISTRO = 800       # Lado mayor de las fotos al buscar puntos ORB (las transformaciones se escalan)
+PUNTOS_ORB = 3000
+RATIO_LOWE = 0.8          # Un par se acepta si es claramente mejor que el segundo candidato
+MIN_INLIERS = 15          # Pares consistentes con la transformacion para dar por alineadas dos fotos
+UMBRAL_RANSAC = 3.0       # Error de reproyeccion (px a LADO_REGISTRO) para contar un inlier
+MARGEN_COSTURA = 0.12     # Fraccion del ancho/alto que se suma a la region nueva de cada foto
+UMBRAL_DUPLICADO = 0.5    # Interseccion sobre la caja menor para fusionar cajas de fotos distintas
+SEPARACION_SUELTAS = 50   # px entre el marco y las fotos que no se pudieron alinear
+PASO_COBERTURA = 8        # Las regiones nuevas se calculan sobre una mascara reducida 8 veces
+
+
+def puntos_clave(imagen, orb):
+    """Puntos ORB de una foto RGB reducida a LADO_REGISTRO: (puntos en px de la foto, descriptores, escala, tamanio)."""
+    escala = min(1.0, LADO_REGISTRO / max(imagen.shape[:2]))
+    reducida = cv2.resize(imagen, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA) if escala < 1 else imagen
+    claves, descriptores = orb.detectAndCompute(cv2.cvtColor(reducida, cv2.COLOR_RGB2GRAY), None)
+    puntos = np.float32([c.pt for c in claves]).reshape(-1, 2) / escala
+    return puntos, descriptores, escala, imagen.shape[1::-1]
+
+
+def alinear_par(origen, destino, matcher):
+    """
+    Matriz 3x3 (similitud) que lleva puntos de la foto `origen` a la foto
+    `destino` (cada una como la devuelve puntos_clave), o None si no alinean.
+    """
+    puntos_a, desc_a, escala_a, (ancho, alto) = origen
+    puntos_b, desc_b, escala_b, _ = destino
+    if desc_a is None or desc_b is None or len(desc_a) < MIN_INLIERS or len(desc_b) < MIN_INLIERS:
+        return None
+    pares = [p[0] for p in matcher.knnMatch(desc_a, desc_b, k=2)
+             if len(p) == 2 and p[0].distance < RATIO_LOWE * p[1].distance]
+    if len(pares) < MIN_INLIERS:
+        return None
+    src = puntos_a[[m.queryIdx for m in pares]]
+    dst = puntos_b[[m.trainIdx for m in pares]]
+    A, inliers = cv2.estimateAffinePartial2D(src, dst, method=cv2.RANSAC,
+                                             ransacReprojThreshold=UMBRAL_RANSAC / min(escala_a, escala_b))
+    if A is None or inliers.sum() < MIN_INLIERS:
+        return None
+    H = np.vstack([A, [0, 0, 1]])
+    # Descarta alineaciones absurdas: entre tomas de la misma gondola la escala cambia poco
+    contorno = proyectar(esquinas(ancho, alto), H).astype(np.float32)
+    if not cv2.isContourConvex(contorno) or not 0.25 < cv2.contourArea(contorno) / (ancho * alto) < 4:
+        return None
+    return H
+
+
+def esquinas(ancho, alto):
+    return np.float32([[0, 0], [ancho, 0], [ancho, alto], [0, alto]])
+
+
+def proyectar(puntos, H):
+    """Aplica la homografia H a un array (N, 2) de puntos."""
+    return cv2.perspectiveTransform(np.asarray(puntos, dtype=np.float64).reshape(-1, 1, 2), H).reshape(-1, 2)
+
+
+def proyectar_cajas(cajas, H):
+    """Caja xyxy que contiene la proyeccion de cada caja (N, 4) por H."""
+    if len(cajas) == 0:
+        return np.zeros((0, 4))
+    x1, y1, x2, y2 = np.asarray(cajas, dtype=np.float64)[:, :4].T
+    vertices = np.stack([np.stack([x1, y1], 1), np.stack([x2, y1], 1),
+                         np.stack([x2, y2], 1), np.stack([x1, y2], 1)], 1)
+    proyectados = proyectar(vertices.reshape(-1, 2), H).reshape(-1, 4, 2)
+    return np.concatenate([proyectados.min(axis=1), proyectados.max(axis=1)], axis=1)
+
+
+def registrar_fotos(imagenes):
+    """
+    Alinea las fotos contra la primera. Devuelve (homografias, tamanio_marco,
+    alineadas): la matriz 3x3 de cada foto al marco comun (trasladado para que
+    todo quede en coordenadas positivas), el (ancho, alto) del marco y si cada
+    foto se pudo alinear.
+    """
+    orb = cv2.ORB_create(PUNTOS_ORB)
+    matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+    puntos = [puntos_clave(img, orb) for img in imagenes]
+
+    homografias = [np.eye(3)] + [None] * (len(imagenes) - 1)
+    pendientes = list(range(1, len(imagenes)))
+    avance = True
+    while pendientes and avance:
+        avance = False
+        for i in list(pendientes):
+            alineadas = [j for j, H in enumerate(homografias) if H is not None]
+            for j in sorted(alineadas, key=lambda j: abs(i - j)):
+                H = alinear_par(puntos[i], puntos[j], matcher)
+                if H is not None:
+                    homografias[i] = homografias[j] @ H
+                    pendientes.remove(i)
+                    avance = True
+                    break
+
+    alineadas = [H is not None for H in homografias]
+    vertices = np.concatenate([proyectar(esquinas(img.shape[1], img.shape[0]), H)
+                               for img, H in zip(imagenes, homografias) if H is not None])
+    minimo, maximo = vertices.min(axis=0), vertices.max(axis=0)
+    traslacion = np.array([[1, 0, -minimo[0]], [0, 1, -minimo[1]], [0, 0, 1]])
+    homografias = [traslacion @ H if H is not None else None for H in homografias]
+    ancho, alto = (int(np.ceil(v)) for v in maximo - minimo)
+
+    # Las fotos sueltas van a la derecha, una al lado de la otra
+    for i, img in enumerate(imagenes):
+        if homografias[i] is None:
+            homografias[i] = np.array([[1, 0, ancho + SEPARACION_SUELTAS], [0, 1, 0], [0, 0, 1]], dtype=np.float64)
+            ancho += SEPARACION_SUELTAS + img.shape[1]
+            alto = max(alto, img.shape[0])
+    return homografias, (ancho, alto), alineadas
+
+
+def regiones_nuevas(tamanios, homografias, margen=MARGEN_COSTURA):
+    """
+    Rectangulo x1, y1, x2, y2 de cada foto (en sus coordenadas) que no cubren
+    las fotos anteriores, agrandado en `margen` para que las botellas cortadas
+    por la costura entren enteras; None si la foto ya esta toda cubierta.
+    """
+    regiones = []
+    for i, (ancho, alto) in enumerate(tamanios):
+        nueva = np.ones((alto // PASO_COBERTURA + 1, ancho // PASO_COBERTURA + 1), dtype=np.uint8)
+        a_foto = np.linalg.inv(homografias[i])
+        for j in range(i):
+            poligono = proyectar(esquinas(*tamanios[j]), a_foto @ homografias[j]) / PASO_COBERTURA
+            cv2.fillPoly(nueva, [np.clip(poligono, -1e6, 1e6).round().astype(np.int32)], 0)
+        # Franjas nuevas mas finas que el margen (bordes por el giro de la toma) no tienen botellas enteras
+        mx, my = margen * ancho, margen * alto
+        nucleo = np.ones((max(1, int(my / PASO_COBERTURA)), max(1, int(mx / PASO_COBERTURA))), np.uint8)
+        ys, xs = np.nonzero(cv2.morphologyEx(nueva, cv2.MORPH_OPEN, nucleo))
+        if len(xs) == 0:
+            regiones.append(None)
+            continue
+        regiones.append((
+            int(max(0, xs.min() * PASO_COBERTURA - mx)), int(max(0, ys.min() * PASO_COBERTURA - my)),
+            int(min(ancho, (xs.max() + 1) * PASO_COBERTURA + mx)), int(min(alto, (ys.max() + 1) * PASO_COBERTURA + my)),
+        ))
+    return regiones
+
+
+def fusionar(detecciones, umbral=UMBRAL_DUPLICADO):
+    """
+    Indices de las cajas (N, 6) del marco comun que sobreviven a la fusion de
+    duplicados (NMS por interseccion sobre la caja menor, gana la mas confiable).
+    """
+    marcadas = np.column_stack([detecciones[:, :5], np.arange(len(detecciones))])
+    return np.sort(deteccion.nms(marcadas, umbral, metrica='ios')[:, 5].astype(int))
+
+
+def auditar_panorama(model, imagenes, conf=0.25, margen=MARGEN_COSTURA, umbral=UMBRAL_DUPLICADO):
+    """
+    Audita varias fotos RGB solapadas de la misma gondola como una sola.
+    Devuelve (data_marketing, detecciones, metricas, registro): un producto
+    por fila con su caja (N, 6) en el marco comun, los tiempos de registro y
+    deteccion, y registro = (homografias, tamanio_marco) para dibujar_panorama.
+    """
+    familias = deteccion.familias_modelo(model)
+
+    inicio = time.perf_counter()
+    homografias, tamanio_marco, alineadas = registrar_fotos(imagenes)
+    tamanios = [(img.shape[1], img.shape[0]) for img in imagenes]
+    regiones = regiones_nuevas(tamanios, homografias, margen)
+    segundos_registro = time.perf_counter() - inicio
+
+    # Una pasada de YOLO por foto, solo sobre su parte nueva y a la misma escala que la foto entera
+    # (imgsz proporcional al recorte): el costo baja con los pixeles que ya cubrio otra foto
+    inicio = time.perf_counter()
+    imgsz = imgsz_modelo(model)
+    cajas_marco, marcas = [], []
+    for i, region in enumerate(regiones):
+        if region is None:
+            continue
+        x1, y1, x2, y2 = region
+        proporcion = max(x2 - x1, y2 - y1) / max(tamanios[i])
+        recorte = cv2.cvtColor(imagenes[i][y1:y2, x1:x2], cv2.COLOR_RGB2BGR)
+        detecciones = deteccion.detectar_botellas(model, recorte, conf=conf,
+                                                  imgsz=max(32, int(np.ceil(imgsz * proporcion / 32)) * 32))[0]
+        detecciones[:, :4] += [x1, y1, x1, y1]
+        data, _, indices = deteccion.analizar_detecciones(imagenes[i], detecciones, dibujar=False,
+                                                          familias=familias)
+        proyectadas = detecciones[indices].astype(np.float64)
+        proyectadas[:, :4] = proyectar_cajas(proyectadas, homografias[i])
+        cajas_marco.append(proyectadas)
+        marcas.extend(fila["Marca"] for fila in data)
+    segundos_deteccion = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    detecciones = np.concatenate(cajas_marco) if cajas_marco else np.zeros((0, 6))
+    conservadas = fusionar(detecciones, umbral) if len(detecciones) else np.zeros(0, dtype=int)
+    detecciones = detecciones[conservadas]
+    data_marketing = [{"Marca": marcas[k], "Area": int((x2 - x1) * (y2 - y1))}
+                      for k, (x1, y1, x2, y2) in zip(conservadas, detecciones[:, :4])]
+    segundos_fusion = time.perf_counter() - inicio
+
+    pixeles = sum(w * h for w, h in tamanios)
+    inferidos = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in (r for r in regiones if r is not None))
+    metricas = {
+        "fotos": len(imagenes),
+        "fotos_alineadas": int(sum(alineadas)),
+        "fotos_sin_alinear": [i for i, ok in enumerate(alineadas) if not ok],
+        "productos": len(data_marketing),
+        "duplicados_fusionados": int(sum(len(c) for c in cajas_marco) - len(data_marketing)),
+        "fraccion_inferida": round(inferidos / pixeles, 3) if pixeles else 0.0,
+        "segundos_registro": round(segundos_registro, 3),
+        "segundos_deteccion": round(segundos_deteccion, 3),
+        "segundos_fusion": round(segundos_fusion, 3),
+        "registro_vs_deteccion": round(segundos_registro / segundos_deteccion, 2) if segundos_deteccion else None,
+    }
+    return data_marketing, detecciones, metricas, (homografias, tamanio_marco)
+
+
+def dibujar_panorama(imagenes, registro, detecciones, data_marketing, lado=imagen_liviana.LADO_VISTA):
+    """Mosaico RGB de las fotos en el marco comun, reducido a `lado`, con las cajas fusionadas."""
+    homografias, (ancho, alto) = registro
+    escala = min(1.0, lado / max(ancho, alto))
+    reduccion = np.diag([escala, escala, 1.0])
+    tamanio = (max(1, round(ancho * escala)), max(1, round(alto * escala)))
+    mosaico = np.zeros((tamanio[1], tamanio[0], 3), dtype=np.uint8)
+    # En orden inverso: la foto de referencia queda arriba en los solapes
+    for img, H in reversed(list(zip(imagenes, homografias))):
+        proyectada = cv2.warpPerspective(img, reduccion @ H, tamanio, flags=cv2.INTER_AREA)
+        mascara = cv2.warpPerspective(np.full(img.shape[:2], 255, np.uint8), reduccion @ H, tamanio,
+                                      flags=cv2.INTER_NEAREST)
+        mosaico[mascara > 0] = proyectada[mascara > 0]
+    return deteccion.dibujar_detecciones(mosaico, detecciones, data_marketing, escala)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auditoria de Share of Shelf sobre varias fotos solapadas")
+    parser.add_argument('fotos', nargs='+', help="Tomas de la misma gondola (jpg/png), idealmente en orden")
+    parser.add_argument('--conf', type=float, default=0.25, help="Sensibilidad IA (confianza minima)")
+    parser.add_argument('--salida', help="CSV con un producto por fila (caja en el marco comun)")
+    parser.add_argument('--imagen', help="Guardar el mosaico con las detecciones (jpg)")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("AUDITORIA DE PANORAMA - SHARE OF SHELF")
+    print("="*60)
+
+    model = deteccion.load_generic_model(uso='lote')
+    imagenes = [np.asarray(imagen_liviana.abrir_imagen(ruta)[0]) for ruta in args.fotos]
+    data, detecciones, metricas, registro = auditar_panorama(model, imagenes, args.conf)
+
+    for clave, valor in metricas.items():
+        print(f"  {clave}: {valor}")
+    for i in metricas["fotos_sin_alinear"]:
+        print(f"[ERROR] {args.fotos[i]} no se pudo alinear: se audita sola")
+    print("\nShare of Shelf de la gondola:")
+    for _, fila in deteccion.calcular_share(data).iterrows():
+        print(f"  - {fila['Marca']}: {fila['Share (%)']}%")
+
+    if args.salida:
+        import pandas as pd
+        filas = deteccion.filas_detecciones(data, detecciones, range(len(data)), "+".join(args.fotos))
+        pd.DataFrame(filas).to_csv(args.salida, index=False)
+        print(f"\nProductos guardados en {args.salida}")
+    if args.imagen:
+        mosaico = dibujar_panorama(imagenes, registro, detecciones, data)
+        cv2.imwrite(args.imagen, cv2.cvtColor(mosaico, cv2.COLOR_RGB2BGR))
+        print(f"[OK] Mosaico guardado en {args.imagen}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Perfilado por Etapas del Pipeline
+Proyecto Integrador - IFTS24
+
+Mide cuanto tarda cada etapa de un analisis (decodificacion, YOLO con su
+preproceso / inferencia / NMS, color, dibujo, reporte) y lo guarda en una
+traza por ejecucion. Las trazas se ven en el panel de la app y se exportan
+en formato Chrome Trace (abrir con chrome://tracing o https://ui.perfetto.dev).
+
+Se activa sin tocar codigo con la variable de entorno:
+    STOCKVISION_PERFIL=1
+Apagado, etapa() no mide nada y el costo es despreciable.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+ACTIVO = os.environ.get('STOCKVISION_PERFIL', '').lower() in ('1', 'true', 'si')
+MAX_TRAZAS = 20  # Trazas que conserva el panel de la app
+
+_actual = threading.local()
+
+
+class Traza:
+    """Etapas medidas durante una ejecucion: (nombre, inicio, duracion, args)."""
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.inicio = time.perf_counter()
+        self.fin = None
+        self.hilo = threading.get_ident()
+        self.eventos = []
+
+    def registrar(self, nombre, inicio, duracion, **args):
+        self.eventos.append((nombre, inicio, duracion, args))
+
+    def duracion(self):
+        return (self.fin or time.perf_counter()) - self.inicio
+
+    def etapas(self):
+        """Milisegundos por etapa (sumando repeticiones) en orden de aparicion, mas el total."""
+        tiempos = {}
+        for nombre, _, duracion, _ in self.eventos:
+            tiempos[nombre] = tiempos.get(nombre, 0.0) + duracion * 1000
+        tiempos["total"] = self.duracion() * 1000
+        return {nombre: round(ms, 1) for nombre, ms in tiempos.items()}
+
+    def eventos_chrome(self):
+        """Eventos completos ('ph': 'X') con tiempos en microsegundos."""
+        pid = os.getpid()
+        eventos = [{"name": self.nombre, "cat": "traza", "ph": "X", "pid": pid, "tid": self.hilo,
+                    "ts": self.inicio * 1e6, "dur": self.duracion() * 1e6}]
+        for nombre, inicio, duracion, args in self.eventos:
+            eventos.append({"name": nombre, "cat": "etapa", "ph": "X", "pid": pid, "tid": self.hilo,
+                            "ts": inicio * 1e6, "dur": duracion * 1e6, "args": args})
+        return eventos
+
+
+def chrome_trace(trazas):
+    """Documento Chrome Trace con todas las trazas."""
+    return {"traceEvents": [e for t in trazas for e in t.eventos_chrome()], "displayTimeUnit": "ms"}
+
+
+def exportar_chrome(trazas, ruta):
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(chrome_trace(trazas), f, default=str)
+
+
+@contextmanager
+def traza(nombre):
+    """Abre una traza para el hilo actual. Devuelve None si el perfilado esta apagado."""
+    if not ACTIVO:
+        yield None
+        return
+    nueva = Traza(nombre)
+    anterior = getattr(_actual, 'traza', None)
+    _actual.traza = nueva
+    try:
+        yield nueva
+    finally:
+        nueva.fin = time.perf_counter()
+        _actual.traza = anterior
+
+
+@contextmanager
+def etapa(nombre, **args):
+    """Mide el bloque como una etapa de la traza abierta en este hilo (si hay)."""
+    actual = getattr(_actual, 'traza', None)
+    if actual is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        actual.registrar(nombre, inicio, time.perf_counter() - inicio, **args)
+
+
+def registrar(nombre, inicio, duracion, **args):
+    """Agrega una etapa medida por fuera (por ejemplo los tiempos que informa ultralytics)."""
+    actual = getattr(_actual, 'traza', None)
+    if actual is not None:
+        actual.registrar(nombre, inicio, duracion, **args)
+
+
+def registrar_ultralytics(inicio, resultados):
+    """Desglosa una llamada a YOLO con los tiempos por imagen de Results.speed (ms)."""
+    if getattr(_actual, 'traza', None) is None:
+        return
+    for clave, nombre in (('preprocess', 'yolo.preproceso'), ('inference', 'yolo.inferencia'),
+                          ('postprocess', 'yolo.postproceso')):
+        duracion = sum((r.speed or {}).get(clave) or 0.0 for r in resultados) / 1000
+        registrar(nombre, inicio, duracion)
+        inicio += duracion
@@ -3,12 +3,43 @@
 """
 Script para Preparar Dataset de Productos en Gondolas
 Proyecto Integrador - IFTS24
+
+Sin argumentos crea la estructura vacia, data.yaml e instrucciones. Con
+--origen arma el dataset desde carpetas locales de fotos crudas (una
+subcarpeta por clase), sin conexion: valida y redimensiona en paralelo,
+descarta duplicados por hash perceptual, escribe las etiquetas YOLO y
+lleva un manifiesto para que las corridas siguientes solo procesen lo
+nuevo o modificado.
+
+Uso:
+    python prepare_dataset.py
+    python prepare_dataset.py --origen crudas/ --destino datasets
+    python prepare_dataset.py --origen crudas/ descargas/ --workers 4 --lado-maximo 1280
 """
 
+import argparse
+import hashlib
+import json
 import os
 import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
+import numpy as np
+from PIL import Image
+
+CLASES = ['coca-cola', 'sprite', 'fanta', 'pepsi', 'seven-up', 'bottle']  # Igual que data.yaml
+ID_CLASE = {nombre: i for i, nombre in enumerate(CLASES)}
+EXTENSIONES_IMAGEN = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+PROPORCION_SPLITS = {'train': 70, 'val': 20, 'test': 10}  # Porcentajes
+LADO_MINIMO = 224  # Igual que filtrar_imagenes_validas del notebook
+LADO_MAXIMO = 1280  # Lado mayor al guardar (YOLO entrena a 640)
+CALIDAD_JPEG = 92
+UMBRAL_DUPLICADO = 4  # Bits distintos de dHash para considerar dos imagenes iguales
+ARCHIVO_MANIFIESTO = 'manifiesto.json'
+GUARDAR_CADA = 200  # Imagenes procesadas entre escrituras del manifiesto
+
 def crear_estructura_basica():
     """Crea la estructura basica de directorios para el dataset"""
     print("Creando estructura de dataset...")
@@ -141,6 +172,8 @@ Despues de anotar, verifica:
 - Las coordenadas estan entre 0 y 1
 - Los clase_id son correctos (0-5)
 - No hay bounding boxes vacios
+Todo esto lo revisa automaticamente:
+python validar_dataset.py
 
 7. ENTRENAMIENTO
 Una vez preparado el dataset, ejecuta:
@@ -184,12 +217,247 @@ def verificar_estructura():
         else:
             print(f"  [ERROR] {archivo} - NO EXISTE")
 
+    if any(Path('datasets/labels').glob('*/*.txt')):
+        import validar_dataset
+
+        print("\nEtiquetas:")
+        reporte = validar_dataset.validar('datasets')
+        for tipo, lista in reporte["errores"].items():
+            print(f"  [ERROR] {tipo}: {len(lista)}")
+        if not reporte["errores"]:
+            print(f"  [OK] {reporte['estadisticas']['cajas']} cajas sin errores")
+        print("  Detalle completo: python validar_dataset.py")
+
+# ----------------------------------------------------------------------------
+# Construccion del dataset desde carpetas locales de imagenes crudas
+# ----------------------------------------------------------------------------
+
+def firma_origen(ruta):
+    """Tamanio y fecha de modificacion de la imagen (y de su etiqueta .txt, si tiene)."""
+    stat = ruta.stat()
+    firma = [stat.st_size, stat.st_mtime_ns]
+    etiqueta = ruta.with_suffix('.txt')
+    if etiqueta.exists():
+        firma.append(etiqueta.stat().st_mtime_ns)
+    return firma
+
+
+def escanear_origen(origen):
+    """
+    Lista las imagenes de una carpeta cruda organizada por clase
+    (origen/coca-cola/*.jpg, origen/sprite/*.png, ...). Devuelve tuplas
+    (clave, ruta, clase_id, firma); la clave es la ruta absoluta del origen
+    mas la relativa dentro de el (clase/.../archivo): dos origenes con el
+    mismo nombre de carpeta, o archivos homonimos en subcarpetas, no chocan.
+    """
+    origen = Path(origen).resolve()
+    encontradas = []
+    for carpeta in sorted(p for p in origen.iterdir() if p.is_dir()):
+        clase_id = ID_CLASE.get(carpeta.name.lower())
+        if clase_id is None:
+            print(f"  [ERROR] {carpeta} - clase desconocida, se omite")
+            continue
+        for ruta in sorted(carpeta.rglob('*')):
+            if ruta.suffix.lower() in EXTENSIONES_IMAGEN:
+                clave = f"{origen.as_posix()}/{ruta.relative_to(origen).as_posix()}"
+                encontradas.append((clave, ruta, clase_id, firma_origen(ruta)))
+    return encontradas
+
+
+def dhash(img, lado=8):
+    """Hash perceptual por diferencias (64 bits): robusto a recompresion y cambios de tamanio."""
+    gris = np.asarray(img.convert('L').resize((lado + 1, lado), Image.BILINEAR), dtype=np.int16)
+    bits = (gris[:, 1:] > gris[:, :-1]).ravel()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def split_estable(clave):
+    """train/val/test segun el hash del nombre: agregar imagenes no mueve las ya asignadas."""
+    valor = int(hashlib.sha1(clave.encode('utf-8')).hexdigest()[:8], 16) % 100
+    acumulado = 0
+    for split, porcentaje in PROPORCION_SPLITS.items():
+        acumulado += porcentaje
+        if valor < acumulado:
+            return split
+    return 'train'
+
+
+def procesar_imagen(tarea):
+    """
+    Corre en el pool de procesos: valida, redimensiona y guarda la imagen
+    como JPEG y calcula su dHash. La etiqueta la escribe el proceso principal
+    despues de descartar duplicados.
+    """
+    clave, ruta, destino, lado_maximo, lado_minimo = tarea
+    try:
+        with Image.open(ruta) as img:
+            img.verify()  # Detecta archivos truncados sin decodificar todo
+        with Image.open(ruta) as img:
+            img.draft('RGB', (lado_maximo, lado_maximo))  # Decodificacion reducida de JPEG
+            img = img.convert('RGB')
+            ancho, alto = img.size
+            if min(ancho, alto) < lado_minimo:
+                return clave, None, f"demasiado chica ({ancho}x{alto})"
+            img.thumbnail((lado_maximo, lado_maximo), Image.LANCZOS)
+            hash_img = dhash(img)
+            Path(destino).parent.mkdir(parents=True, exist_ok=True)
+            img.save(destino, 'JPEG', quality=CALIDAD_JPEG)
+            return clave, {"dhash": f"{hash_img:016x}", "tamanio": list(img.size)}, None
+    except Exception as e:
+        return clave, None, str(e)
+
+
+def distancia_hamming(hashes, valor):
+    """Distancia de Hamming entre un hash y un vector de hashes uint64."""
+    if len(hashes) == 0:
+        return np.empty(0, dtype=np.int64)
+    diferencias = np.bitwise_xor(hashes, np.uint64(valor))
+    return np.unpackbits(diferencias.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+def escribir_etiqueta(ruta_imagen, clase_id, destino):
+    """Copia las anotaciones YOLO de origen (si hay) o una caja que cubre toda la imagen."""
+    origen = Path(ruta_imagen).with_suffix('.txt')
+    if origen.exists():
+        shutil.copyfile(origen, destino)
+    else:
+        with open(destino, 'w', encoding='utf-8') as f:
+            f.write(f"{clase_id} 0.500000 0.500000 1.000000 1.000000\n")
+
+
+def cargar_manifiesto(ruta):
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return json.load(f)["archivos"]
+
+
+def guardar_manifiesto(ruta, archivos):
+    """Escritura atomica: un corte a mitad de camino no deja el manifiesto roto."""
+    temporal = f"{ruta}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump({"version": 1, "archivos": archivos}, f, indent=1, ensure_ascii=False)
+    os.replace(temporal, ruta)
+
+
+def borrar_salidas(destino, entrada):
+    for carpeta, extension in (('images', '.jpg'), ('labels', '.txt')):
+        ruta = Path(destino) / carpeta / entrada["split"] / f"{entrada['nombre']}{extension}"
+        if ruta.exists():
+            ruta.unlink()
+
+
+def construir_dataset(origenes, destino='datasets', workers=None, lado_maximo=LADO_MAXIMO,
+                      lado_minimo=LADO_MINIMO, umbral_duplicado=UMBRAL_DUPLICADO):
+    """
+    Arma el dataset YOLO desde carpetas locales de imagenes crudas.
+    El escaneo de los origenes corre en hilos y la validacion/redimensionado
+    en un pool de procesos. Las imagenes casi iguales (dHash a distancia <=
+    umbral_duplicado) se descartan. El manifiesto guarda la firma de cada
+    archivo: al volver a correr solo se procesan los nuevos o modificados, y
+    si se corta a mitad de camino se retoma desde donde quedo.
+    """
+    destino = Path(destino)
+    ruta_manifiesto = destino / ARCHIVO_MANIFIESTO
+    destino.mkdir(parents=True, exist_ok=True)
+    manifiesto = cargar_manifiesto(ruta_manifiesto)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(origenes))) as pool:
+        encontradas = [item for lista in pool.map(escanear_origen, origenes) for item in lista]
+    print(f"  [OK] {len(encontradas)} imagenes en {len(origenes)} origen(es)")
+
+    # Archivos borrados o modificados desde la ultima corrida
+    vigentes = {clave: (ruta, clase_id, firma) for clave, ruta, clase_id, firma in encontradas}
+    eliminadas, quitadas_ok = 0, 0
+    for clave in list(manifiesto):
+        if clave not in vigentes or manifiesto[clave]["firma"] != vigentes[clave][2]:
+            if manifiesto[clave]["estado"] == 'ok':
+                borrar_salidas(destino, manifiesto[clave])
+                quitadas_ok += 1
+            eliminadas += clave not in vigentes
+            del manifiesto[clave]
+    if quitadas_ok:
+        # Un duplicado descartado puede haber perdido su original: se reevaluan
+        for clave in [c for c, e in manifiesto.items() if e["estado"] == 'duplicada']:
+            del manifiesto[clave]
+
+    pendientes = [clave for clave in vigentes if clave not in manifiesto]
+    print(f"  [OK] {len(encontradas) - len(pendientes)} sin cambios, {len(pendientes)} a procesar, "
+          f"{eliminadas} eliminadas")
+
+    aceptados = [int(e["dhash"], 16) for e in manifiesto.values() if e["estado"] == 'ok']
+    hashes = np.array(aceptados, dtype=np.uint64)
+    contadores = {'ok': 0, 'duplicada': 0, 'invalida': 0}
+
+    tareas = []
+    for clave in pendientes:
+        ruta, clase_id, _ = vigentes[clave]
+        nombre = f"{CLASES[clase_id]}_{hashlib.sha1(clave.encode('utf-8')).hexdigest()[:12]}"
+        split = split_estable(clave)
+        tareas.append((clave, ruta, destino / 'images' / split / f"{nombre}.jpg", lado_maximo, lado_minimo))
+
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map conserva el orden: ante duplicados siempre se queda la misma imagen
+        for i, (clave, info, error) in enumerate(pool.map(procesar_imagen, tareas, chunksize=8), 1):
+            ruta, clase_id, firma = vigentes[clave]
+            imagen_destino = tareas[i - 1][2]
+            entrada = {"firma": firma, "clase": clase_id, "split": imagen_destino.parent.name,
+                       "nombre": imagen_destino.stem}
+            if error:
+                entrada.update(estado='invalida', motivo=error)
+            else:
+                entrada.update(info)
+                valor = int(info["dhash"], 16)
+                distancias = distancia_hamming(hashes, valor)
+                if len(distancias) and distancias.min() <= umbral_duplicado:
+                    imagen_destino.unlink()
+                    entrada["estado"] = 'duplicada'
+                else:
+                    etiqueta = destino / 'labels' / entrada["split"] / f"{entrada['nombre']}.txt"
+                    etiqueta.parent.mkdir(parents=True, exist_ok=True)
+                    escribir_etiqueta(ruta, clase_id, etiqueta)
+                    hashes = np.append(hashes, np.uint64(valor))
+                    entrada["estado"] = 'ok'
+            manifiesto[clave] = entrada
+            contadores[entrada["estado"]] += 1
+            if i % GUARDAR_CADA == 0:
+                guardar_manifiesto(ruta_manifiesto, manifiesto)
+                print(f"  ... {i}/{len(tareas)}")
+    guardar_manifiesto(ruta_manifiesto, manifiesto)
+
+    duracion = time.perf_counter() - inicio
+    print(f"  [OK] Nuevas: {contadores['ok']} | duplicadas: {contadores['duplicada']} | "
+          f"invalidas: {contadores['invalida']} ({len(tareas) / duracion if tareas else 0:.1f} img/s)")
+    por_split = {}
+    for entrada in manifiesto.values():
+        if entrada["estado"] == 'ok':
+            por_split[entrada["split"]] = por_split.get(entrada["split"], 0) + 1
+    print("  [OK] Dataset: " + ", ".join(f"{s}={n}" for s, n in sorted(por_split.items())))
+    return contadores
+
 def main():
+    parser = argparse.ArgumentParser(description="Prepara el dataset de productos en gondolas")
+    parser.add_argument('--origen', nargs='+', help="Carpetas de fotos crudas (una subcarpeta por clase)")
+    parser.add_argument('--destino', default='datasets')
+    parser.add_argument('--workers', type=int, default=None, help="Procesos (por defecto, uno por nucleo)")
+    parser.add_argument('--lado-maximo', type=int, default=LADO_MAXIMO)
+    parser.add_argument('--lado-minimo', type=int, default=LADO_MINIMO)
+    parser.add_argument('--umbral-duplicado', type=int, default=UMBRAL_DUPLICADO)
+    args = parser.parse_args()
+
     print("="*60)
     print("PREPARACION DE DATASET - PRODUCTOS EN GONDOLAS")
     print("="*60)
     print("Proyecto Integrador - IFTS24")
 
+    if args.origen:
+        print(f"\nConstruyendo dataset en {args.destino}/ ...")
+        construir_dataset(args.origen, args.destino, args.workers, args.lado_maximo,
+                          args.lado_minimo, args.umbral_duplicado)
+        print("\nLuego ejecuta: python train_yolo_model.py")
+        return
+
     # Crear estructura
     crear_estructura_basica()
 
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Reporte Gerencial Memoizado por Analisis
+Proyecto Integrador - IFTS24
+
+Streamlit vuelve a correr toda la pagina con cada cambio de un widget (el
+precio unitario, una pestaña), y el reporte armaba otra vez los DataFrames,
+el groupby del share, el grafico y el CSV. Aca el reporte de un analisis se
+arma una sola vez:
+  - Los agregados por marca (productos y area) se calculan al guardar el
+    analisis, en una pasada y sin pandas.
+  - La tabla de share, el grafico, los estantes (si se pasan las cajas) y
+    las exportaciones (CSV y Excel) se generan la primera vez que se piden
+    y quedan guardados en el objeto.
+La app conserva el reporte en session_state junto con el id del analisis;
+mientras el id no cambie, un rerun solo lee lo ya calculado.
+
+Uso:
+    reporte = ReporteAnalisis(id_analisis, data_marketing, cajas)
+    reporte.share, reporte.figura, reporte.estantes, reporte.csv, reporte.excel
+"""
+
+import io
+from functools import cached_property
+from importlib.util import find_spec
+
+import deteccion
+import estantes_gondola
+
+COLORES_GRAFICO = {
+    "Familia Coca-Cola": "#E60012",
+    "Familia PepsiCo": "#004B93",
+    "Otros / Genérico": "#808080",
+}
+EXCEL_DISPONIBLE = find_spec('openpyxl') is not None  # Motor de pandas para .xlsx (opcional)
+
+
+def agregar_por_marca(data_marketing):
+    """{marca: (productos, area)} en una sola pasada sobre las detecciones."""
+    agregados = {}
+    for fila in data_marketing:
+        productos, area = agregados.get(fila["Marca"], (0, 0))
+        agregados[fila["Marca"]] = (productos + 1, area + fila["Area"])
+    return agregados
+
+
+class ReporteAnalisis:
+    """Reporte de un analisis; cada parte se calcula una vez, la primera vez que se usa."""
+
+    def __init__(self, id_analisis, data_marketing, cajas=None):
+        self.id_analisis = id_analisis
+        self.data_marketing = data_marketing
+        self.cajas = cajas  # (N, 4+) alineadas con data_marketing; None si no hay cajas (video)
+        self.agregados = agregar_por_marca(data_marketing)
+        self.productos = len(data_marketing)
+
+    @cached_property
+    def share(self):
+        """Tabla Marca / Area / Share (%) de deteccion.calcular_share, a partir de los agregados."""
+        return deteccion.calcular_share([{"Marca": marca, "Area": area}
+                                         for marca, (_, area) in self.agregados.items()])
+
+    @cached_property
+    def lider(self):
+        """Fila de la marca con mayor share."""
+        return self.share.iloc[0]
+
+    @cached_property
+    def figura(self):
+        """Grafico de torta del share (fondo transparente para el modo oscuro)."""
+        import plotly.express as px
+
+        fig = px.pie(self.share, values='Area', names='Marca', hole=0.5, color='Marca',
+                     color_discrete_map=COLORES_GRAFICO)
+        fig.update_layout(
+            paper_bgcolor="rgba(0,0,0,0)",
+            plot_bgcolor="rgba(0,0,0,0)",
+            font_color="white",
+            margin=dict(t=30, b=0, l=0, r=0)
+        )
+        return fig
+
+    @cached_property
+    def estantes(self):
+        """EstantesGondola de las cajas del analisis (share por estante, frentes y huecos), o None."""
+        if self.cajas is None:
+            return None
+        return estantes_gondola.EstantesGondola(self.cajas, [fila["Marca"] for fila in self.data_marketing])
+
+    @cached_property
+    def csv(self):
+        """Detecciones del analisis en CSV (bytes UTF-8)."""
+        import pandas as pd
+
+        return pd.DataFrame(self.data_marketing).to_csv(index=False).encode('utf-8')
+
+    @cached_property
+    def excel(self):
+        """Libro .xlsx con las hojas Detecciones, Share y, si hay cajas, Estantes y Huecos (requiere openpyxl)."""
+        import pandas as pd
+
+        buffer = io.BytesIO()
+        with pd.ExcelWriter(buffer, engine='openpyxl') as libro:
+            pd.DataFrame(self.data_marketing).to_excel(libro, sheet_name='Detecciones', index=False)
+            self.share.to_excel(libro, sheet_name='Share', index=False)
+            if self.estantes is not None:
+                pd.DataFrame(self.estantes.share).to_excel(libro, sheet_name='Estantes', index=False)
+                pd.DataFrame(self.estantes.huecos, columns=["Estante", "x1", "x2", "Frentes vacios"]).to_excel(
+                    libro, sheet_name='Huecos', index=False)
+        return buffer.getvalue()
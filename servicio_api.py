@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Servicio REST de Auditoria (FastAPI)
+Proyecto Integrador - IFTS24
+
+Expone el pipeline de app.py como endpoint JSON para las apps de las
+sucursales. Un unico modelo compartido atiende todas las solicitudes: las
+que llegan dentro de una ventana de pocos milisegundos se agrupan en un
+solo lote de YOLO. La cola es acotada; si se llena se responde 503 con
+Retry-After para que el cliente reintente.
+
+Con ?tienda= las detecciones se agregan al almacen de detecciones
+(almacen_detecciones.py), y /share responde el Share of Shelf acumulado por
+tienda y ventana de tiempo.
+
+Uso:
+    python servicio_api.py --port 8000 --lote 8 --espera-ms 10
+    curl -F imagen=@gondola.jpg "http://localhost:8000/auditar?conf=0.3&tienda=Sucursal%20Centro"
+    curl "http://localhost:8000/share?por=tienda&ventana=semana&desde=2026-01-01"
+    curl http://localhost:8000/metricas
+"""
+
+import argparse
+import asyncio
+import io
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+import cv2
+import numpy as np
+from fastapi import FastAPI, File, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+import backends_inferencia
+import deteccion
+
+TAMANIO_LOTE = 8          # Imagenes maximas por llamada al modelo
+ESPERA_LOTE_MS = 10       # Ventana para juntar solicitudes antes de inferir
+MAX_COLA = 64             # Solicitudes esperando modelo antes de responder 503
+VENTANA_METRICAS = 1000   # Solicitudes recientes usadas para percentiles
+VENTANA_THROUGHPUT_S = 60
+
+
+class Metricas:
+    """Contadores y latencias recientes del servicio."""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.solicitudes = 0
+        self.rechazadas = 0
+        self.errores = 0
+        self.lotes = 0
+        self.imagenes_inferidas = 0
+        self.segundos_inferencia = 0.0
+        self.completadas = 0
+        self.recientes = deque(maxlen=VENTANA_METRICAS)  # (fin, latencia, espera en cola)
+
+    def registrar_lote(self, tamanio, duracion):
+        self.lotes += 1
+        self.imagenes_inferidas += tamanio
+        self.segundos_inferencia += duracion
+
+    def registrar_solicitud(self, latencia, espera):
+        self.completadas += 1
+        self.recientes.append((time.perf_counter(), latencia, espera))
+
+    def resumen(self, en_cola):
+        ahora = time.perf_counter()
+        datos = np.array(self.recientes).reshape(-1, 3)
+        recientes = int((datos[:, 0] >= ahora - VENTANA_THROUGHPUT_S).sum())
+        ventana = min(VENTANA_THROUGHPUT_S, ahora - self.inicio)
+
+        def percentil(columna, p):
+            return round(float(np.percentile(datos[:, columna], p)) * 1000, 1) if len(datos) else None
+
+        return {
+            "solicitudes": self.solicitudes,
+            "completadas": self.completadas,
+            "rechazadas": self.rechazadas,
+            "errores": self.errores,
+            "en_cola": en_cola,
+            "lotes": self.lotes,
+            "tamanio_lote_medio": round(self.imagenes_inferidas / self.lotes, 2) if self.lotes else None,
+            "inferencia_lote_media_ms": round(self.segundos_inferencia / self.lotes * 1000, 1) if self.lotes else None,
+            "latencia_p50_ms": percentil(1, 50),
+            "latencia_p95_ms": percentil(1, 95),
+            "latencia_p99_ms": percentil(1, 99),
+            "espera_cola_p95_ms": percentil(2, 95),
+            "imagenes_por_segundo": round(recientes / ventana, 2) if ventana > 0 else None,
+            "segundos_activo": round(ahora - self.inicio, 1),
+        }
+
+
+class LoteadorInferencia:
+    """
+    Junta solicitudes concurrentes y las corre como un solo lote del modelo.
+    El modelo se usa desde un unico hilo; mientras infiere, las solicitudes
+    nuevas se acumulan en la cola y forman el lote siguiente.
+    """
+
+    def __init__(self, model, metricas, tamanio_lote=TAMANIO_LOTE, espera_ms=ESPERA_LOTE_MS, max_cola=MAX_COLA):
+        self.model = model
+        self.metricas = metricas
+        self.tamanio_lote = tamanio_lote
+        self.espera = espera_ms / 1000
+        self.cola = asyncio.Queue(maxsize=max_cola)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='modelo')
+        self._tarea = None
+
+    def iniciar(self):
+        self._tarea = asyncio.create_task(self._bucle())
+
+    async def detener(self):
+        if self._tarea:
+            self._tarea.cancel()
+        self.executor.shutdown(wait=True)
+
+    async def detectar(self, img_bgr, conf):
+        """
+        Encola una imagen y espera sus detecciones: (array (N, 6), segundos en cola).
+        Lanza asyncio.QueueFull si la cola esta llena.
+        """
+        futuro = asyncio.get_running_loop().create_future()
+        self.cola.put_nowait((img_bgr, conf, futuro, time.perf_counter()))
+        return await futuro
+
+    async def _juntar_lote(self):
+        loop = asyncio.get_running_loop()
+        lote = [await self.cola.get()]
+        limite = loop.time() + self.espera
+        while len(lote) < self.tamanio_lote:
+            if not self.cola.empty():
+                lote.append(self.cola.get_nowait())
+                continue
+            restante = limite - loop.time()
+            if restante <= 0:
+                break
+            try:
+                lote.append(await asyncio.wait_for(self.cola.get(), restante))
+            except asyncio.TimeoutError:
+                break
+        return lote
+
+    async def _bucle(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            lote = await self._juntar_lote()
+            # Un lote puede mezclar sensibilidades: se infiere con la menor y se filtra por solicitud
+            conf_lote = min(conf for _, conf, _, _ in lote)
+            inicio = time.perf_counter()
+            try:
+                resultados = await loop.run_in_executor(
+                    self.executor, lambda: deteccion.detectar_botellas(self.model, [s[0] for s in lote], conf=conf_lote))
+            except Exception as e:
+                for _, _, futuro, _ in lote:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+                continue
+            self.metricas.registrar_lote(len(lote), time.perf_counter() - inicio)
+
+            for (_, conf, futuro, encolada), detecciones in zip(lote, resultados):
+                if not futuro.done():  # El cliente pudo haber cortado la conexion
+                    futuro.set_result((detecciones[detecciones[:, 4] >= conf], inicio - encolada))
+
+
+def decodificar(contenido):
+    """Bytes subidos -> (RGB para el color, BGR para YOLO)."""
+    img_rgb = deteccion.cargar_imagen(io.BytesIO(contenido))
+    return img_rgb, cv2.cvtColor(img_rgb, cv2.COLOR_RGB2BGR)
+
+
+def armar_respuesta(img_rgb, detecciones, familias=None, imagen=''):
+    """
+    Familia de cada botella y Share of Shelf, igual que la pestania de reporte
+    de app.py. Devuelve (respuesta JSON, filas para el almacen de detecciones).
+    """
+    data, _, indices = deteccion.analizar_detecciones(img_rgb, detecciones, dibujar=False, familias=familias)
+    filas = deteccion.filas_detecciones(data, detecciones, indices, imagen)
+    productos = [{"marca": f["Marca"], "area": f["Area"], "confianza": f["confianza"],
+                  "caja": [f["x1"], f["y1"], f["x2"], f["y2"]]} for f in filas]
+    share = deteccion.calcular_share(data)
+    respuesta = {
+        "productos": len(productos),
+        "share": [{"marca": m, "area": int(a), "share": float(s)}
+                  for m, a, s in zip(share["Marca"], share["Area"], share["Share (%)"])],
+        "detecciones": productos,
+    }
+    return respuesta, filas
+
+
+def crear_app(model=None, tamanio_lote=TAMANIO_LOTE, espera_ms=ESPERA_LOTE_MS, max_cola=MAX_COLA):
+    """Arma la aplicacion FastAPI. Sin `model`, se carga segun las variables STOCKVISION_*."""
+
+    def almacen():
+        # pyarrow se importa recien con la primera auditoria por tienda o consulta a /share
+        if getattr(app.state, 'almacen', None) is None:
+            from almacen_detecciones import AlmacenDetecciones
+
+            app.state.almacen = AlmacenDetecciones()
+        return app.state.almacen
+
+    @asynccontextmanager
+    async def ciclo_de_vida(app):
+        app.state.metricas = Metricas()
+        app.state.loteador = LoteadorInferencia(model or deteccion.load_generic_model(uso='lote'), app.state.metricas,
+                                                tamanio_lote, espera_ms, max_cola)
+        app.state.familias = deteccion.familias_modelo(app.state.loteador.model)
+        # Al arrancar el servidor, no en la primera solicitud
+        await run_in_threadpool(deteccion.calentar_modelo, app.state.loteador.model)
+        app.state.loteador.iniciar()
+        yield
+        await app.state.loteador.detener()
+
+    app = FastAPI(title="StockVision AI", description="Auditoria de Share of Shelf", lifespan=ciclo_de_vida)
+
+    @app.post("/auditar")
+    async def auditar(imagen: UploadFile = File(...), conf: float = Query(0.25, ge=0.0, le=1.0),
+                      tienda: str = Query(None, description="Guardar las detecciones en el almacen")):
+        inicio = time.perf_counter()
+        metricas = app.state.metricas
+        metricas.solicitudes += 1
+
+        contenido = await imagen.read()
+        try:
+            img_rgb, img_bgr = await run_in_threadpool(decodificar, contenido)
+        except Exception:
+            metricas.errores += 1
+            raise HTTPException(status_code=400, detail="No se pudo decodificar la imagen")
+
+        try:
+            detecciones, espera = await app.state.loteador.detectar(img_bgr, conf)
+        except asyncio.QueueFull:
+            metricas.rechazadas += 1
+            raise HTTPException(status_code=503, detail="Servicio saturado, reintentar",
+                                headers={"Retry-After": "1"})
+        except Exception as e:
+            metricas.errores += 1
+            raise HTTPException(status_code=500, detail=f"Error de inferencia: {e}")
+
+        respuesta, filas = await run_in_threadpool(armar_respuesta, img_rgb, detecciones, app.state.familias,
+                                                   imagen.filename or '')
+        if tienda:
+            respuesta["analisis"] = await run_in_threadpool(almacen().guardar, filas, tienda)
+        latencia = time.perf_counter() - inicio
+        metricas.registrar_solicitud(latencia, espera)
+        respuesta["latencia_ms"] = round(latencia * 1000, 1)
+        return respuesta
+
+    @app.get("/share")
+    async def share(por: list[str] = Query(['tienda']), ventana: str = Query(None), desde: str = Query(None),
+                    hasta: str = Query(None), tiendas: list[str] = Query(None), marcas: list[str] = Query(None),
+                    conf: float = Query(None, ge=0.0, le=1.0)):
+        """Share of Shelf acumulado en el almacen (por=ninguno para el total)."""
+        import almacen_detecciones
+
+        por = [p for p in por if p != 'ninguno']
+        if set(por) - {'tienda', 'imagen', 'analisis'} or (ventana and ventana not in almacen_detecciones.VENTANAS):
+            raise HTTPException(status_code=400, detail="por: tienda, imagen, analisis o ninguno; "
+                                                        "ventana: dia, semana o mes")
+        try:
+            df = await run_in_threadpool(almacen().share, por, ventana, desde=desde, hasta=hasta, tiendas=tiendas,
+                                         marcas=marcas, conf_minima=conf)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="desde/hasta: AAAA-MM-DD")
+        if 'periodo' in df:
+            df['periodo'] = df['periodo'].astype(str)
+        return df.to_dict(orient='records')
+
+    @app.get("/metricas")
+    async def ver_metricas():
+        return app.state.metricas.resumen(app.state.loteador.cola.qsize())
+
+    @app.get("/salud")
+    async def salud():
+        return {"estado": "ok"}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio REST de auditoria de Share of Shelf")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--lote', type=int, help="Imagenes maximas por lote del modelo (por defecto autoajuste "
+                        f"o {TAMANIO_LOTE})")
+    parser.add_argument('--espera-ms', type=float, default=ESPERA_LOTE_MS, help="Ventana para juntar un lote")
+    parser.add_argument('--cola', type=int, default=MAX_COLA, help="Solicitudes en espera antes de responder 503")
+    parser.add_argument('--backend', help="pytorch, onnx u openvino (por defecto STOCKVISION_BACKEND)")
+    parser.add_argument('--modelo', help="Ruta a los pesos (por defecto STOCKVISION_MODELO)")
+    parser.add_argument('--threads', type=int, help="Hilos de inferencia")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    ajuste = backends_inferencia.cargar_ajuste('lote', args.backend, args.modelo)
+    lote = args.lote or ajuste.get('batch') or TAMANIO_LOTE
+    model = deteccion.load_generic_model(args.backend, args.modelo, args.threads, uso='lote')
+    uvicorn.run(crear_app(model, lote, args.espera_ms, args.cola), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Servidor de Modelos Multiproceso
+Proyecto Integrador - IFTS24
+
+Con @st.cache_resource todas las sesiones de Streamlit comparten un unico
+YOLO dentro del proceso de la app, y los usuarios concurrentes hacen fila.
+Aca se levantan N replicas del modelo en procesos separados, cada una fijada
+a una porcion de los nucleos y con esa cantidad de hilos. Las imagenes viajan
+por memoria compartida en lugar de serializarse, y cada llamada la atiende la
+primera replica libre.
+
+ServidorModelos expone detectar() igual que los detectores exportados, asi
+que deteccion.detectar_botellas, la cache, los tiles y el video lo usan sin
+cambios.
+
+Configuracion por variables de entorno (app):
+    STOCKVISION_PROCESOS=replicas del modelo (0 o sin definir: modelo en el proceso de la app)
+"""
+
+import atexit
+import itertools
+import multiprocessing as mp
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing import connection, shared_memory
+
+import numpy as np
+
+import backends_inferencia
+import deteccion
+
+TIEMPO_ARRANQUE_S = 300   # Espera maxima a que las replicas carguen el modelo
+TIEMPO_RESPUESTA_S = 120  # Espera maxima por una llamada a detectar()
+
+
+def nucleos_disponibles():
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def repartir_nucleos(procesos, nucleos=None):
+    """
+    Divide los nucleos en porciones contiguas, una por replica. Nunca hay mas
+    replicas que nucleos: dos runtimes en el mismo nucleo se pisan y rinden menos que uno.
+    """
+    nucleos = nucleos if nucleos is not None else nucleos_disponibles()
+    porciones = np.array_split(np.array(nucleos), min(procesos, len(nucleos)))
+    return [[int(n) for n in p] for p in porciones]
+
+
+def _vistas(buffer, formas):
+    """Arrays uint8 sobre el bloque compartido, uno por imagen, uno detras de otro."""
+    vistas, inicio = [], 0
+    for forma in formas:
+        tamanio = int(np.prod(forma))
+        vistas.append(np.ndarray(forma, dtype=np.uint8, buffer=buffer, offset=inicio))
+        inicio += tamanio
+    return vistas
+
+
+def _replica(indice, nucleos, backend, ruta, uso, precision, conexion):
+    """Proceso replica: carga el modelo en sus nucleos y atiende trabajos hasta recibir None."""
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, nucleos)
+    try:
+        model = deteccion.load_generic_model(backend, ruta, threads=len(nucleos), uso=uso, precision=precision)
+        deteccion.calentar_modelo(model)
+    except Exception as e:
+        conexion.send(('fallo', f"{type(e).__name__}: {e}"))
+        return
+    conexion.send(('listo', (getattr(model, 'ckpt_path', None), getattr(model, 'names', None),
+                             backends_inferencia.imgsz_modelo(model))))
+
+    while True:
+        try:
+            trabajo = conexion.recv()
+        except EOFError:
+            break
+        if trabajo is None:
+            break
+        nombre, formas, conf, kwargs = trabajo
+        try:
+            memoria = shared_memory.SharedMemory(name=nombre)
+            try:
+                # Copia local: ultralytics guarda referencias a la entrada del ultimo lote
+                imagenes = [vista.copy() for vista in _vistas(memoria.buf, formas)]
+            finally:
+                memoria.close()
+            conexion.send(('ok', deteccion.detectar_botellas(model, imagenes, conf=conf, **kwargs)))
+        except Exception as e:
+            conexion.send(('error', f"{type(e).__name__}: {e}"))
+
+
+class ServidorModelos:
+    """
+    Pool de replicas del modelo en procesos separados. Cada replica tiene su
+    propio pipe, asi una replica que muere no bloquea a las demas; el hilo
+    despachador la detecta, falla su trabajo en curso y la vuelve a lanzar.
+    """
+
+    def __init__(self, procesos=2, backend=None, ruta=None, nucleos=None, uso=None, precision=None):
+        self.backend = backend
+        self.ruta = ruta
+        self.precision = precision  # Sin valor, las replicas toman STOCKVISION_PRECISION
+        self.uso = uso  # Seccion del perfil de autoajuste.py de la que las replicas toman el imgsz
+        self.porciones = repartir_nucleos(procesos, nucleos)
+        self.ckpt_path = None  # Lo informa la primera replica (cache_detecciones.hash_modelo)
+        self.names = None      # Clases del modelo, tambien de la primera replica (deteccion.familias_modelo)
+        self.imgsz = None      # imgsz efectivo de las replicas (clave de cache_detecciones, panorama)
+
+        self._ctx = mp.get_context('spawn')  # fork no es seguro con los hilos de torch
+        self._pendientes = {}     # id -> (Future, memoria compartida, mensaje para la replica)
+        self._espera = deque()    # ids sin replica asignada
+        self._libres = list(range(len(self.porciones)))
+        self._en_curso = {}       # replica -> id del trabajo que esta procesando
+        self._cargando = set()    # replicas relanzadas que todavia no informaron 'listo'
+        self._caidas = set()      # replicas que no se relanzan (el modelo ya no carga)
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._cerrado = False
+        self._listas = 0
+        self._fallo = None
+        self._arranque = threading.Event()
+
+        self.replicas, self._conexiones = [], []
+        for indice in range(len(self.porciones)):
+            proceso, conexion = self._lanzar(indice)
+            self.replicas.append(proceso)
+            self._conexiones.append(conexion)
+        self._despachador = threading.Thread(target=self._despachar, name='servidor-modelos', daemon=True)
+        self._despachador.start()
+        atexit.register(self.cerrar)
+
+        if not self._arranque.wait(TIEMPO_ARRANQUE_S) or self._fallo:
+            self.cerrar()
+            raise RuntimeError(f"No arrancaron las replicas del modelo: {self._fallo or 'tiempo agotado'}")
+
+    def _lanzar(self, indice):
+        propia, remota = self._ctx.Pipe()
+        proceso = self._ctx.Process(
+            target=_replica, name=f'replica-{indice}', daemon=True,
+            args=(indice, self.porciones[indice], self.backend, self.ruta, self.uso, self.precision, remota))
+        proceso.start()
+        remota.close()
+        return proceso, propia
+
+    def enviar(self, imagenes, conf=0.25, **kwargs):
+        """Encola una llamada y devuelve un Future con la lista de detecciones por imagen."""
+        if not isinstance(imagenes, (list, tuple)):
+            imagenes = [imagenes]
+        imagenes = [np.ascontiguousarray(backends_inferencia._a_bgr(img), dtype=np.uint8) for img in imagenes]
+        formas = [img.shape for img in imagenes]
+
+        memoria = shared_memory.SharedMemory(create=True, size=max(1, sum(img.nbytes for img in imagenes)))
+        for vista, img in zip(_vistas(memoria.buf, formas), imagenes):
+            vista[...] = img
+
+        futuro = Future()
+        with self._lock:
+            if self._cerrado or len(self._caidas) == len(self.replicas):
+                memoria.close()
+                memoria.unlink()
+                raise RuntimeError("El servidor de modelos esta cerrado" if self._cerrado
+                                   else f"No quedan replicas del modelo: {self._fallo}")
+            id_trabajo = next(self._ids)
+            self._pendientes[id_trabajo] = (futuro, memoria, (memoria.name, formas, conf, kwargs))
+            self._espera.append(id_trabajo)
+            self._asignar()
+        return futuro
+
+    def detectar(self, imagenes, conf=0.25, classes=None, **kwargs):
+        """
+        Misma interfaz que DetectorExportado.detectar. `classes` se ignora:
+        la replica llama a deteccion.detectar_botellas, que ya fija la clase botella.
+        """
+        return self.enviar(imagenes, conf=conf, **kwargs).result(TIEMPO_RESPUESTA_S)
+
+    def _asignar(self):
+        """Manda trabajos en espera a las replicas libres (con self._lock tomado)."""
+        while self._espera and self._libres:
+            id_trabajo = self._espera.popleft()
+            if id_trabajo not in self._pendientes:
+                continue
+            indice = self._libres.pop()
+            self._en_curso[indice] = id_trabajo
+            self._conexiones[indice].send(self._pendientes[id_trabajo][2])
+
+    def _resolver(self, id_trabajo, resultado=None, error=None):
+        with self._lock:
+            futuro, memoria, _ = self._pendientes.pop(id_trabajo, (None, None, None))
+        if futuro is None:
+            return
+        memoria.close()
+        memoria.unlink()
+        if error:
+            futuro.set_exception(RuntimeError(error))
+        else:
+            futuro.set_result(resultado)
+
+    def _despachar(self):
+        """Hilo que reparte las respuestas de las replicas y repone las que mueren."""
+        while not self._cerrado:
+            conexiones = {c: i for i, c in enumerate(self._conexiones) if i not in self._caidas}
+            sentinelas = {p.sentinel: i for i, p in enumerate(self.replicas) if i not in self._caidas}
+            for listo in connection.wait(list(conexiones) + list(sentinelas), timeout=1):
+                if listo in sentinelas:
+                    self._replica_caida(sentinelas[listo])
+                    continue
+                indice = conexiones[listo]
+                try:
+                    tipo, dato = listo.recv()
+                except (EOFError, OSError):
+                    continue  # La replica murio: lo resuelve su sentinela
+                self._procesar_mensaje(indice, tipo, dato)
+
+    def _procesar_mensaje(self, indice, tipo, dato):
+        if tipo in ('ok', 'error'):
+            with self._lock:
+                id_trabajo = self._en_curso.pop(indice, None)
+                self._libres.append(indice)
+                self._asignar()
+            self._resolver(id_trabajo, dato if tipo == 'ok' else None, dato if tipo == 'error' else None)
+        elif tipo == 'listo' and indice in self._cargando:
+            # Una replica relanzada recibe trabajos recien cuando termino de cargar el modelo
+            with self._lock:
+                self._cargando.discard(indice)
+                self._libres.append(indice)
+                self._asignar()
+        elif tipo == 'listo':
+            self.ckpt_path = self.ckpt_path or dato[0]
+            self.names = self.names or dato[1]
+            self.imgsz = self.imgsz or dato[2]
+            self._listas += 1
+            if self._listas >= len(self.replicas):
+                self._arranque.set()
+        elif tipo == 'fallo':
+            # Despues del arranque es una replica relanzada que no cargo: su sentinela la da de baja
+            self._fallo = dato
+            self._arranque.set()
+
+    def _replica_caida(self, indice):
+        proceso = self.replicas[indice]
+        if self._cerrado:
+            return
+        if not self._arranque.is_set():
+            self._fallo = f"la replica {indice} termino al cargar el modelo (codigo {proceso.exitcode})"
+            self._arranque.set()
+            return
+
+        with self._lock:
+            id_trabajo = self._en_curso.pop(indice, None)
+            self._cargando.discard(indice)
+            if indice in self._libres:
+                self._libres.remove(indice)  # Murio sin trabajo: no puede recibir otro hasta recargar
+        if id_trabajo is not None:
+            self._resolver(id_trabajo, error=f"La replica {indice} termino inesperadamente "
+                                             f"(codigo {proceso.exitcode})")
+        if self._fallo:
+            # El modelo ya no carga (fallo una recarga): la replica no se relanza
+            with self._lock:
+                self._caidas.add(indice)
+                esperando = list(self._espera) if len(self._caidas) == len(self.replicas) else []
+                for id_trabajo in esperando:
+                    self._espera.remove(id_trabajo)
+            for id_trabajo in esperando:
+                self._resolver(id_trabajo, error=f"No quedan replicas del modelo: {self._fallo}")
+            return
+        self.replicas[indice], self._conexiones[indice] = self._lanzar(indice)
+        with self._lock:
+            self._cargando.add(indice)  # Pasa a _libres al informar que cargo el modelo
+
+    def cerrar(self):
+        """Detiene las replicas y libera la memoria compartida pendiente."""
+        with self._lock:
+            if self._cerrado:
+                return
+            self._cerrado = True
+            for conexion in self._conexiones:
+                try:
+                    conexion.send(None)
+                except OSError:
+                    pass
+        for proceso in self.replicas:
+            proceso.join(timeout=5)
+            if proceso.is_alive():
+                proceso.terminate()
+        for id_trabajo in list(self._pendientes):
+            self._resolver(id_trabajo, error="El servidor de modelos se cerro")
@@ -2,14 +2,51 @@
 """
 Script de Entrenamiento YOLOv8 para Detección de Productos en Góndolas
 Proyecto Integrador - IFTS24
+
+Corre sin intervención: workers, batch, threads y dispositivo se eligen
+según los núcleos, la memoria y la GPU disponibles, y se pueden fijar con
+un archivo de configuración (YAML o JSON) o por línea de comandos. Registra
+el tiempo por época y las imágenes/segundo en tiempos_epocas.csv.
+
+Uso:
+    python train_yolo_model.py
+    python train_yolo_model.py --epocas 100 --batch 16 --imgsz 640
+    python train_yolo_model.py --config entrenamiento.yaml --validar
+    python train_yolo_model.py --resume                      (último checkpoint del experimento)
+    python train_yolo_model.py --resume runs/train/stock_counter/weights/epoch20.pt
 """
 
+import argparse
+import csv
 import os
+import time
 import yaml
 from ultralytics import YOLO
 import torch
 from pathlib import Path
 
+# Memoria de entrenamiento en CPU de yolov8n a imgsz 640 (medida con benchmarks/bench_cache_entrenamiento.py)
+MEMORIA_BASE_GB = 1.0
+MEMORIA_POR_IMAGEN_GB = 0.27
+# Costo relativo de memoria/cómputo por tamaño de modelo (letra en el nombre: yolov8n, yolov8s, ...)
+ESCALA_MODELO = {'n': 1, 's': 2, 'm': 4, 'l': 6, 'x': 8}
+FRACCION_MEMORIA = 0.7  # Parte de la memoria disponible que puede usar el entrenamiento
+MAX_BATCH_CPU = 32
+# Valores por defecto que no dependen del hardware
+CONFIG_DEFECTO = {
+    'data': 'datasets/data.yaml',
+    'modelo': 'yolov8n.pt',
+    'epocas': 50,
+    'imgsz': 640,
+    'save_period': 10,
+    'paciencia': 100,
+    'proyecto': 'runs/train',
+    'nombre': 'stock_counter',
+    'cache_memmap': True,
+    'exportar': True,
+    'validar': False,
+}
+
 def verificar_gpu():
     """Verifica si hay GPU disponible"""
     print("🔍 Verificando GPU...")
@@ -105,48 +142,175 @@ def descargar_dataset_ejemplo():
 
     print("✅ Archivo de ejemplo creado: datasets/ejemplo_anotaciones.txt")
 
-def entrenar_modelo(config, epochs=50, batch_size=16):
-    """Entrena el modelo YOLOv8"""
+def detectar_recursos():
+    """Núcleos asignados al proceso, memoria disponible y GPU"""
+    nucleos = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    memoria_gb = None
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for linea in f:
+                if linea.startswith('MemAvailable:'):
+                    memoria_gb = int(linea.split()[1]) / 1024**2
+    except OSError:
+        try:
+            memoria_gb = os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') / 1024**3
+        except (ValueError, OSError, AttributeError):
+            pass
+
+    recursos = {'nucleos': nucleos, 'memoria_gb': memoria_gb, 'gpu': None, 'gpu_memoria_gb': None}
+    if torch.cuda.is_available():
+        propiedades = torch.cuda.get_device_properties(0)
+        recursos['gpu'] = propiedades.name
+        recursos['gpu_memoria_gb'] = propiedades.total_memory / 1024**3
+    return recursos
+
+def configuracion_automatica(recursos, imgsz=640, modelo='yolov8n.pt'):
+    """Dispositivo, workers, threads y batch según el hardware"""
+    nucleos = recursos['nucleos']
+    if recursos['gpu']:
+        # En GPU los workers solo decodifican: todos los núcleos para ellos. batch=-1 es AutoBatch (60% de la VRAM)
+        return {'device': '0', 'workers': min(8, nucleos), 'threads': nucleos, 'batch': -1}
+
+    # En CPU los workers compiten con el cómputo del modelo: pocos, y el resto de núcleos para torch
+    workers = 0 if nucleos <= 2 else min(8, max(1, nucleos // 4))
+    threads = max(1, nucleos - workers)
+
+    letra = Path(modelo).stem[-1:]
+    por_imagen = MEMORIA_POR_IMAGEN_GB * ESCALA_MODELO.get(letra, 1) * (imgsz / 640) ** 2
+    disponible = (recursos['memoria_gb'] or 4.0) * FRACCION_MEMORIA - MEMORIA_BASE_GB
+    batch = 1
+    while batch * 2 <= min(MAX_BATCH_CPU, disponible / por_imagen):
+        batch *= 2
+    return {'device': 'cpu', 'workers': workers, 'threads': threads, 'batch': batch}
+
+def cargar_configuracion(ruta):
+    """Lee un archivo de configuración YAML o JSON con las mismas claves que la línea de comandos"""
+    with open(ruta, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f) or {}
+    validas = set(CONFIG_DEFECTO) | {'batch', 'workers', 'threads', 'device', 'resume'}
+    desconocidas = set(config) - validas
+    if desconocidas:
+        raise ValueError(f"Claves desconocidas en {ruta}: {', '.join(sorted(desconocidas))}")
+    return config
+
+def agregar_cronometro(model, threads=None):
+    """Mide cada época (entrenamiento y validación), la imprime y la agrega a tiempos_epocas.csv del experimento"""
+    estado = {}
+    tiempos = []
+
+    def inicio_entrenamiento(trainer):
+        if threads:
+            torch.set_num_threads(threads)  # ultralytics lo pisa al elegir el dispositivo
+
+    def inicio_epoca(trainer):
+        estado['inicio'] = time.perf_counter()
+
+    def fin_epoca(trainer):
+        estado['entrenamiento'] = time.perf_counter() - estado['inicio']
+
+    def fin_epoca_completa(trainer):
+        if 'inicio' not in estado:
+            return  # Validación final fuera de las épocas
+        total = time.perf_counter() - estado.pop('inicio')
+        entrenamiento = estado.pop('entrenamiento', total)
+        imagenes = len(trainer.train_loader.dataset)
+        fila = {
+            'epoca': trainer.epoch + 1,
+            'segundos_entrenamiento': round(entrenamiento, 2),
+            'segundos_validacion': round(total - entrenamiento, 2),
+            'segundos_total': round(total, 2),
+            'imagenes_por_segundo': round(imagenes / entrenamiento, 2),
+        }
+        tiempos.append(fila)
+        print(f"⏱️ Época {fila['epoca']}/{trainer.epochs}: {entrenamiento:.1f}s entrenamiento + "
+              f"{fila['segundos_validacion']:.1f}s validación ({fila['imagenes_por_segundo']} img/s)")
+
+        ruta_csv = Path(trainer.save_dir) / 'tiempos_epocas.csv'
+        nuevo = not ruta_csv.exists()
+        with open(ruta_csv, 'a', newline='', encoding='utf-8') as f:
+            escritor = csv.DictWriter(f, fieldnames=list(fila))
+            if nuevo:
+                escritor.writeheader()
+            escritor.writerow(fila)
+
+    model.add_callback('on_train_start', inicio_entrenamiento)
+    model.add_callback('on_train_epoch_start', inicio_epoca)
+    model.add_callback('on_train_epoch_end', fin_epoca)
+    model.add_callback('on_fit_epoch_end', fin_epoca_completa)
+    return tiempos
+
+def entrenar_modelo(config, epochs=50, batch_size=16, cache_memmap=True, imgsz=640, workers=4, device='cpu',
+                    threads=None, modelo_base='yolov8n.pt', data='datasets/data.yaml', save_period=10,
+                    paciencia=100, proyecto='runs/train', nombre='stock_counter', resume=None):
+    """Entrena el modelo YOLOv8 (con cache_memmap lee las imagenes pre-decodificadas de cache_entrenamiento.py).
+    resume: ruta a un checkpoint (last.pt o epochN.pt) para continuar un entrenamiento cortado."""
 
     print("🚀 Iniciando entrenamiento...")
-    print(f"📊 Épocas: {epochs}")
-    print(f"📦 Batch size: {batch_size}")
+    print(f"📊 Épocas: {epochs or 'del checkpoint'}")
+    print(f"📦 Batch size: {'auto' if batch_size == -1 else batch_size or 'del checkpoint'}")
     print(f"🎯 Número de clases: {config['nc']}")
 
-    # Cargar modelo base
+    # Cargar modelo base (o el checkpoint a continuar)
+    pesos = resume or modelo_base
     try:
-        model = YOLO('yolov8n.pt')  # Modelo nano como base
-        print("✅ Modelo base cargado: yolov8n.pt")
+        model = YOLO(pesos)
+        print(f"✅ {'Checkpoint' if resume else 'Modelo base'} cargado: {pesos}")
     except Exception as e:
-        print(f"❌ Error cargando modelo base: {e}")
+        print(f"❌ Error cargando {pesos}: {e}")
         return None
 
+    # Imagenes pre-decodificadas en un archivo mapeado (se arma en la primera corrida)
+    trainer = None
+    if cache_memmap:
+        from cache_entrenamiento import EntrenadorMemmap
+        trainer = EntrenadorMemmap
+        print("💾 Cache de imágenes: memoria mapeada (datasets/.cache_entrenamiento/)")
+
+    tiempos = agregar_cronometro(model, threads)
+
     # Configurar entrenamiento
     try:
-        results = model.train(
-            data='datasets/data.yaml',
-            epochs=epochs,
+        parametros = dict(
             batch=batch_size,
-            imgsz=640,  # Tamaño de imagen
-            save=True,
-            save_period=10,  # Guardar cada 10 épocas
-            cache=False,  # Cache de imágenes
-            device='cpu',  # Usar CPU
-            workers=4,  # Número de workers para data loading
-            project='runs/train',  # Directorio de resultados
-            name='stock_counter',  # Nombre del experimento
-            exist_ok=True,  # Sobrescribir si existe
-            pretrained=True,  # Usar pesos pre-entrenados
-            optimizer='auto',  # Optimizador automático
-            verbose=True,  # Output detallado
-            seed=42,  # Para reproducibilidad
+            imgsz=imgsz,  # Tamaño de imagen
+            save_period=save_period,  # Guardar checkpoint cada N épocas (para --resume)
+            cache=False,  # Cache de ultralytics (la reemplaza cache_memmap)
+            device=device,
+            workers=workers,  # Número de workers para data loading
+            patience=paciencia,  # Épocas sin mejora antes de cortar
         )
-
+        if resume:
+            # Al continuar, ultralytics recupera el resto de la configuración del checkpoint
+            parametros = {clave: valor for clave, valor in parametros.items() if valor is not None}
+            results = model.train(trainer=trainer, resume=resume, **parametros)
+        else:
+            results = model.train(
+                trainer=trainer,
+                data=data,
+                epochs=epochs,
+                save=True,
+                project=os.path.abspath(proyecto),  # Directorio de resultados (absoluto: ultralytics no lo anida)
+                name=nombre,  # Nombre del experimento
+                exist_ok=True,  # Sobrescribir si existe
+                pretrained=True,  # Usar pesos pre-entrenados
+                optimizer='auto',  # Optimizador automático
+                verbose=True,  # Output detallado
+                seed=42,  # Para reproducibilidad
+                **parametros,
+            )
+
+        directorio = str(model.trainer.save_dir)
         print("✅ Entrenamiento completado!")
-        print(f"📁 Resultados guardados en: runs/train/stock_counter/")
+        print(f"📁 Resultados guardados en: {directorio}/")
+
+        if tiempos:
+            por_epoca = sum(t['segundos_total'] for t in tiempos) / len(tiempos)
+            img_s = sum(t['imagenes_por_segundo'] for t in tiempos) / len(tiempos)
+            print(f"⏱️ Promedio: {por_epoca:.1f}s por época, {img_s:.1f} img/s "
+                  f"(detalle en {directorio}/tiempos_epocas.csv)")
 
         # Cargar mejor modelo entrenado
-        best_model_path = 'runs/train/stock_counter/weights/best.pt'
+        best_model_path = os.path.join(directorio, 'weights', 'best.pt')
         if os.path.exists(best_model_path):
             print(f"🏆 Mejor modelo guardado en: {best_model_path}")
             print("💡 Copia este archivo a la carpeta raíz como 'best.pt' para usarlo en la app")
@@ -157,14 +321,54 @@ def entrenar_modelo(config, epochs=50, batch_size=16):
         print(f"❌ Error durante el entrenamiento: {e}")
         return None
 
-def validar_modelo():
-    """Valida el modelo entrenado"""
+def exportar_modelo(ruta_pesos='runs/train/stock_counter/weights/best.pt', imgsz=640, int8=True, openvino=False):
+    """Exporta el modelo a ONNX (y opcionalmente INT8 / OpenVINO) para inferencia en CPU"""
+    print(f"📦 Exportando {ruta_pesos} para inferencia en CPU...")
+    artefactos = {}
+
+    try:
+        model = YOLO(ruta_pesos)
+        # Sin imgsz (al continuar con --resume sale del checkpoint): el de entrenamiento de los pesos
+        imgsz = imgsz or model.overrides.get('imgsz') or 640
+        # Lote dinámico: la auditoría batch manda varias imágenes por llamada
+        ruta_onnx = model.export(format='onnx', imgsz=imgsz, dynamic=True, simplify=True)
+        artefactos['onnx'] = ruta_onnx
+        print(f"✅ ONNX FP32: {ruta_onnx}")
+    except Exception as e:
+        print(f"❌ Error exportando a ONNX: {e}")
+        return None
+
+    if int8:
+        try:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            ruta_int8 = str(Path(ruta_onnx).with_name(Path(ruta_onnx).stem + '_int8.onnx'))
+            quantize_dynamic(ruta_onnx, ruta_int8, weight_type=QuantType.QUInt8)
+            artefactos['onnx_int8'] = ruta_int8
+            print(f"✅ ONNX INT8: {ruta_int8}")
+        except Exception as e:
+            print(f"⚠️ No se pudo cuantizar a INT8: {e}")
+
+    if openvino:
+        try:
+            ruta_openvino = model.export(format='openvino', imgsz=imgsz)
+            artefactos['openvino'] = ruta_openvino
+            print(f"✅ OpenVINO: {ruta_openvino}")
+        except Exception as e:
+            print(f"⚠️ No se pudo exportar a OpenVINO: {e}")
+
+    print("💡 Para usarlo en la app: STOCKVISION_BACKEND=onnx STOCKVISION_MODELO=<ruta .onnx> streamlit run app.py")
+    return artefactos
+
+def validar_modelo(ruta_pesos='runs/train/stock_counter/weights/best.pt', data=None, imgsz=None, **kwargs):
+    """Valida el modelo entrenado (o una variante .onnx exportada, pasando data e imgsz)"""
     try:
-        model = YOLO('runs/train/stock_counter/weights/best.pt')
+        model = YOLO(ruta_pesos, task='detect')
         print("✅ Modelo cargado para validación")
 
         # Ejecutar validación
-        results = model.val()
+        opciones = {k: v for k, v in dict(kwargs, data=data, imgsz=imgsz).items() if v is not None}
+        results = model.val(**opciones)
         print("✅ Validación completada")
         return results
 
@@ -173,61 +377,148 @@ def validar_modelo():
         return None
 
 def main():
+    parser = argparse.ArgumentParser(description="Entrenamiento YOLOv8 de productos en góndolas")
+    parser.add_argument('--config', help="Archivo YAML/JSON de configuración (la línea de comandos manda)")
+    parser.add_argument('--data', help=f"data.yaml del dataset (por defecto {CONFIG_DEFECTO['data']})")
+    parser.add_argument('--modelo', help=f"Pesos o arquitectura base (por defecto {CONFIG_DEFECTO['modelo']})")
+    parser.add_argument('--epocas', type=int)
+    parser.add_argument('--batch', type=int, help="Imágenes por lote (-1: AutoBatch en GPU; por defecto según RAM)")
+    parser.add_argument('--imgsz', type=int)
+    parser.add_argument('--workers', type=int, help="Workers del DataLoader (por defecto según núcleos)")
+    parser.add_argument('--threads', type=int, help="Threads de torch en CPU (por defecto según núcleos)")
+    parser.add_argument('--device', help="cpu, 0, 0,1... (por defecto la GPU si hay)")
+    parser.add_argument('--save-period', type=int, dest='save_period', help="Guardar checkpoint cada N épocas")
+    parser.add_argument('--paciencia', type=int, help="Épocas sin mejora antes de cortar")
+    parser.add_argument('--proyecto')
+    parser.add_argument('--nombre')
+    parser.add_argument('--resume', nargs='?', const='ultimo',
+                        help="Continuar desde el último checkpoint del experimento o desde el indicado")
+    parser.add_argument('--sin-cache-memmap', dest='cache_memmap', action='store_false', default=None)
+    parser.add_argument('--sin-exportar', dest='exportar', action='store_false', default=None)
+    parser.add_argument('--validar', action='store_true', default=None, help="Validar best.pt al terminar")
+    args = parser.parse_args()
+
     print("="*60)
     print("🤖 ENTRENAMIENTO YOLOv8 - DETECCIÓN DE PRODUCTOS EN GÓNDOLAS")
     print("="*60)
     print("📚 Proyecto Integrador - IFTS24")
 
+    # Prioridad: línea de comandos > archivo de configuración > hardware > valores por defecto
+    config_entrenamiento = dict(CONFIG_DEFECTO)
+    origen = {clave: 'defecto' for clave in config_entrenamiento}
+    try:
+        archivo = cargar_configuracion(args.config) if args.config else {}
+    except (OSError, ValueError, yaml.YAMLError) as e:
+        print(f"❌ Error en la configuración: {e}")
+        raise SystemExit(1)
+    capas = [(archivo, 'config'), ({k: v for k, v in vars(args).items() if v is not None and k != 'config'}, 'cli')]
+    for valores, nombre_capa in capas:
+        config_entrenamiento.update(valores)
+        origen.update({clave: nombre_capa for clave in valores})
+
     # Verificar GPU
     gpu_disponible = verificar_gpu()
+    recursos = detectar_recursos()
+    if str(config_entrenamiento.get('device', '')).lower() == 'cpu':
+        recursos['gpu'] = None
+    memoria = f"{recursos['memoria_gb']:.1f} GB disponibles" if recursos['memoria_gb'] else "memoria desconocida"
+    print(f"💻 Hardware: {recursos['nucleos']} núcleos, {memoria}"
+          + (f", GPU {recursos['gpu']} ({recursos['gpu_memoria_gb']:.1f} GB)" if recursos['gpu'] else ""))
+    automatica = configuracion_automatica(recursos, config_entrenamiento['imgsz'], config_entrenamiento['modelo'])
+    for clave, valor in automatica.items():
+        if clave not in config_entrenamiento:
+            config_entrenamiento[clave] = valor
+            origen[clave] = 'auto'
+
+    resume = config_entrenamiento.get('resume')
+    directorio = os.path.join(os.path.abspath(config_entrenamiento['proyecto']), config_entrenamiento['nombre'])
+    if resume == 'ultimo':
+        resume = os.path.join(directorio, 'weights', 'last.pt')
+    if resume and not os.path.exists(resume):
+        print(f"❌ No existe el checkpoint {resume}")
+        disponibles = sorted(Path(directorio, 'weights').glob('*.pt'))
+        if disponibles:
+            print("  Checkpoints disponibles: " + ", ".join(str(p) for p in disponibles))
+        raise SystemExit(1)
+    if resume:
+        # Al continuar vale lo guardado en el checkpoint, salvo lo pedido explícitamente
+        for clave in ('modelo', 'epocas', 'imgsz', 'batch', 'save_period', 'paciencia'):
+            if origen[clave] not in ('config', 'cli'):
+                config_entrenamiento[clave], origen[clave] = None, 'checkpoint'
+        # ultralytics solo garantiza imgsz, batch y device al continuar; segun la version, el resto
+        # vuelve a los valores guardados en el checkpoint sin avisar
+        pedidas = [clave for clave in ('workers', 'save_period', 'paciencia') if origen[clave] in ('config', 'cli')]
+        if pedidas:
+            print(f"⚠️ Con --resume, {', '.join(pedidas)} puede{'n' if len(pedidas) > 1 else ''} quedar con el "
+                  f"valor del checkpoint (según la versión, ultralytics los ignora). Para cambiarlos con "
+                  f"seguridad, empezar un entrenamiento nuevo")
 
     # Crear configuración del dataset
     print("\n📋 Creando configuración del dataset...")
-    config = crear_config_dataset()
+    if config_entrenamiento['data'] == CONFIG_DEFECTO['data']:
+        config = crear_config_dataset()
 
-    # Crear estructura de directorios
-    print("\n🏗️ Creando estructura del dataset...")
-    crear_estructura_dataset()
+        # Crear estructura de directorios
+        print("\n🏗️ Creando estructura del dataset...")
+        crear_estructura_dataset()
 
-    # Descargar dataset de ejemplo
-    print("\n📥 Preparando dataset de ejemplo...")
-    descargar_dataset_ejemplo()
+        # Descargar dataset de ejemplo
+        print("\n📥 Preparando dataset de ejemplo...")
+        descargar_dataset_ejemplo()
+    else:
+        with open(config_entrenamiento['data'], 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f)
+        config.setdefault('nc', len(config['names']))
+        print(f"✅ Usando {config_entrenamiento['data']}")
 
-    # Preguntar si quiere entrenar
+    nombres = config['names'].values() if isinstance(config['names'], dict) else config['names']
     print("\n" + "="*60)
-    print("❓ CONFIGURACIÓN DE ENTRENAMIENTO")
+    print("🚀 CONFIGURACIÓN FINAL")
     print("="*60)
-
+    print(f"  🎯 Clases: {config['nc']} ({', '.join(nombres)})")
+    print(f"  💻 GPU: {'Sí' if gpu_disponible else 'No'}")
+    for clave in ('modelo', 'data', 'epocas', 'batch', 'imgsz', 'device', 'workers', 'threads', 'save_period',
+                  'paciencia', 'cache_memmap'):
+        print(f"  {clave:<13} {config_entrenamiento[clave]!s:<22} ({origen[clave]})")
+    if resume:
+        print(f"  {'resume':<13} {resume}")
+
+    results = None
     try:
-        epochs = 50  # Default
-        batch_size = 8  # Default
-
-        print("\n🚀 CONFIGURACIÓN FINAL:")
-        print(f"  📊 Épocas: {epochs}")
-        print(f"  📦 Batch size: {batch_size}")
-        print(f"  🎯 Clases: {config['nc']} ({', '.join(config['names'].values())})")
-        print(f"  💻 GPU: {'Sí' if gpu_disponible else 'No'}")
-
-        confirmar = 's'  # Auto confirm
-
-        if confirmar in ['s', 'si', 'yes', 'y']:
-            # Entrenar modelo
-            results = entrenar_modelo(config, epochs, batch_size)
+        results = entrenar_modelo(
+            config,
+            epochs=config_entrenamiento['epocas'],
+            batch_size=config_entrenamiento['batch'],
+            cache_memmap=config_entrenamiento['cache_memmap'],
+            imgsz=config_entrenamiento['imgsz'],
+            workers=config_entrenamiento['workers'],
+            device=config_entrenamiento['device'],
+            threads=config_entrenamiento['threads'],
+            modelo_base=config_entrenamiento['modelo'],
+            data=config_entrenamiento['data'],
+            save_period=config_entrenamiento['save_period'],
+            paciencia=config_entrenamiento['paciencia'],
+            proyecto=config_entrenamiento['proyecto'],
+            nombre=config_entrenamiento['nombre'],
+            resume=resume,
+        )
 
-            if results:
-                print("\n🎉 ¡Entrenamiento exitoso!")
-                print("📁 Revisa la carpeta 'runs/train/stock_counter/' para ver los resultados")
+        if results:
+            directorio = str(getattr(results, 'save_dir', directorio))  # Al continuar puede ser otro experimento
+            print("\n🎉 ¡Entrenamiento exitoso!")
+            print(f"📁 Revisa la carpeta '{directorio}/' para ver los resultados")
+            mejor = os.path.join(directorio, 'weights', 'best.pt')
 
-                # Ofrecer validación
-                validar = input("❓ ¿Quieres validar el modelo entrenado? (s/n): ").lower().strip()
-                if validar in ['s', 'si', 'yes', 'y']:
-                    validar_modelo()
+            # Exportar para inferencia en CPU (ONNX FP32 + INT8)
+            if config_entrenamiento['exportar']:
+                exportar_modelo(mejor, imgsz=config_entrenamiento['imgsz'])
 
-        else:
-            print("❌ Entrenamiento cancelado")
+            if config_entrenamiento['validar']:
+                validar_modelo(mejor)
 
     except KeyboardInterrupt:
         print("\n👋 Entrenamiento cancelado por el usuario")
+        print("💡 Para continuar: python train_yolo_model.py --resume")
     except Exception as e:
         print(f"❌ Error: {e}")
 
@@ -241,5 +532,8 @@ def main():
     print("⏰ 1-2 horas de entrenamiento típico")
     print("="*60)
 
+    if not results:
+        raise SystemExit(1)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
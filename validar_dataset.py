@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Validador e Indice de Etiquetas YOLO
+Proyecto Integrador - IFTS24
+
+Recorre datasets/images/* y datasets/labels/* leyendo las etiquetas en
+paralelo y las junta en un indice columnar de NumPy (imagen, clase, caja).
+Sobre ese indice verifica lo que pide INSTRUCCIONES_DATASET.md (cada imagen
+con su .txt, coordenadas entre 0 y 1, clase_id validos, sin cajas vacias) e
+informa estadisticas por clase y por tamanio de caja. El indice se guarda en
+datasets/.indice_dataset.npz: al revalidar solo se vuelven a leer las
+etiquetas nuevas o modificadas.
+
+Uso:
+    python validar_dataset.py
+    python validar_dataset.py --dataset datasets --salida validacion.json
+    python validar_dataset.py --verificar-imagenes   (abre el encabezado de cada imagen)
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from prepare_dataset import CLASES, EXTENSIONES_IMAGEN
+
+ARCHIVO_INDICE = '.indice_dataset.npz'
+VERSION_INDICE = 1
+ARCHIVOS_POR_TAREA = 256  # Etiquetas que lee cada tarea del pool
+MAX_ERRORES_MOSTRADOS = 20
+# Tamanio de caja segun el area relativa a la imagen
+RANGOS_TAMANIO = {"chica (<1%)": 0.01, "mediana (1-10%)": 0.10, "grande (>10%)": 1.01}
+
+
+class IndiceEtiquetas:
+    """
+    Todas las etiquetas del dataset en columnas:
+    claves[i] = 'split/nombre', firmas[i] = (mtime_ns, bytes) del .txt (-1 sin etiqueta),
+    y una fila por caja en fila_imagen / clase / cajas (xc, yc, w, h normalizados).
+    """
+
+    def __init__(self, claves, firmas, fila_imagen, clase, cajas, errores_lectura):
+        self.claves = claves
+        self.firmas = firmas
+        self.fila_imagen = fila_imagen
+        self.clase = clase
+        self.cajas = cajas
+        self.errores_lectura = errores_lectura  # [(clave, mensaje)] de lineas mal formadas
+
+    def guardar(self, ruta):
+        temporal = Path(f"{ruta}.tmp.npz")
+        np.savez(temporal, version=VERSION_INDICE, claves=np.array(self.claves, dtype=str),
+                 firmas=self.firmas, fila_imagen=self.fila_imagen, clase=self.clase, cajas=self.cajas,
+                 errores_claves=np.array([c for c, _ in self.errores_lectura], dtype=str),
+                 errores_texto=np.array([m for _, m in self.errores_lectura], dtype=str))
+        os.replace(temporal, ruta)
+
+    @classmethod
+    def cargar(cls, ruta):
+        """Indice guardado, o None si no existe o es de otra version."""
+        try:
+            with np.load(ruta) as datos:
+                if int(datos["version"]) != VERSION_INDICE:
+                    return None
+                return cls(datos["claves"].tolist(), datos["firmas"], datos["fila_imagen"], datos["clase"],
+                           datos["cajas"], list(zip(datos["errores_claves"].tolist(),
+                                                    datos["errores_texto"].tolist())))
+        except (OSError, KeyError, ValueError):
+            return None
+
+
+def escanear(raiz):
+    """
+    Lista imagenes y etiquetas de cada split con os.scandir.
+    Devuelve {clave: (ruta_imagen o None, ruta_etiqueta o None, firma)}.
+    """
+    raiz = Path(raiz)
+    entradas = {}
+    splits = sorted({p.name for base in ('images', 'labels') if (raiz / base).is_dir()
+                     for p in (raiz / base).iterdir() if p.is_dir()})
+    for split in splits:
+        carpeta_img = raiz / 'images' / split
+        if carpeta_img.is_dir():
+            with os.scandir(carpeta_img) as it:
+                for e in it:
+                    nombre, _, extension = e.name.rpartition('.')
+                    if f".{extension.lower()}" in EXTENSIONES_IMAGEN:
+                        entradas[f"{split}/{nombre}"] = (e.path, None, (-1, -1))
+        carpeta_lbl = raiz / 'labels' / split
+        if carpeta_lbl.is_dir():
+            with os.scandir(carpeta_lbl) as it:
+                for e in it:
+                    nombre, _, extension = e.name.rpartition('.')
+                    if extension == 'txt':
+                        stat = e.stat()
+                        clave = f"{split}/{nombre}"
+                        imagen = entradas.get(clave, (None,))[0]
+                        entradas[clave] = (imagen, e.path, (stat.st_mtime_ns, stat.st_size))
+    return entradas
+
+
+def leer_etiquetas(tareas):
+    """
+    Corre en un hilo del pool: parsea un grupo de archivos .txt.
+    tareas = [(fila, ruta)]. Devuelve (filas, datos (M, 5), errores).
+    """
+    filas, bloques, errores = [], [], []
+    for fila, ruta in tareas:
+        try:
+            with open(ruta, 'rb') as f:
+                contenido = f.read()
+            valores = np.array(contenido.split(), dtype=np.float32)
+        except OSError as e:
+            errores.append((fila, f"no se pudo leer: {e}"))
+            continue
+        except ValueError:
+            valores = None
+
+        # Un total multiplo de 5 no alcanza (4 + 6 campos corre las columnas): 5 campos en cada linea
+        if valores is None or {len(linea.split()) for linea in contenido.splitlines()} - {0, 5}:
+            # Camino lento solo para los archivos mal formados: linea por linea
+            validas = []
+            for numero, linea in enumerate(contenido.decode('utf-8', 'replace').splitlines(), 1):
+                campos = linea.split()
+                if not campos:
+                    continue
+                try:
+                    if len(campos) != 5:
+                        raise ValueError
+                    validas.append([float(c) for c in campos])
+                except ValueError:
+                    errores.append((fila, f"linea {numero} mal formada: '{linea.strip()[:40]}'"))
+            valores = np.array(validas, dtype=np.float32)
+
+        valores = valores.reshape(-1, 5)
+        filas.append(np.full(len(valores), fila, dtype=np.int32))
+        bloques.append(valores)
+
+    if not bloques:
+        return np.empty(0, dtype=np.int32), np.empty((0, 5), dtype=np.float32), errores
+    return np.concatenate(filas), np.concatenate(bloques), errores
+
+
+def construir_indice(entradas, anterior=None, workers=None):
+    """
+    Indice de todas las etiquetas. Reutiliza del indice anterior las filas de
+    los .txt con la misma firma y lee en paralelo solo el resto.
+    Devuelve (indice, etiquetas_leidas).
+    """
+    claves = sorted(entradas)
+    firmas = np.array([entradas[c][2] for c in claves], dtype=np.int64).reshape(-1, 2)
+
+    reutilizada = np.zeros(len(claves), dtype=bool)
+    fila_imagen, clase, cajas, errores = [], [], [], []
+    if anterior is not None:
+        posicion = {c: i for i, c in enumerate(anterior.claves)}
+        viejas = np.array([posicion.get(c, -1) for c in claves], dtype=np.int64)
+        existe = viejas >= 0
+        reutilizada[existe] = (firmas[existe, 0] >= 0) & (anterior.firmas[viejas[existe]] == firmas[existe]).all(axis=1)
+
+        # Filas del indice anterior -> filas nuevas (-1: la etiqueta cambio o ya no esta)
+        remapeo = np.full(len(anterior.claves), -1, dtype=np.int32)
+        remapeo[viejas[reutilizada]] = np.flatnonzero(reutilizada)
+        nuevas = remapeo[anterior.fila_imagen]
+        conservar = nuevas >= 0
+        fila_imagen.append(nuevas[conservar])
+        clase.append(anterior.clase[conservar])
+        cajas.append(anterior.cajas[conservar])
+        errores.extend((c, m) for c, m in anterior.errores_lectura if remapeo[posicion[c]] >= 0)
+
+    pendientes = [(i, entradas[c][1]) for i, c in enumerate(claves) if entradas[c][1] and not reutilizada[i]]
+    grupos = [pendientes[i:i + ARCHIVOS_POR_TAREA] for i in range(0, len(pendientes), ARCHIVOS_POR_TAREA)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for filas, datos, errores_grupo in pool.map(leer_etiquetas, grupos):
+            fila_imagen.append(filas)
+            clase.append(datos[:, 0])
+            cajas.append(datos[:, 1:])
+            errores.extend((claves[f], m) for f, m in errores_grupo)
+
+    indice = IndiceEtiquetas(
+        claves, firmas,
+        np.concatenate(fila_imagen) if fila_imagen else np.empty(0, dtype=np.int32),
+        np.concatenate(clase) if clase else np.empty(0, dtype=np.float32),
+        np.concatenate(cajas) if cajas else np.empty((0, 4), dtype=np.float32),
+        errores)
+    return indice, len(pendientes)
+
+
+def verificar_imagenes(entradas, workers=None):
+    """Abre solo el encabezado de cada imagen (PIL es perezoso) para detectar archivos rotos."""
+    from PIL import Image
+
+    def abrir(clave):
+        try:
+            with Image.open(entradas[clave][0]) as img:
+                img.size
+            return None
+        except Exception as e:
+            return clave, f"imagen ilegible: {e}"
+
+    con_imagen = [c for c, e in entradas.items() if e[0]]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return [r for r in pool.map(abrir, con_imagen, chunksize=64) if r]
+
+
+def validar_indice(indice, entradas, nc):
+    """Reglas de INSTRUCCIONES_DATASET.md evaluadas sobre todo el indice a la vez."""
+    errores = {
+        "imagen sin etiqueta": [c for c in indice.claves if entradas[c][1] is None],
+        "etiqueta sin imagen": [c for c in indice.claves if entradas[c][0] is None],
+        "linea mal formada": [f"{c}: {m}" for c, m in indice.errores_lectura],
+    }
+
+    def filas_con_error(mascara, mensaje):
+        for f in np.flatnonzero(mascara):
+            yield f"{indice.claves[indice.fila_imagen[f]]}: {mensaje(f)}"
+
+    clase, cajas = indice.clase, indice.cajas
+    # "nan"/"inf" se leen como float validos y toda comparacion con NaN da False:
+    # esas filas van a su propia categoria y quedan fuera del resto de las reglas
+    no_finita = ~np.isfinite(cajas).all(axis=1) | ~np.isfinite(clase)
+    clase_invalida = ~no_finita & ((clase < 0) | (clase >= nc) | (clase != np.round(clase)))
+    fuera_de_rango = ~no_finita & ((cajas < 0) | (cajas > 1)).any(axis=1)
+    vacia = ~no_finita & ((cajas[:, 2] <= 0) | (cajas[:, 3] <= 0))
+    # Centro dentro de la imagen pero la caja se sale de los bordes
+    excede_bordes = ~no_finita & ~fuera_de_rango & (
+        (cajas[:, 0] - cajas[:, 2] / 2 < -1e-3) | (cajas[:, 0] + cajas[:, 2] / 2 > 1 + 1e-3) |
+        (cajas[:, 1] - cajas[:, 3] / 2 < -1e-3) | (cajas[:, 1] + cajas[:, 3] / 2 > 1 + 1e-3))
+
+    errores["valores no finitos"] = list(filas_con_error(
+        no_finita, lambda f: f"clase {clase[f]:g} {cajas[f].round(3)}"))
+    errores["clase_id invalido"] = list(filas_con_error(clase_invalida, lambda f: f"clase {clase[f]:g}"))
+    errores["coordenadas fuera de 0-1"] = list(filas_con_error(fuera_de_rango, lambda f: f"{cajas[f].round(3)}"))
+    errores["caja vacia"] = list(filas_con_error(vacia & ~fuera_de_rango, lambda f: f"{cajas[f].round(3)}"))
+    errores["caja excede los bordes"] = list(filas_con_error(excede_bordes, lambda f: f"{cajas[f].round(3)}"))
+
+    # Lineas repetidas dentro de la misma etiqueta
+    finitas = np.flatnonzero(~no_finita)
+    if len(finitas):
+        filas = np.column_stack([indice.fila_imagen[finitas], clase[finitas], cajas[finitas]])
+        _, primeras, repeticiones = np.unique(filas, axis=0, return_index=True, return_counts=True)
+        errores["caja duplicada"] = [f"{indice.claves[indice.fila_imagen[f]]}: {cajas[f].round(3)}"
+                                     for f in finitas[primeras[repeticiones > 1]]]
+    return errores
+
+
+def estadisticas(indice, entradas, nombres):
+    """Conteos por split y por clase, cajas por imagen y tamanio de caja."""
+    validas = ((indice.clase >= 0) & (indice.clase < len(nombres)) & (indice.clase == np.round(indice.clase))
+               & np.isfinite(indice.cajas).all(axis=1))
+    clase = indice.clase[validas].astype(np.int16)
+    fila = indice.fila_imagen[validas]
+    area = indice.cajas[validas, 2] * indice.cajas[validas, 3]
+
+    splits = np.array([c.partition('/')[0] for c in indice.claves])
+    con_imagen = np.array([entradas[c][0] is not None for c in indice.claves], dtype=bool)
+    cajas_por_imagen = np.bincount(indice.fila_imagen, minlength=len(indice.claves))
+    por_split = {}
+    for split in np.unique(splits).tolist():
+        mascara = splits == split
+        por_split[split] = {"imagenes": int(con_imagen[mascara].sum()), "cajas": int(cajas_por_imagen[mascara].sum()),
+                            "imagenes_sin_cajas": int(((cajas_por_imagen == 0) & con_imagen & mascara).sum())}
+
+    # Imagenes distintas por clase: pares (clase, imagen) unicos
+    pares = np.unique(clase.astype(np.int64) * max(1, len(indice.claves)) + fila)
+    imagenes_por_clase = np.bincount(pares // max(1, len(indice.claves)), minlength=len(nombres))
+    por_clase = {}
+    limites = list(RANGOS_TAMANIO.values())
+    rango = np.searchsorted(limites, area, side='right')
+    for i, nombre in enumerate(nombres):
+        mascara = clase == i
+        por_clase[nombre] = {
+            "cajas": int(mascara.sum()),
+            "imagenes": int(imagenes_por_clase[i]),
+            "area_mediana_%": round(float(np.median(area[mascara]) * 100), 2) if mascara.any() else None,
+            **{etiqueta: int((rango[mascara] == j).sum()) for j, etiqueta in enumerate(RANGOS_TAMANIO)},
+        }
+
+    return {
+        "imagenes": int(sum(e[0] is not None for e in entradas.values())),
+        "etiquetas": int(sum(e[1] is not None for e in entradas.values())),
+        "cajas": int(len(indice.clase)),
+        "cajas_por_imagen_media": round(float(cajas_por_imagen.mean()), 2) if len(cajas_por_imagen) else 0.0,
+        "cajas_por_imagen_max": int(cajas_por_imagen.max()) if len(cajas_por_imagen) else 0,
+        "por_split": por_split,
+        "por_clase": por_clase,
+    }
+
+
+def nombres_clases(raiz):
+    """Nombres de clase de data.yaml (si hay PyYAML y el archivo existe) o los de prepare_dataset."""
+    ruta = Path(raiz) / 'data.yaml'
+    if ruta.exists():
+        try:
+            import yaml
+
+            with open(ruta, 'r', encoding='utf-8') as f:
+                names = yaml.safe_load(f).get('names')
+            if isinstance(names, dict):
+                return [names[k] for k in sorted(names)]
+            if names:
+                return list(names)
+        except Exception:
+            pass
+    return list(CLASES)
+
+
+def validar(raiz='datasets', workers=None, usar_cache=True, imagenes=False):
+    """
+    Valida el dataset completo. Devuelve un dict con errores por tipo,
+    estadisticas y tiempos; el indice queda guardado en raiz/ARCHIVO_INDICE.
+    """
+    inicio = time.perf_counter()
+    ruta_indice = Path(raiz) / ARCHIVO_INDICE
+    entradas = escanear(raiz)
+    t_escaneo = time.perf_counter() - inicio
+
+    anterior = IndiceEtiquetas.cargar(ruta_indice) if usar_cache and ruta_indice.exists() else None
+    indice, leidas = construir_indice(entradas, anterior, workers)
+    if entradas:
+        indice.guardar(ruta_indice)
+    t_indice = time.perf_counter() - inicio - t_escaneo
+
+    nombres = nombres_clases(raiz)
+    errores = validar_indice(indice, entradas, len(nombres))
+    if imagenes:
+        errores["imagen ilegible"] = [f"{c}: {m}" for c, m in verificar_imagenes(entradas, workers)]
+
+    return {
+        "dataset": str(raiz),
+        "errores": {tipo: lista for tipo, lista in errores.items() if lista},
+        "estadisticas": estadisticas(indice, entradas, nombres),
+        "etiquetas_leidas": leidas,
+        "segundos": {"escaneo": round(t_escaneo, 3), "indice": round(t_indice, 3),
+                     "total": round(time.perf_counter() - inicio, 3)},
+    }
+
+
+def imprimir_reporte(reporte):
+    est = reporte["estadisticas"]
+    print(f"\nImagenes: {est['imagenes']} | etiquetas: {est['etiquetas']} | cajas: {est['cajas']} "
+          f"(media {est['cajas_por_imagen_media']}, max {est['cajas_por_imagen_max']} por imagen)")
+    for split, datos in est["por_split"].items():
+        print(f"  {split:<8} {datos['imagenes']:>7} imagenes {datos['cajas']:>8} cajas "
+              f"{datos['imagenes_sin_cajas']:>6} sin cajas")
+
+    rangos = list(RANGOS_TAMANIO)
+    print(f"\n{'Clase':<12}{'Cajas':>8}{'Imagenes':>10}{'Area med %':>12}" + "".join(f"{r:>18}" for r in rangos))
+    for nombre, datos in est["por_clase"].items():
+        area = datos['area_mediana_%'] if datos['area_mediana_%'] is not None else '-'
+        print(f"{nombre:<12}{datos['cajas']:>8}{datos['imagenes']:>10}{area:>12}"
+              + "".join(f"{datos[r]:>18}" for r in rangos))
+
+    print()
+    if not reporte["errores"]:
+        print("[OK] Sin errores")
+    for tipo, lista in reporte["errores"].items():
+        print(f"[ERROR] {tipo}: {len(lista)}")
+        for detalle in lista[:MAX_ERRORES_MOSTRADOS]:
+            print(f"    {detalle}")
+        if len(lista) > MAX_ERRORES_MOSTRADOS:
+            print(f"    ... y {len(lista) - MAX_ERRORES_MOSTRADOS} mas")
+
+    s = reporte["segundos"]
+    print(f"\nTiempo: {s['total']}s (escaneo {s['escaneo']}s, indice {s['indice']}s, "
+          f"{reporte['etiquetas_leidas']} etiquetas leidas)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Valida las etiquetas YOLO del dataset e informa estadisticas")
+    parser.add_argument('--dataset', default='datasets', help="Raiz con images/ y labels/")
+    parser.add_argument('--workers', type=int, default=None, help="Hilos de lectura")
+    parser.add_argument('--sin-cache', action='store_true', help="Ignorar el indice guardado y leer todo")
+    parser.add_argument('--verificar-imagenes', action='store_true', help="Abrir el encabezado de cada imagen")
+    parser.add_argument('--salida', help="Guardar el reporte completo en JSON")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("VALIDACION DE DATASET - ETIQUETAS YOLO")
+    print("="*60)
+
+    reporte = validar(args.dataset, args.workers, not args.sin_cache, args.verificar_imagenes)
+    imprimir_reporte(reporte)
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(reporte, f, indent=2, ensure_ascii=False)
+        print(f"Reporte guardado en {args.salida}")
+
+    if reporte["errores"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()